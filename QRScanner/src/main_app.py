@@ -5,6 +5,7 @@
 """
 import os
 import sys
+import json
 import threading
 import time
 
@@ -34,12 +35,150 @@ from kivy.core.clipboard import Clipboard
 # 导入扫描器核心
 from qr_scanner import QRCodeScanner
 
-# 注册字体
+# 字体目录（只打包了部分字体文件）
 FONT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fonts')
-LabelBase.register(name='MicrosoftYaHei', fn_regular=os.path.join(FONT_DIR, 'msyh.ttc'))
-LabelBase.register(name='SimHei', fn_regular=os.path.join(FONT_DIR, 'simhei.ttf'))
-LabelBase.register(name='SimSun', fn_regular=os.path.join(FONT_DIR, 'simsun.ttc'))
-LabelBase.register(name='Arial', fn_regular=os.path.join(FONT_DIR, 'arial.ttf'))
+# 字体名 -> 字体目录中的候选字体文件（按优先级），使用第一个存在的文件
+FONT_CANDIDATES = {
+    'MicrosoftYaHei': ['msyh.ttc', 'simhei.ttf', 'simsun.ttc'],
+    'SimHei': ['simhei.ttf', 'msyh.ttc', 'simsun.ttc'],
+    'SimSun': ['simsun.ttc', 'msyh.ttc', 'simhei.ttf'],
+    'Arial': ['arial.ttf', 'calibri.ttf'],
+}
+# 显示中文的字体名：字体目录中没有中文字体时改用系统自带的中文字体，不能退回只有拉丁字母的Arial
+CJK_FONT_NAMES = ('MicrosoftYaHei', 'SimHei', 'SimSun')
+# 系统自带的中文字体（按优先级）
+SYSTEM_CJK_FONTS = [
+    # Android
+    '/system/fonts/NotoSansCJK-Regular.ttc',
+    '/system/fonts/NotoSansSC-Regular.otf',
+    '/system/fonts/DroidSansFallback.ttf',
+    # Windows
+    'C:\\Windows\\Fonts\\msyh.ttc',
+    'C:\\Windows\\Fonts\\simhei.ttf',
+    'C:\\Windows\\Fonts\\simsun.ttc',
+    # macOS
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Light.ttc',
+    # Linux
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+]
+# 字体查找结果缓存的格式版本（查找逻辑或候选字体列表变化时递增）
+FONT_CACHE_VERSION = 1
+_fonts_registered = False
+
+
+def _font_candidates(font_name):
+    """字体名的候选字体文件（按优先级）"""
+    paths = [os.path.join(FONT_DIR, name) for name in FONT_CANDIDATES[font_name]]
+    if font_name in CJK_FONT_NAMES:
+        paths += SYSTEM_CJK_FONTS
+    return paths
+
+
+def _find_fonts():
+    """逐个探测候选字体文件（只查找，不注册），返回 {字体名: 字体文件，未找到时为None}"""
+    return {font_name: next((path for path in _font_candidates(font_name) if os.path.exists(path)), None)
+            for font_name in FONT_CANDIDATES}
+
+
+def _font_cache_checks(font_paths):
+    """
+    缓存有效性检查项 [(路径, 修改时间ns, 大小)]：找到的字体文件本身，以及优先级更高的候选字体
+    （未找到时为全部候选字体）所在的目录——目录中增删文件会改变目录的修改时间
+    """
+    paths = set()
+    files = []
+    for font_name, font_path in font_paths.items():
+        candidates = _font_candidates(font_name)
+        if font_path in candidates:
+            candidates = candidates[:candidates.index(font_path)]
+            files.append(font_path)
+        paths.update(os.path.dirname(path) for path in candidates)
+    checks = []
+    for path in sorted(paths) + sorted(set(files)):
+        try:
+            stat = os.stat(path)
+            checks.append([path, stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            checks.append([path, None, None])
+    return checks
+
+
+def _load_font_cache(cache_path):
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') != FONT_CACHE_VERSION or cache.get('platform') != platform:
+            return None
+        font_paths = cache['fonts']
+        if set(font_paths) != set(FONT_CANDIDATES):
+            return None
+        if _font_cache_checks(font_paths) != [list(check) for check in cache['checks']]:
+            return None
+        return font_paths
+    except Exception as e:
+        print(f"[!] 读取字体缓存失败: {e}")
+        return None
+
+
+def _save_font_cache(cache_path, font_paths):
+    if not cache_path:
+        return
+    try:
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        cache = {
+            'version': FONT_CACHE_VERSION,
+            'platform': platform,
+            'fonts': font_paths,
+            'checks': _font_cache_checks(font_paths),
+        }
+        # 先序列化再写入，出错时不留下写了一半的缓存文件
+        content = json.dumps(cache, ensure_ascii=False, indent=2)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    except Exception as e:
+        print(f"[!] 写入字体缓存失败: {e}")
+
+
+def register_fonts(cache_dir=None):
+    """
+    注册界面使用的字体（只执行一次），在 QRScannerApp.build 创建控件前调用，导入本模块时不注册
+    只注册实际存在的字体文件：缺少的字体改用下一个候选文件，中文字体还会查找系统自带的中文字体；
+    都不存在时保留Kivy默认字体并给出警告
+    cache_dir: 查找结果缓存目录（应用数据目录）。缓存中记录的字体文件（或未找到时搜索过的目录）
+               的修改时间和大小都没有变化时直接使用缓存，不再逐个探测候选路径
+    """
+    global _fonts_registered
+    if _fonts_registered:
+        return
+    _fonts_registered = True
+    cache_path = os.path.join(cache_dir, 'font_cache.json') if cache_dir else None
+    font_paths = _load_font_cache(cache_path)
+    if font_paths is None:
+        font_paths = _find_fonts()
+        _save_font_cache(cache_path, font_paths)
+    
+    from kivy.resources import resource_find
+    default_font = resource_find('data/fonts/Roboto-Regular.ttf')
+    for font_name, font_path in font_paths.items():
+        if font_path is None:
+            if font_name in CJK_FONT_NAMES:
+                print(f"[!] 未找到中文字体 {font_name}，使用Kivy默认字体（中文会显示为方框）")
+            else:
+                print(f"[!] 未找到字体 {font_name}，使用Kivy默认字体")
+            font_path = default_font
+            if font_path is None:
+                continue
+        try:
+            LabelBase.register(name=font_name, fn_regular=font_path)
+        except Exception as e:
+            print(f"[!] 注册字体失败 {font_name}: {e}")
 
 
 class CameraTab(BoxLayout):
@@ -520,6 +659,8 @@ class QRScannerApp(App):
     """二维码扫描器应用"""
     
     def build(self):
+        # 字体在创建界面控件之前注册，查找结果缓存在应用数据目录
+        register_fonts(self.user_data_dir)
         self.title = '二维码扫描器'
         Window.size = (480, 800)
         Window.clearcolor = (0.98, 0.98, 0.98, 1)
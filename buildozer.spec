@@ -5,7 +5,7 @@ package.domain = org.example
 source.dir = .
 source.include_exts = py,png,jpg,kv,atlas,ttf
 version = 2.1.0
-requirements = python3,kivy,opencv-python,pyzbar,Pillow,numpy
+requirements = python3,kivy,opencv-python,pyzbar,Pillow,numpy,sqlite3
 orientation = portrait
 fullscreen = 0
 android.permissions = CAMERA,INTERNET
@@ -13,8 +13,11 @@ os.environ['KIVY_GL_BACKEND'] = 'sdl2'
 def is_android():
     return 'ANDROID_ARGUMENT' in os.environ or hasattr(sys, 'getandroidapilevel')
 
-# 导入主程序
-from 二维码扫描器 import QRScannerApp
+def main():
+    # 运行时才导入主程序（Kivy、OpenCV等），导入本文件不会加载界面
+    from 二维码扫描器 import QRScannerApp
+    QRScannerApp().run()
+
 
 if __name__ == '__main__':
-    QRScannerApp().run()
+    main()
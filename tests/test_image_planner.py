@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+scan_image_file 的搜索计划：裁剪/旋转/翻转/降分辨率尝试上的识别结果坐标映射回原图
+"""
+import numpy as np
+import pytest
+
+from 扫描核心 import QRCodeScanner
+
+
+def make_gray(height=120, width=200):
+    """非正方形灰度图（旋转后宽高互换，映射错误会暴露出来）"""
+    return np.zeros((height, width), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('name', ['crop_center', 'crop_bottom_right', 'rotate90', 'flip_horizontal'])
+def test_attempt_mapper_inverts_transform(name):
+    scanner = QRCodeScanner()
+    _, transform, params = next(attempt for attempt in scanner.IMAGE_ATTEMPTS if attempt[0] == name)
+    gray = make_gray()
+    # 各点都位于中心和右下裁剪区域内
+    for x, y in [(130, 70), (149, 89), (100, 60)]:
+        gray[:] = 0
+        gray[y, x] = 255
+        image, mapper = scanner._attempt_image(transform, params, gray, gray)
+        ys, xs = np.nonzero(image)
+        assert len(xs) == 1
+        assert mapper(int(xs[0]), int(ys[0])) == (x, y)
+
+
+@pytest.mark.parametrize('angle', [90, 180, 270])
+def test_rotation_mapper_inverts_transform(angle):
+    scanner = QRCodeScanner()
+    gray = make_gray()
+    gray[10, 30] = 255
+    image, mapper = scanner._attempt_image('rotate', {'angle': angle}, gray, gray)
+    ys, xs = np.nonzero(image)
+    assert mapper(int(xs[0]), int(ys[0])) == (30, 10)
+
+
+def test_map_results_rotated_rect_without_polygon():
+    scanner = QRCodeScanner()
+    gray = make_gray()
+    # 原图中 (20, 10) 处 40x30 的区域
+    gray[10:40, 20:60] = 255
+    image, mapper = scanner._attempt_image('rotate', {'angle': 90}, gray, gray)
+    ys, xs = np.nonzero(image)
+    x, y = int(xs.min()), int(ys.min())
+    w, h = int(xs.max()) - x, int(ys.max()) - y
+    results = scanner._map_results([{'data': 'CODE', 'rect': (x, y, w, h)}], mapper)
+    # 没有多边形时按矩形四角映射，矩形取外接矩形（宽高与旋转后互换）
+    assert results[0]['rect'] == (20, 10, 39, 29)
+    assert 'polygon' not in results[0]
+
+
+def test_map_results_polygon():
+    results = QRCodeScanner._map_results(
+        [{'data': 'CODE', 'rect': (0, 0, 10, 10), 'polygon': [(0, 0), (10, 0), (10, 10), (0, 10)]}],
+        lambda x, y: (x + 5, y + 7))
+    assert results[0]['polygon'] == [(5, 7), (15, 7), (15, 17), (5, 17)]
+    assert results[0]['rect'] == (5, 7, 10, 10)
+
+
+def test_reduced_results_scaled_back():
+    results = QRCodeScanner._scale_results(
+        [{'data': 'CODE', 'rect': (10, 20, 30, 40), 'polygon': [(10, 20), (40, 60)]}], 4)
+    assert results[0]['rect'] == (40, 80, 120, 160)
+    assert results[0]['polygon'] == [(40, 80), (160, 240)]
+
+
+def test_original_attempt_first():
+    scanner = QRCodeScanner()
+    scanner.strategy_stats.record('image.rotate90', 0.001, True)
+    order = [name for name, _, _ in scanner.image_attempt_order()]
+    assert order[0] == 'original'
+    assert sorted(order) == sorted(name for name, _, _ in scanner.IMAGE_ATTEMPTS)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+预处理图（PreprocessGraph）
+参数错误的配置在创建时报告；个别图像不适用的节点只是没有输出；图片扫描后释放预处理缓冲区
+"""
+import cv2
+import numpy as np
+import pytest
+
+from 扫描核心 import QRCodeScanner, PreprocessGraph, PREPROCESS_OPS, DecoderBackend
+from 扫描核心.扫描引擎 import FrameCache
+
+
+class NullBackend(DecoderBackend):
+    """测试用识别后端：什么都识别不到"""
+
+    name = 'null'
+
+    def decode(self, image):
+        return []
+
+
+@pytest.mark.parametrize('node', [
+    ('gaussian_blur', ['gray'], {'ksize': 4}),        # 核大小必须为奇数
+    ('morphology', ['gray'], {'op': 'smooth', 'size': 3}),
+    ('clahe', ['gray'], {'clip': 2.0}),               # 参数名拼错
+    ('adaptive_threshold', ['gray'], {'block_size': 11}),  # 缺少参数
+])
+def test_invalid_params_rejected_at_creation(node):
+    with pytest.raises(ValueError, match='bad'):
+        PreprocessGraph({'bad': node}, ['bad'])
+
+
+def needs_large_image(ctx, image):
+    """测试用预处理操作：与OpenCV的很多函数一样，图像过小时报错"""
+    if min(image.shape[:2]) < 32:
+        raise cv2.error('image too small')
+    return image
+
+
+def test_unsuitable_image_gives_no_output(monkeypatch, capsys):
+    monkeypatch.setitem(PREPROCESS_OPS, 'needs_large_image', needs_large_image)
+    graph = PreprocessGraph({'large': ('needs_large_image', ['gray'], {})}, ['large'])
+    # 不适用的图像上该节点没有输出，出错只提示一次
+    tiny = np.zeros((8, 8), dtype=np.uint8)
+    for _ in range(2):
+        assert graph.evaluate('large', tiny, FrameCache()) is None
+    assert capsys.readouterr().out.count('预处理节点 large') == 1
+    assert graph.node_stats['large']['skipped'] == 2
+
+
+def test_unexpected_errors_are_not_hidden(monkeypatch):
+    def broken(ctx, image):
+        if image.shape[0] < 32:
+            raise ZeroDivisionError('bug in op')
+        return image
+    monkeypatch.setitem(PREPROCESS_OPS, 'broken', broken)
+    graph = PreprocessGraph({'broken': ('broken', ['gray'], {})}, ['broken'])
+    with pytest.raises(ZeroDivisionError):
+        graph.evaluate('broken', np.zeros((8, 8), dtype=np.uint8), FrameCache())
+
+
+def test_scaling_variants_follow_graph():
+    graph = PreprocessGraph({
+        'small': ('resize', ['gray'], {'scale': 0.5}),
+        'small_otsu': ('otsu', ['small'], {}),
+        'otsu': ('otsu', ['gray'], {}),
+    }, ['small_otsu', 'otsu'])
+    # 经由输入节点缩放的变体同样算作缩放变体
+    assert graph.variants_using(PreprocessGraph.SCALING_OPS) == {'small_otsu'}
+    assert QRCodeScanner().preprocess_graph.variants_using(PreprocessGraph.SCALING_OPS) == {
+        'rescaled', 'scale_0.8', 'scale_1.2', 'scale_1.5'}
+
+
+def test_image_scan_releases_buffers():
+    scanner = QRCodeScanner(backend=NullBackend())
+    frame = np.full((480, 640), 128, dtype=np.uint8)
+    # 摄像头画面的缓冲区在帧间复用
+    scanner.scan_frame(frame)
+    assert scanner.preprocess_resources.stats()['bytes'] > 0
+    # 图片扫描（尺寸各不相同）结束后释放
+    scanner.scan_image(np.full((900, 1200), 128, dtype=np.uint8))
+    assert scanner.preprocess_resources.stats()['bytes'] == 0
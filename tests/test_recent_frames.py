@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+相似帧复用（RecentFrames / QRCodeScanner(skip_similar_frames=True)）
+画面中出现或移走一个二维码时不能复用上一帧的结果
+"""
+import cv2
+import numpy as np
+
+from 扫描核心 import QRCodeScanner, RecentFrames, DecoderBackend, DecodedSymbol, SymbolRect
+
+
+class DarkSquareBackend(DecoderBackend):
+    """测试用识别后端：把画面中的纯黑方块当作内容为 CODE 的二维码（不依赖zbar）"""
+
+    name = 'dark_square'
+
+    def __init__(self, symbols=None):
+        super().__init__(symbols)
+        self.calls = 0
+
+    def decode(self, image):
+        self.calls += 1
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        mask = (gray < 20).astype(np.uint8)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        symbols = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w >= 20 and h >= 20:
+                symbols.append(DecodedSymbol(
+                    data=b'CODE', type='QRCODE', rect=SymbolRect(x, y, w, h),
+                    polygon=[(x, y), (x + w, y), (x + w, y + h), (x, y + h)]))
+        return symbols
+
+
+def make_frame(code_size=None, x=300, y=200, seed=0):
+    """
+    640x480 的平滑背景（灰度60~200），code_size 指定时在 (x, y) 处画一个"二维码"：
+    黑色方框内是4像素的黑白棋盘格（与二维码模块一样，缩略图上平均为中灰），
+    整帧平均像素差的变化与真实二维码相当
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(60, 200, (480, 640), dtype=np.uint8)
+    frame = cv2.cvtColor(cv2.GaussianBlur(background, (0, 0), 25), cv2.COLOR_GRAY2BGR)
+    if code_size:
+        border = code_size // 8
+        rows, cols = np.indices((code_size, code_size)) // 4
+        code = np.where((rows + cols) % 2 == 0, 255, 0).astype(np.uint8)
+        code[:border, :] = code[-border:, :] = code[:, :border] = code[:, -border:] = 0
+        frame[y:y + code_size, x:x + code_size] = code[..., None]
+    return frame
+
+
+def add_noise(frame, sigma=4, seed=1):
+    rng = np.random.default_rng(seed)
+    return np.clip(frame + rng.normal(0, sigma, frame.shape), 0, 255).astype(np.uint8)
+
+
+class NullBackend(DecoderBackend):
+    """测试用识别后端：什么都识别不到（二值化等预处理结果中的黑色区域不应被当作二维码）"""
+
+    name = 'null'
+
+    def decode(self, image):
+        return []
+
+
+def make_scanner():
+    """原图/灰度图阶段用 DarkSquareBackend 识别，各预处理阶段什么都识别不到"""
+    scanner = QRCodeScanner(adaptive_order=False, backend=DarkSquareBackend(), skip_similar_frames=True)
+    scanner.variant_backends = {variant: NullBackend() for variant in scanner.preprocess_graph.variants}
+    return scanner
+
+
+def test_signature_detects_code_appearing_and_disappearing():
+    recent = RecentFrames()
+    empty = recent.signature(make_frame())
+    for size in (110, 74):
+        with_code = recent.signature(make_frame(size))
+        # 整帧平均像素差只有1~3个灰度级，只比较平均值会把两帧当作相同画面
+        assert float(np.abs(empty - with_code).mean()) < 3.0
+        assert not recent.similar(empty, with_code)
+        assert not recent.similar(with_code, empty)
+
+
+def test_signature_ignores_sensor_noise():
+    recent = RecentFrames()
+    frame = make_frame(110)
+    assert recent.similar(recent.signature(frame), recent.signature(add_noise(frame)))
+
+
+def test_code_disappears_is_not_reported():
+    scanner = make_scanner()
+    assert [r['data'] for r in scanner.scan_frame(make_frame(110))] == ['CODE']
+    assert len(scanner.scan_frame(make_frame())) == 0
+    assert scanner.frame_stats['reused'] == 0
+
+
+def test_code_appears_is_reported_immediately():
+    scanner = make_scanner()
+    assert len(scanner.scan_frame(make_frame())) == 0
+    assert [r['data'] for r in scanner.scan_frame(make_frame(74))] == ['CODE']
+    assert scanner.frame_stats['reused'] == 0
+
+
+def test_static_frames_reuse_verified_hit():
+    scanner = make_scanner()
+    frame = make_frame(110)
+    assert scanner.scan_frame(frame)
+    calls = scanner.backend.calls
+    results = scanner.scan_frame(add_noise(frame))
+    assert [r['data'] for r in results] == ['CODE']
+    assert scanner.frame_stats['reused'] == 1
+    # 复用的命中结果只在原位置确认了一次
+    assert scanner.backend.calls == calls + 1
+
+
+def test_reused_hit_rejected_when_code_is_gone():
+    scanner = make_scanner()
+    # 放宽签名阈值使两帧一定判定为相似：复用的命中结果仍需在原位置确认
+    scanner.recent_frames.threshold = scanner.recent_frames.cell_threshold = 255
+    assert scanner.scan_frame(make_frame(110))
+    assert len(scanner.scan_frame(make_frame())) == 0
+    assert scanner.frame_stats['reused'] == 0
+    assert scanner.frame_stats['scanned'] == 2
+
+
+def test_truncated_scan_is_not_reused():
+    scanner = make_scanner()
+    frame = make_frame(110)
+    # 截止时间已到的搜索没有识别任何阶段，结果不完整
+    assert scanner.scan_frame(frame, deadline_ms=0).truncated
+    assert [r['data'] for r in scanner.scan_frame(add_noise(frame))] == ['CODE']
+    assert scanner.frame_stats['reused'] == 0
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+识别结果缓存（ScanResultCache / QRCodeScanner(result_cache=...)）
+按大小淘汰、按配置指纹失效（SQLite文件和没有sqlite3时的内存缓存行为相同），扫描出错的结果不缓存
+"""
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from 扫描核心 import QRCodeScanner, ScanResultCache, DecoderBackend
+import 扫描核心.结果缓存 as result_cache_module
+
+
+class NullBackend(DecoderBackend):
+    """测试用识别后端：什么都识别不到"""
+
+    name = 'null'
+
+    def decode(self, image):
+        return []
+
+
+class MissingLibraryBackend(DecoderBackend):
+    """测试用识别后端：与缺少zbar动态库时的 PyzbarBackend 一样，每次识别都抛出 ImportError"""
+
+    name = 'missing'
+
+    def decode(self, image):
+        raise ImportError('Unable to find zbar shared library')
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def make_cache(request, tmp_path, monkeypatch):
+    """分别测试SQLite文件缓存和没有sqlite3时的内存缓存"""
+    if request.param == 'memory':
+        monkeypatch.setattr(result_cache_module, 'sqlite3', None)
+
+    def make(**kwargs):
+        cache = ScanResultCache(str(tmp_path / 'results.db'), **kwargs)
+        request.addfinalizer(cache.close)
+        return cache
+    return make
+
+
+def record(data):
+    return {'results': [{'data': data, 'type': 'QRCODE', 'rect': [0, 0, 10, 10],
+                         'polygon': [], 'page': 0}], 'attempt': 'original', 'page': 0}
+
+
+def test_put_and_get(make_cache):
+    cache = make_cache()
+    cache.put('a' * 32, 'fp1', record('HELLO'))
+    assert cache.get('a' * 32, 'fp1') == record('HELLO')
+    assert cache.get('a' * 32, 'fp2') is None
+    assert cache.get('b' * 32, 'fp1') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+
+
+def test_evicts_least_recently_used(make_cache):
+    size = len(json.dumps(record('0'), ensure_ascii=False))
+    cache = make_cache(max_bytes=size * 3)
+    cache.EVICT_CHECK_EVERY = 1
+    for index in range(3):
+        cache.put(str(index), 'fp', record(str(index)))
+    # 最早写入的 '0' 刚被使用过，超出大小上限时淘汰的是 '1'
+    cache.TOUCH_INTERVAL = -1
+    assert cache.get('0', 'fp') is not None
+    cache.put('3', 'fp', record('3'))
+    assert cache.stats()['bytes'] <= size * 3
+    assert cache.get('1', 'fp') is None
+    assert cache.get('0', 'fp') is not None
+    assert cache.get('3', 'fp') is not None
+
+
+def test_invalidate_by_fingerprint_and_keep(make_cache):
+    cache = make_cache()
+    for fingerprint in ('fp1', 'fp2', 'fp3'):
+        cache.put('a' * 32, fingerprint, record(fingerprint))
+    assert cache.invalidate(fingerprint='fp1') == 1
+    # keep 可以是任意可迭代对象
+    assert cache.invalidate(keep=(fp for fp in ['fp2'])) == 1
+    assert cache.get('a' * 32, 'fp2') is not None
+    assert cache.get('a' * 32, 'fp3') is None
+    cache.clear()
+    assert cache.stats()['entries'] == 0
+
+
+def write_image(tmp_path):
+    path = str(tmp_path / 'blank.png')
+    cv2.imwrite(path, np.full((120, 160), 200, dtype=np.uint8))
+    return path
+
+
+def test_scan_without_code_is_cached(make_cache, tmp_path):
+    scanner = QRCodeScanner(backend=NullBackend(), result_cache=make_cache())
+    path = write_image(tmp_path)
+    first = scanner.scan_image_file(path)
+    assert not first and not first.cached and first.error is None
+    second = scanner.scan_image_file(path)
+    assert not second and second.cached
+
+
+def test_scan_that_raised_is_not_cached(make_cache, tmp_path):
+    cache = make_cache()
+    scanner = QRCodeScanner(backend=MissingLibraryBackend(), result_cache=cache)
+    path = write_image(tmp_path)
+    results = scanner.scan_image_file(path)
+    assert 'zbar' in results.error
+    assert cache.stats()['entries'] == 0
+    # 识别库恢复后重新扫描，而不是返回缓存的"没有二维码"
+    scanner.backend = NullBackend()
+    results = scanner.scan_image_file(path)
+    assert not results.cached and results.error is None
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+分块扫描（QRCodeScanner.tile_grid / scan_tiles）
+分块覆盖整张图，边长不超过重叠的码完整落在某个分块内；重叠区域重复识别的码只保留一个
+"""
+import cv2
+import numpy as np
+import pytest
+
+from 扫描核心 import QRCodeScanner, DecoderBackend, DecodedSymbol, SymbolRect
+
+
+class InteriorSquareBackend(DecoderBackend):
+    """
+    测试用识别后端：把图像中的纯黑方块当作二维码，内容为方块的边长
+    与真实识别器一样，被分块边缘切开（接触图像边缘）的方块识别不到
+    """
+
+    name = 'interior_square'
+
+    def decode(self, image):
+        height, width = image.shape[:2]
+        mask = (image < 20).astype(np.uint8)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        symbols = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if x == 0 or y == 0 or x + w == width or y + h == height:
+                continue
+            symbols.append(DecodedSymbol(
+                data=str(w).encode(), type='QRCODE', rect=SymbolRect(x, y, w, h),
+                polygon=[(x, y), (x + w, y), (x + w, y + h), (x, y + h)]))
+        return symbols
+
+
+@pytest.mark.parametrize('height, width, tile_size, overlap', [
+    (1000, 1500, 256, 64),
+    (513, 1025, 256, 0),
+    (300, 4000, 1024, 256),
+    (100, 80, 256, 64),
+])
+def test_tile_grid_covers_image(height, width, tile_size, overlap):
+    boxes = QRCodeScanner.tile_grid(height, width, tile_size, overlap)
+    covered = np.zeros((height, width), dtype=np.uint8)
+    for x, y, w, h in boxes:
+        assert 0 < w <= tile_size and 0 < h <= tile_size
+        assert x + w <= width and y + h <= height
+        covered[y:y + h, x:x + w] = 1
+    assert covered.all()
+    # 最后一行/列的分块与图像边缘对齐
+    assert max(x + w for x, _, w, _ in boxes) == width
+    assert max(y + h for _, y, _, h in boxes) == height
+
+
+def test_tile_grid_overlap_contains_every_small_code():
+    height, width, tile_size, overlap = 700, 900, 256, 64
+    boxes = QRCodeScanner.tile_grid(height, width, tile_size, overlap)
+    # 边长不超过重叠的码无论在哪里，都完整落在某个分块内
+    for y in range(0, height - overlap + 1, 7):
+        for x in range(0, width - overlap + 1, 7):
+            assert any(bx <= x and x + overlap <= bx + bw and by <= y and y + overlap <= by + bh
+                       for bx, by, bw, bh in boxes)
+
+
+def test_tile_grid_rejects_invalid_overlap():
+    with pytest.raises(ValueError):
+        QRCodeScanner.tile_grid(1000, 1000, 256, 256)
+    with pytest.raises(ValueError):
+        QRCodeScanner.tile_grid(1000, 1000, 256, -1)
+
+
+def test_scan_tiles_maps_and_merges_codes():
+    image = np.full((700, 900), 255, dtype=np.uint8)
+    # 第一个码跨过分块边界（x=256处），第二个码在分块内部
+    image[100:160, 230:290] = 0
+    image[500:550, 600:650] = 0
+    scanner = QRCodeScanner(backend=InteriorSquareBackend())
+    results = scanner.scan_tiles(image, tile_size=256, overlap=64, workers=2)
+    assert [(result['data'], result['rect']) for result in results] == [
+        ('60', (230, 100, 60, 60)),
+        ('50', (600, 500, 50, 50)),
+    ]
+    assert not results.truncated
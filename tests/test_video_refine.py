@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+视频扫描的补采和汇总（QRCodeScanner._video_refine_targets / _summarize_video）
+内容出现/消失的边缘在相邻采样帧之间补采，汇总得到每个内容的首次/最后出现时间
+"""
+from 扫描核心 import QRCodeScanner, ScanResult
+
+
+def hit(data):
+    return {'data': data, 'type': 'QRCODE', 'rect': (0, 0, 10, 10)}
+
+
+def observe(frames):
+    """{帧号: [内容, ...]} -> 各采样帧的识别结果"""
+    return {index: ScanResult([hit(data) for data in contents]) for index, contents in frames.items()}
+
+
+def test_refine_between_appearance_edges():
+    observations = observe({0: [], 30: ['A'], 60: ['A'], 90: []})
+    # 出现：0~30 之间补采；消失：60~90 之间补采；内容没有变化的 30~60 不补采
+    assert QRCodeScanner._video_refine_targets(observations, 10) == [10, 20, 70, 80]
+
+
+def test_refine_skips_close_samples_and_sampled_frames():
+    observations = observe({0: [], 5: ['A'], 10: []})
+    assert QRCodeScanner._video_refine_targets(observations, 5) == []
+    # 已经采样过的帧不再补采
+    observations = observe({0: [], 10: [], 20: ['A']})
+    assert QRCodeScanner._video_refine_targets(observations, 5) == [15]
+
+
+def test_refine_when_content_changes():
+    observations = observe({0: ['A'], 20: ['B']})
+    # A 消失、B 出现：两帧之间都需要补采
+    assert QRCodeScanner._video_refine_targets(observations, 5) == [5, 10, 15]
+
+
+def test_no_refine_without_codes():
+    assert QRCodeScanner._video_refine_targets(observe({0: [], 30: [], 60: []}), 10) == []
+
+
+def test_summarize_first_and_last_appearance():
+    observations = observe({0: [], 10: ['A'], 20: ['A', 'B'], 40: ['B'], 50: []})
+    summary = QRCodeScanner._summarize_video(observations, 10.0, truncated=False)
+    assert [entry['data'] for entry in summary] == ['A', 'B']
+    a, b = summary
+    assert (a['first_frame'], a['last_frame'], a['hits']) == (10, 20, 2)
+    assert (a['first_ms'], a['last_ms']) == (1000.0, 2000.0)
+    assert (b['first_frame'], b['last_frame'], b['hits']) == (20, 40, 2)
+    assert not summary.truncated
+    assert QRCodeScanner._summarize_video({}, 30.0, truncated=True).truncated
@@ -16,11 +16,6 @@
 """
 import os
 import sys
-import shutil
-import re
-import math
-from urllib.parse import urlparse
-from datetime import datetime
 
 # ============================================================
 # 第一部分：跨平台字体配置
@@ -40,16 +35,42 @@ def get_platform():
     return 'unknown'
 
 
-def setup_fonts():
+# 字体查找结果缓存的格式版本（查找逻辑或候选字体列表变化时递增）
+FONT_CACHE_VERSION = 1
+
+
+def setup_fonts(cache_path=None):
     """
     跨平台字体配置
     - Windows: 尝试使用系统字体或打包字体
     - Android: 使用系统默认中文字体
     - 其他: 使用默认字体
+    cache_path: 查找结果缓存文件（JSON）。缓存中记录的字体文件（或未找到时搜索过的目录）
+                的修改时间和大小都没有变化时直接使用缓存，不再逐个探测候选路径
+    查找到的字体在这里注册（需要Kivy），返回字体配置
     """
     current_platform = get_platform()
     print(f"[*] 当前平台: {current_platform}")
     
+    font_config = _load_font_cache(cache_path, current_platform)
+    if font_config is not None:
+        print(f"[*] 使用缓存的字体配置: {font_config['font_path'] or font_config['font_name']}")
+    else:
+        font_config = _find_fonts(current_platform)
+        _save_font_cache(cache_path, current_platform, font_config)
+    
+    if font_config['font_path']:
+        try:
+            LabelBase.register(name=font_config['font_name'], fn_regular=font_config['font_path'])
+        except Exception as e:
+            print(f"[!] 注册字体失败: {e}")
+            print("[*] 使用默认字体")
+            font_config = {'font_name': 'Roboto', 'font_path': None, 'chinese_supported': False}
+    return font_config
+
+
+def _find_fonts(current_platform):
+    """按平台逐个探测候选字体路径（只查找，不注册）"""
     font_config = {
         'font_name': 'Roboto',  # 默认字体
         'font_path': None,
@@ -76,6 +97,67 @@ def setup_fonts():
     return font_config
 
 
+def _font_cache_checks(font_config):
+    """
+    缓存有效性检查项 [(路径, 修改时间ns, 大小)]：找到的字体文件本身，以及优先级更高的候选字体
+    （未找到时为全部候选字体）所在的目录——目录中增删文件会改变目录的修改时间
+    """
+    candidates = list(font_config.get('candidates', ()))
+    font_path = font_config['font_path']
+    if font_path in candidates:
+        candidates = candidates[:candidates.index(font_path)]
+    paths = sorted({os.path.dirname(path) for path in candidates})
+    if font_path:
+        paths.append(font_path)
+    checks = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            checks.append([path, stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            checks.append([path, None, None])
+    return checks
+
+
+def _load_font_cache(cache_path, current_platform):
+    if not cache_path or not os.path.exists(cache_path):
+        return None
+    try:
+        import json
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') != FONT_CACHE_VERSION or cache.get('platform') != current_platform:
+            return None
+        font_config = cache['config']
+        checks = [list(check) for check in cache['checks']]
+        if _font_cache_checks(font_config) != checks:
+            return None
+        return font_config
+    except Exception as e:
+        print(f"[!] 读取字体缓存失败: {e}")
+        return None
+
+
+def _save_font_cache(cache_path, current_platform, font_config):
+    if not cache_path:
+        return
+    try:
+        import json
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        cache = {
+            'version': FONT_CACHE_VERSION,
+            'platform': current_platform,
+            'config': font_config,
+            'checks': _font_cache_checks(font_config),
+        }
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"[!] 写入字体缓存失败: {e}")
+
+
 def _setup_windows_fonts(config):
     """Windows字体配置"""
     # 尝试查找系统字体
@@ -91,6 +173,8 @@ def _setup_windows_fonts(config):
         ('simsun.ttc', '宋体'),
     ]
     
+    config['candidates'] = [os.path.join(font_dir, font_file)
+                            for font_dir in system_font_paths for font_file, _ in target_fonts]
     for font_dir in system_font_paths:
         if not os.path.exists(font_dir):
             continue
@@ -98,16 +182,11 @@ def _setup_windows_fonts(config):
         for font_file, font_name in target_fonts:
             font_path = os.path.join(font_dir, font_file)
             if os.path.exists(font_path):
-                try:
-                    LabelBase.register(name='ChineseFont', fn_regular=font_path)
-                    config['font_name'] = 'ChineseFont'
-                    config['font_path'] = font_path
-                    config['chinese_supported'] = True
-                    print(f"[✓] Windows字体: {font_name}")
-                    return config
-                except Exception as e:
-                    print(f"[!] 注册字体失败: {e}")
-                    continue
+                config['font_name'] = 'ChineseFont'
+                config['font_path'] = font_path
+                config['chinese_supported'] = True
+                print(f"[✓] Windows字体: {font_name}")
+                return config
     
     print("[*] Windows: 未找到中文字体，使用默认")
     return config
@@ -123,18 +202,14 @@ def _setup_android_fonts(config):
         '/system/fonts/Roboto-Regular.ttf',
     ]
     
+    config['candidates'] = list(android_font_paths)
     for font_path in android_font_paths:
         if os.path.exists(font_path):
-            try:
-                LabelBase.register(name='AndroidChineseFont', fn_regular=font_path)
-                config['font_name'] = 'AndroidChineseFont'
-                config['font_path'] = font_path
-                config['chinese_supported'] = True
-                print(f"[✓] Android字体: {os.path.basename(font_path)}")
-                return config
-            except Exception as e:
-                print(f"[!] Android字体注册失败: {e}")
-                continue
+            config['font_name'] = 'AndroidChineseFont'
+            config['font_path'] = font_path
+            config['chinese_supported'] = True
+            print(f"[✓] Android字体: {os.path.basename(font_path)}")
+            return config
     
     # 如果找不到中文字体，使用Roboto（Android默认支持中文）
     print("[*] Android: 使用系统默认字体")
@@ -151,17 +226,14 @@ def _setup_macos_fonts(config):
         '/Library/Fonts/Arial Unicode.ttf',
     ]
     
+    config['candidates'] = list(mac_fonts)
     for font_path in mac_fonts:
         if os.path.exists(font_path):
-            try:
-                LabelBase.register(name='MacChineseFont', fn_regular=font_path)
-                config['font_name'] = 'MacChineseFont'
-                config['font_path'] = font_path
-                config['chinese_supported'] = True
-                print(f"[✓] macOS字体: {os.path.basename(font_path)}")
-                return config
-            except Exception as e:
-                continue
+            config['font_name'] = 'MacChineseFont'
+            config['font_path'] = font_path
+            config['chinese_supported'] = True
+            print(f"[✓] macOS字体: {os.path.basename(font_path)}")
+            return config
     
     print("[*] macOS: 使用默认字体")
     return config
@@ -176,17 +248,14 @@ def _setup_linux_fonts(config):
         '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
     ]
     
+    config['candidates'] = list(linux_fonts)
     for font_path in linux_fonts:
         if os.path.exists(font_path):
-            try:
-                LabelBase.register(name='LinuxChineseFont', fn_regular=font_path)
-                config['font_name'] = 'LinuxChineseFont'
-                config['font_path'] = font_path
-                config['chinese_supported'] = True
-                print(f"[✓] Linux字体: {os.path.basename(font_path)}")
-                return config
-            except Exception as e:
-                continue
+            config['font_name'] = 'LinuxChineseFont'
+            config['font_path'] = font_path
+            config['chinese_supported'] = True
+            print(f"[✓] Linux字体: {os.path.basename(font_path)}")
+            return config
     
     print("[*] Linux: 使用默认字体")
     return config
@@ -195,302 +264,34 @@ def _setup_linux_fonts(config):
 # ============================================================
 # 第二部分：内容安全检测系统
 # ============================================================
-
-class ContentSafetyChecker:
-    """文本内容安全检测器 - 检测违规内容"""
-    
-    # 色情相关关键词
-    PORNOGRAPHIC_KEYWORDS = [
-        '色情', 'av', 'porn', 'sex', 'xxx', 'adult', 'nude', 'naked',
-        'pussy', 'dick', 'cock', 'boobs', 'tits', 'ass', 'fuck', 'bitch',
-        'slut', 'whore', 'prostitute', 'escort', 'camgirl', 'onlyfans',
-        'hentai', 'erotic', 'masturbat', 'orgasm', 'ejaculat', 'blowjob',
-        'handjob', 'cum', 'squirt', 'anal', 'vagina', 'penis', 'clitoris',
-        'fetish', 'bdsm', 'bondage', 'swinger', 'milf', 'teen porn',
-        '强奸', '乱伦', '卖淫', '嫖娼', '裸聊', '约炮', '性服务',
-        '成人视频', '黄色网站', '福利姬', '援交', '包养', '裸照',
-    ]
-    
-    # 暴力相关关键词
-    VIOLENCE_KEYWORDS = [
-        '暴力', 'kill', 'murder', 'death', 'die', 'suicide', ' homicide',
-        'assassinat', 'terrorist', 'bomb', 'explosive', 'gun', 'weapon',
-        'knife', 'stab', 'shoot', 'massacre', 'genocide', 'torture',
-        'abuse', 'beat', 'fight', 'war', 'battle', 'bloodshed',
-        '杀人', '自杀', '死亡', '尸体', '血腥', '虐待', '殴打',
-        '恐怖袭击', '爆炸', '炸弹', '枪支', '武器', '刀具', '刺杀',
-        '屠杀', '酷刑', '家暴', '校园暴力', '打架斗殴', '械斗',
-    ]
-    
-    # 血腥相关关键词
-    GORE_KEYWORDS = [
-        '血腥', 'blood', 'gore', 'gory', 'dismember', 'decapitat',
-        'mutilat', 'corpse', 'dead body', 'rotting', 'cannibal',
-        'necro', 'snuff', 'beheading', 'execution', 'torture porn',
-        '断肢', '分尸', '斩首', '碎尸', '尸体', '腐烂', '食人',
-        '虐杀', '处决', '活体解剖', '器官贩卖', '人体实验',
-    ]
-    
-    # 赌博相关关键词
-    GAMBLING_KEYWORDS = [
-        '赌博', '博彩', '赌场', 'bet', 'gamble', 'casino', 'lottery',
-        'jackpot', 'slot machine', 'poker', 'blackjack', 'roulette',
-        'sports betting', 'online casino', '彩票', '六合彩', '赌球',
-        '百家乐', '老虎机', '德州扑克', '麻将赌博', '网络赌博',
-        '赌马', '赌狗', '飞艇', '快三', '时时彩', '北京赛车',
-    ]
-    
-    # 毒品相关关键词
-    DRUG_KEYWORDS = [
-        '毒品', '吸毒', '贩毒', 'drug', 'cocaine', 'heroin', 'meth',
-        'marijuana', 'cannabis', 'weed', 'lsd', 'ecstasy', 'mdma',
-        'opium', 'fentanyl', 'overdose', 'narcotic', '冰毒', '海洛因',
-        '可卡因', '大麻', '摇头丸', '麻古', 'k粉', '白粉', '罂粟',
-        '致幻剂', '兴奋剂', '镇静剂', '吸毒工具', '制毒',
-    ]
-    
-    # 诈骗相关关键词
-    FRAUD_KEYWORDS = [
-        '诈骗', '欺诈', 'scam', 'fraud', 'phishing', 'deception',
-        'hoax', 'con', 'swindle', 'extortion', 'blackmail', 'ransom',
-        'pyramid scheme', 'ponzi', 'multi-level marketing', 'mlm',
-        '电信诈骗', '网络诈骗', '钓鱼网站', '虚假中奖', '冒充公检法',
-        '杀猪盘', '刷单诈骗', '贷款诈骗', '投资诈骗', '传销',
-        '非法集资', '洗钱', '套现', '盗刷', '信用卡诈骗',
-    ]
-    
-    @classmethod
-    def check_content(cls, text):
-        """
-        检测文本内容安全
-        返回: (是否安全, 违规类型, 详细提示, 风险等级颜色)
-        """
-        if not text or len(text.strip()) == 0:
-            return (True, None, '内容为空', (0.5, 0.5, 0.5, 1))
-        
-        text_lower = text.lower()
-        violations = []
-        
-        # 检查各类违规内容
-        checks = [
-            (cls.PORNOGRAPHIC_KEYWORDS, '色情内容', '🔞'),
-            (cls.VIOLENCE_KEYWORDS, '暴力内容', '💀'),
-            (cls.GORE_KEYWORDS, '血腥内容', '🩸'),
-            (cls.GAMBLING_KEYWORDS, '赌博内容', '🎲'),
-            (cls.DRUG_KEYWORDS, '毒品内容', '💊'),
-            (cls.FRAUD_KEYWORDS, '诈骗内容', '⚠️'),
-        ]
-        
-        for keywords, category, icon in checks:
-            found = cls._check_keywords(text_lower, keywords)
-            if found:
-                violations.append((category, found, icon))
-        
-        if violations:
-            # 构建详细提示
-            details = []
-            for category, found_words, icon in violations:
-                word_str = ', '.join(found_words[:3])
-                details.append(f"{icon} 检测到{category}: {word_str}")
-            
-            detail_text = '\n'.join(details)
-            return (False, '违规内容', detail_text, (0.9, 0.1, 0.1, 1))  # 红色
-        
-        # 如果是普通文本，认为是安全的
-        return (True, '安全文本', '✅ 普通文本内容，无违规信息', (0.2, 0.8, 0.2, 1))  # 绿色
-    
-    @staticmethod
-    def _check_keywords(text, keywords):
-        """检查文本中是否包含关键词"""
-        found = []
-        for keyword in keywords:
-            if keyword.lower() in text:
-                found.append(keyword)
-        return found
-
-
-class URLSecurityChecker:
-    """URL安全检测器 - 三档安全等级"""
-    
-    # 危险关键词（权重：严重=3, 警告=1）
-    DANGEROUS_KEYWORDS = {
-        # 严重危险关键词 (权重3)
-        'login': 3, 'signin': 3, 'account': 3, 'password': 3, 'verify': 3,
-        'secure': 3, 'update': 3, 'confirm': 3, 'banking': 3, 'payment': 3,
-        'wallet': 3, 'crypto': 3, 'bitcoin': 3, 'verify-account': 3,
-        'security-check': 3, 'authenticate': 3, 'credential': 3,
-        
-        # 警告关键词 (权重1)
-        'free': 1, 'gift': 1, 'prize': 1, 'winner': 1, 'bonus': 1,
-        'discount': 1, 'offer': 1, 'limited': 1, 'urgent': 1, 'alert': 1,
-        'suspend': 1, 'restricted': 1, 'locked': 1, 'unusual': 1,
-        'click': 1, 'download': 1, 'install': 1, 'upgrade': 1,
-    }
-    
-    # 可疑顶级域名
-    SUSPICIOUS_TLDS = ['.tk', '.ml', '.ga', '.cf', '.top', '.xyz', '.club', '.work', '.date']
-    
-    # 可疑URL模式
-    SUSPICIOUS_PATTERNS = [
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}',  # IP地址
-        r'[a-zA-Z0-9]{30,}',  # 超长随机字符串
-        r'[0o][0o]',  # 数字0和字母o混淆
-        r'[il1][il1][il1]',  # i, l, 1混淆
-    ]
-    
-    # 短链接服务
-    SHORT_URL_SERVICES = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 
-                          'short.link', 'is.gd', 'buff.ly', 'rebrand.ly']
-    
-    @classmethod
-    def check_url(cls, url):
-        """
-        检测URL安全等级
-        返回: (安全等级, 风险分数, 详细提示, 颜色)
-        安全等级: 'safe', 'warning', 'dangerous'
-        """
-        if not url.startswith(('http://', 'https://')):
-            return ('safe', 0, '非链接内容', (0.5, 0.5, 0.5, 1))
-        
-        risk_score = 0
-        risk_factors = []
-        
-        # 1. 检查协议 (http vs https)
-        if url.startswith('http://'):
-            risk_score += 1
-            risk_factors.append('使用不安全的HTTP协议')
-        
-        # 2. 解析URL
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            path = parsed.path.lower()
-            query = parsed.query.lower()
-            
-            # 3. 检查域名长度 (过短或过长都可疑)
-            if len(domain) < 5:
-                risk_score += 2
-                risk_factors.append('域名过短')
-            elif len(domain) > 50:
-                risk_score += 2
-                risk_factors.append('域名过长')
-            
-            # 4. 检查可疑顶级域名
-            for tld in cls.SUSPICIOUS_TLDS:
-                if domain.endswith(tld):
-                    risk_score += 2
-                    risk_factors.append(f'使用可疑域名后缀 {tld}')
-                    break
-            
-            # 5. 检查短链接
-            for short_service in cls.SHORT_URL_SERVICES:
-                if short_service in domain:
-                    risk_score += 2
-                    risk_factors.append('使用短链接服务（可能隐藏真实目标）')
-                    break
-            
-            # 6. 检查数字和特殊字符比例
-            domain_chars = re.sub(r'[^a-zA-Z0-9]', '', domain)
-            if domain_chars:
-                digit_ratio = sum(c.isdigit() for c in domain_chars) / len(domain_chars)
-                if digit_ratio > 0.3:
-                    risk_score += 2
-                    risk_factors.append('域名包含过多数字')
-            
-            # 7. 检查URL熵值（随机性）
-            url_entropy = cls.calculate_entropy(url)
-            if url_entropy > 4.5:
-                risk_score += 1
-                risk_factors.append('URL结构异常复杂')
-            
-            # 8. 检查危险关键词
-            full_url = (domain + path + query).lower()
-            for keyword, weight in cls.DANGEROUS_KEYWORDS.items():
-                if keyword in full_url:
-                    risk_score += weight
-                    if weight >= 3:
-                        risk_factors.append(f'包含严重危险关键词: {keyword}')
-            
-            # 9. 检查可疑模式
-            for pattern in cls.SUSPICIOUS_PATTERNS:
-                if re.search(pattern, url, re.IGNORECASE):
-                    risk_score += 2
-                    risk_factors.append('URL包含可疑模式')
-                    break
-            
-            # 10. 检查子域名数量
-            subdomain_count = domain.count('.') - 1
-            if subdomain_count > 3:
-                risk_score += 2
-                risk_factors.append('子域名层级过多')
-            
-            # 11. 检查@符号（钓鱼常用）
-            if '@' in url:
-                risk_score += 3
-                risk_factors.append('URL包含@符号（钓鱼攻击特征）')
-            
-            # 12. 检查端口号
-            if ':' in domain and not (':80' in domain or ':443' in domain):
-                risk_score += 1
-                risk_factors.append('使用非标准端口')
-                
-        except Exception as e:
-            risk_score += 1
-            risk_factors.append('URL解析异常')
-        
-        # 确定安全等级
-        max_possible_score = 20  # 理论最大风险分
-        risk_percentage = (risk_score / max_possible_score) * 100
-        
-        if risk_percentage < 20:
-            level = 'safe'
-            icon = '✅'
-            color = (0.2, 0.8, 0.2, 1)  # 绿色
-        elif risk_percentage < 60:
-            level = 'warning'
-            icon = '⚠️'
-            color = (1.0, 0.6, 0.0, 1)  # 橙色
-        else:
-            level = 'dangerous'
-            icon = '🚨'
-            color = (0.9, 0.1, 0.1, 1)  # 红色
-        
-        # 生成详细提示
-        if risk_factors:
-            detail = f"{icon} 发现 {len(risk_factors)} 个风险点:\n" + "\n".join([f"  • {f}" for f in risk_factors[:5]])
-        else:
-            detail = f"{icon} 未发现明显风险"
-        
-        return (level, risk_percentage, detail, color)
-    
-    @staticmethod
-    def calculate_entropy(string):
-        """计算字符串的熵值（随机性）"""
-        if not string:
-            return 0
-        
-        prob = [float(string.count(c)) / len(string) for c in dict.fromkeys(list(string))]
-        entropy = -sum([p * math.log(p) / math.log(2.0) for p in prob])
-        return entropy
+# ContentSafetyChecker / URLSecurityChecker / VerdictCache 位于 扫描核心/安全检测.py，
+# 与扫描核心类一样在用到时才导入（见第五部分）
 
 
 # ============================================================
 # 第三部分：导入依赖库
 # ============================================================
 
-try:
-    import cv2
-    import numpy as np
-    from pyzbar.pyzbar import decode
-    from PIL import Image as PILImage
-    LIBS_AVAILABLE = True
-except ImportError as e:
-    LIBS_AVAILABLE = False
+# 只检查依赖库是否已安装（find_spec 不执行导入）；cv2在显示摄像头画面时导入，
+# numpy、pyzbar由扫描核心导入，PIL在读取图片文件时才导入
+from importlib.util import find_spec
+
+
+def exit_missing_libs(detail=None):
+    """缺少必要的库时提示安装方法并退出"""
     print("[!] 错误: 缺少必要的库")
+    if detail:
+        print(f"    {detail}")
     print("请安装: pip install opencv-python pyzbar Pillow numpy")
+    print("（pyzbar还需要zbar动态库：Debian/Ubuntu 安装 libzbar0，macOS 执行 brew install zbar）")
     input("按回车键退出...")
     sys.exit(1)
 
+
+LIBS_AVAILABLE = all(find_spec(name) is not None for name in ('cv2', 'numpy', 'pyzbar', 'PIL'))
+if not LIBS_AVAILABLE:
+    exit_missing_libs()
+
 try:
     from kivy.app import App
     from kivy.uix.boxlayout import BoxLayout
@@ -504,12 +305,11 @@ try:
     from kivy.uix.scrollview import ScrollView
     from kivy.uix.gridlayout import GridLayout
     from kivy.clock import Clock
-    from kivy.core.window import Window
     from kivy.core.text import LabelBase
     from kivy.graphics import Color, Rectangle, Line, RoundedRectangle
     from kivy.utils import platform
-    from kivy.core.clipboard import Clipboard
     from kivy.metrics import dp
+    # Window（导入即创建窗口）和 Clipboard 在用到时才导入，导入本模块不会打开窗口
     KIVY_AVAILABLE = True
 except ImportError as e:
     KIVY_AVAILABLE = False
@@ -520,409 +320,53 @@ except ImportError as e:
 
 
 # ============================================================
-# 第四部分：字体配置（Kivy加载后执行）
+# 第四部分：字体配置（第一个控件创建时执行）
 # ============================================================
 
-FONT_NAME = 'Roboto'
+FONT_NAME = None
 FONT_CONFIG = None
+# 字体查找结果缓存文件（configure_fonts 设置）
+FONT_CACHE_PATH = None
 
-if KIVY_AVAILABLE:
+
+def configure_fonts(cache_dir=None):
+    """
+    设置字体查找结果的缓存目录，在 QRScannerApp.build 创建界面前调用
+    这里不查找也不注册字体：第一个控件调用 get_font_name 时才执行，导入本模块时不做任何字体相关的工作
+    """
+    global FONT_CACHE_PATH
+    FONT_CACHE_PATH = os.path.join(cache_dir, 'font_cache.json') if cache_dir else None
+
+
+def get_font_name():
+    """界面控件使用的字体名：第一次调用时查找（优先使用缓存）并注册中文字体（只执行一次）"""
+    global FONT_NAME, FONT_CONFIG
+    if FONT_NAME is not None:
+        return FONT_NAME
     try:
-        FONT_CONFIG = setup_fonts()
+        FONT_CONFIG = setup_fonts(FONT_CACHE_PATH)
         FONT_NAME = FONT_CONFIG.get('font_name', 'Roboto')
         print(f"[*] 使用字体: {FONT_NAME}")
     except Exception as e:
         print(f"[!] 字体配置失败: {e}")
+        FONT_CONFIG = {'font_name': 'Roboto', 'font_path': None, 'chinese_supported': False}
         FONT_NAME = 'Roboto'
+    return FONT_NAME
 
 
 # ============================================================
 # 第五部分：二维码扫描核心类
 # ============================================================
+# 扫描核心（扫描核心/扫描引擎.py、扫描核心/安全检测.py）不依赖Kivy，可单独用于批量扫描等
+# 无界面场景。界面在创建主界面（MainScreen）时才导入用到的类，导入本模块不加载OpenCV/zbar
 
-class QRCodeScanner:
-    """二维码扫描器核心类"""
-    
-    def __init__(self):
-        self.capture = None
-        self.is_running = False
-        self.last_result = None
-        
-    def start_camera(self, camera_id=0):
-        """启动摄像头"""
-        self.capture = cv2.VideoCapture(camera_id)
-        if not self.capture.isOpened():
-            raise Exception("无法打开摄像头")
-        
-        # 设置较低的分辨率以提高性能
-        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        self.is_running = True
-        return True
-        
-    def stop_camera(self):
-        """停止摄像头"""
-        self.is_running = False
-        if self.capture:
-            self.capture.release()
-            self.capture = None
-            
-    def get_frame(self):
-        """获取一帧图像"""
-        if self.capture and self.is_running:
-            ret, frame = self.capture.read()
-            if ret:
-                return frame
-        return None
-        
-    def preprocess_for_artistic_qr(self, image):
-        """增强预处理 - 支持异形二维码和难识别二维码"""
-        # 转换为灰度图
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image.copy()
-        
-        preprocessed_images = []
-        
-        # 1. 原始灰度图
-        preprocessed_images.append(gray)
-        
-        # 2. 对比度增强（CLAHE）
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
-        preprocessed_images.append(enhanced)
-        
-        # 3. 自适应阈值 - 小窗口（对细节保留好）
-        adaptive_small = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                               cv2.THRESH_BINARY, 7, 2)
-        preprocessed_images.append(adaptive_small)
-        
-        # 4. 自适应阈值 - 大窗口（对整体效果好）
-        adaptive_large = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                               cv2.THRESH_BINARY, 21, 5)
-        preprocessed_images.append(adaptive_large)
-        
-        # 5. OTSU自动阈值
-        _, otsu = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        preprocessed_images.append(otsu)
-        
-        # 6. 高斯模糊后OTSU（去除噪声）
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, blurred_otsu = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        preprocessed_images.append(blurred_otsu)
-        
-        # 7. 中值滤波（去除椒盐噪声）
-        median = cv2.medianBlur(gray, 5)
-        preprocessed_images.append(median)
-        
-        # 8. 形态学闭运算（填充小孔）
-        kernel_close = np.ones((3, 3), np.uint8)
-        morph_close = cv2.morphologyEx(otsu, cv2.MORPH_CLOSE, kernel_close)
-        preprocessed_images.append(morph_close)
-        
-        # 9. 形态学开运算（去除小噪点）
-        kernel_open = np.ones((2, 2), np.uint8)
-        morph_open = cv2.morphologyEx(otsu, cv2.MORPH_OPEN, kernel_open)
-        preprocessed_images.append(morph_open)
-        
-        # 10. 锐化（增强边缘）
-        kernel_sharpen = np.array([[-1, -1, -1],
-                                   [-1,  9, -1],
-                                   [-1, -1, -1]])
-        sharpened = cv2.filter2D(gray, -1, kernel_sharpen)
-        preprocessed_images.append(sharpened)
-        
-        # 11. 双边滤波（保边去噪）
-        bilateral = cv2.bilateralFilter(gray, 9, 75, 75)
-        preprocessed_images.append(bilateral)
-        
-        # 12. 直方图均衡化
-        equalized = cv2.equalizeHist(gray)
-        preprocessed_images.append(equalized)
-        
-        # 13. 反色图像（有些二维码是反色的）
-        inverted = cv2.bitwise_not(gray)
-        preprocessed_images.append(inverted)
-        
-        # 14. 缩放图像（对过小或过大的二维码）
-        height, width = gray.shape
-        if height < 200 or width < 200:
-            # 放大小图像
-            scaled_up = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-            preprocessed_images.append(scaled_up)
-        elif height > 1000 or width > 1000:
-            # 缩小大图像
-            scaled_down = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
-            preprocessed_images.append(scaled_down)
-        
-        # 15. 透视变换校正（对倾斜/变形的二维码）
-        try:
-            # 检测轮廓并尝试校正
-            edges = cv2.Canny(gray, 50, 150)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            for contour in contours:
-                # 近似多边形
-                epsilon = 0.02 * cv2.arcLength(contour, True)
-                approx = cv2.approxPolyDP(contour, epsilon, True)
-                
-                # 如果是四边形（可能是二维码）
-                if len(approx) == 4 and cv2.contourArea(approx) > 1000:
-                    pts = approx.reshape(4, 2)
-                    rect = np.zeros((4, 2), dtype="float32")
-                    
-                    # 排序点：左上、右上、右下、左下
-                    s = pts.sum(axis=1)
-                    rect[0] = pts[np.argmin(s)]
-                    rect[2] = pts[np.argmax(s)]
-                    
-                    diff = np.diff(pts, axis=1)
-                    rect[1] = pts[np.argmin(diff)]
-                    rect[3] = pts[np.argmax(diff)]
-                    
-                    # 计算目标尺寸
-                    width = max(int(np.linalg.norm(rect[1] - rect[0])),
-                               int(np.linalg.norm(rect[2] - rect[3])))
-                    height = max(int(np.linalg.norm(rect[3] - rect[0])),
-                                int(np.linalg.norm(rect[2] - rect[1])))
-                    
-                    dst = np.array([
-                        [0, 0],
-                        [width - 1, 0],
-                        [width - 1, height - 1],
-                        [0, height - 1]], dtype="float32")
-                    
-                    # 透视变换
-                    M = cv2.getPerspectiveTransform(rect, dst)
-                    warped = cv2.warpPerspective(gray, M, (width, height))
-                    preprocessed_images.append(warped)
-                    break
-        except Exception:
-            pass
-        
-        # 16. 圆形二维码检测（极坐标转换）
-        try:
-            height, width = gray.shape
-            center = (width // 2, height // 2)
-            max_radius = min(center[0], center[1])
-            
-            # 转换为极坐标
-            polar = cv2.warpPolar(gray, (360, max_radius), center, max_radius, cv2.WARP_POLAR_LINEAR)
-            preprocessed_images.append(polar)
-            
-            # 旋转后的极坐标
-            polar_rotated = cv2.rotate(polar, cv2.ROTATE_90_CLOCKWISE)
-            preprocessed_images.append(polar_rotated)
-        except Exception:
-            pass
-        
-        # 17. 多尺度检测
-        for scale in [0.8, 1.2, 1.5]:
-            try:
-                scaled = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-                preprocessed_images.append(scaled)
-            except Exception:
-                continue
-        
-        return preprocessed_images
-        
-    def scan_frame(self, frame):
-        """增强扫描 - 支持各种难识别二维码和异形二维码"""
-        if frame is None:
-            return []
-        
-        all_results = []
-        seen_data = set()
-        
-        # 1. 首先尝试直接扫描原图（支持所有二维码类型）
-        decoded_objects = decode(frame)
-        for obj in decoded_objects:
-            try:
-                data = self._decode_data(obj.data)
-                if data and data not in seen_data:
-                    seen_data.add(data)
-                    rect = obj.rect
-                    all_results.append({
-                        'data': data,
-                        'type': obj.type,
-                        'rect': (rect.left, rect.top, rect.width, rect.height)
-                    })
-            except Exception:
-                continue
-        
-        # 如果已经识别到，直接返回（优化性能）
-        if all_results:
-            return all_results
-        
-        # 2. 尝试扫描原图的灰度版本
-        try:
-            if len(frame.shape) == 3:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = frame.copy()
-            
-            decoded_objects = decode(gray)
-            for obj in decoded_objects:
-                try:
-                    data = self._decode_data(obj.data)
-                    if data and data not in seen_data:
-                        seen_data.add(data)
-                        rect = obj.rect
-                        all_results.append({
-                            'data': data,
-                            'type': obj.type,
-                            'rect': (rect.left, rect.top, rect.width, rect.height)
-                        })
-                except Exception:
-                    continue
-            
-            if all_results:
-                return all_results
-        except Exception:
-            pass
-        
-        # 3. 预处理图像并尝试多种方法
-        preprocessed_images = self.preprocess_for_artistic_qr(frame)
-        
-        # 4. 对每种预处理方法尝试识别
-        for processed_img in preprocessed_images:
-            try:
-                decoded_objects = decode(processed_img)
-                
-                for obj in decoded_objects:
-                    try:
-                        data = self._decode_data(obj.data)
-                        
-                        if data and data not in seen_data:
-                            seen_data.add(data)
-                            rect = obj.rect
-                            all_results.append({
-                                'data': data,
-                                'type': obj.type,
-                                'rect': (rect.left, rect.top, rect.width, rect.height)
-                            })
-                    except Exception:
-                        continue
-                
-                # 如果识别到结果，可以提前结束
-                if all_results:
-                    break
-                    
-            except Exception:
-                continue
-        
-        return all_results
-    
-    def _decode_data(self, raw_data):
-        """解码二维码数据 - 支持多种编码"""
-        if not raw_data:
-            return None
-        
-        # 尝试多种编码
-        encodings = ['utf-8', 'gbk', 'gb2312', 'big5', 'shift_jis', 'euc-jp', 'latin-1', 'ascii']
-        
-        for encoding in encodings:
-            try:
-                return raw_data.decode(encoding)
-            except (UnicodeDecodeError, LookupError):
-                continue
-        
-        # 如果都失败，使用utf-8带错误忽略
-        try:
-            return raw_data.decode('utf-8', errors='ignore')
-        except:
-            return str(raw_data) if raw_data else None
-        
-    def scan_image_file(self, image_path):
-        """增强图片文件扫描 - 支持各种格式、异形和难识别二维码"""
-        try:
-            # 尝试多种方式读取图片
-            img = None
-            
-            # 方法1: OpenCV直接读取
-            img = cv2.imread(image_path)
-            
-            # 方法2: 如果OpenCV失败，使用PIL
-            if img is None:
-                try:
-                    pil_img = PILImage.open(image_path)
-                    # 转换为RGB（处理RGBA等格式）
-                    if pil_img.mode != 'RGB':
-                        pil_img = pil_img.convert('RGB')
-                    img = np.array(pil_img)
-                    # RGB转BGR（OpenCV格式）
-                    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-                except Exception as e:
-                    print(f"PIL读取失败: {e}")
-            
-            if img is None:
-                print(f"无法读取图片: {image_path}")
-                return []
-            
-            # 先尝试直接扫描
-            results = self.scan_frame(img)
-            if results:
-                return results
-            
-            # 如果失败，尝试旋转图片（有些二维码是倾斜的）
-            for angle in [90, 180, 270]:
-                try:
-                    height, width = img.shape[:2]
-                    center = (width // 2, height // 2)
-                    rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-                    rotated = cv2.warpAffine(img, rotation_matrix, (width, height))
-                    results = self.scan_frame(rotated)
-                    if results:
-                        return results
-                except Exception as e:
-                    continue
-            
-            # 尝试裁剪不同区域（对局部二维码有效）
-            height, width = img.shape[:2]
-            crops = [
-                (0, 0, width, height),  # 全图
-                (0, 0, width//2, height//2),  # 左上
-                (width//2, 0, width, height//2),  # 右上
-                (0, height//2, width//2, height),  # 左下
-                (width//2, height//2, width, height),  # 右下
-                (width//4, height//4, width*3//4, height*3//4),  # 中心
-            ]
-            
-            for x1, y1, x2, y2 in crops:
-                try:
-                    cropped = img[y1:y2, x1:x2]
-                    if cropped.size > 0:
-                        results = self.scan_frame(cropped)
-                        if results:
-                            return results
-                except Exception as e:
-                    continue
-            
-            # 尝试水平翻转（有些二维码是镜像的）
-            try:
-                flipped = cv2.flip(img, 1)
-                results = self.scan_frame(flipped)
-                if results:
-                    return results
-            except Exception:
-                pass
-            
-            # 尝试垂直翻转
-            try:
-                flipped = cv2.flip(img, 0)
-                results = self.scan_frame(flipped)
-                if results:
-                    return results
-            except Exception:
-                pass
-            
-            return []
-            
-        except Exception as e:
-            print(f"扫描图片失败: {e}")
-            return []
+
+def __getattr__(name):
+    """保持 from 二维码扫描器 import QRCodeScanner 等旧用法可用：第一次访问时从扫描核心取"""
+    import 扫描核心
+    if name not in 扫描核心.__all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(扫描核心, name)
 
 
 # ============================================================
@@ -949,7 +393,7 @@ class ModernButton(Button):
     """现代化按钮 - 固定大小"""
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.font_name = FONT_NAME
+        self.font_name = get_font_name()
         self.background_normal = ''
         self.background_color = COLORS['primary']
         self.color = (1, 1, 1, 1)
@@ -996,7 +440,7 @@ class SecurityIndicator(BoxLayout):
         # 安全等级文字
         self.level_label = Label(
             text='安全检测中...',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(13),
             halign='left',
             valign='middle',
@@ -1010,7 +454,7 @@ class SecurityIndicator(BoxLayout):
         self.info_btn = Button(
             text='[?] 安全评估说明',
             markup=True,
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(10),
             halign='right',
             valign='middle',
@@ -1027,7 +471,7 @@ class SecurityIndicator(BoxLayout):
         # 小字说明
         self.hint_label = Label(
             text='百分比越小越安全，超过60%不建议跳转',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(9),
             color=COLORS['text_secondary'],
             size_hint_y=None,
@@ -1067,7 +511,7 @@ class SecurityIndicator(BoxLayout):
         title_label = Label(
             text='[b]安全评估说明[/b]',
             markup=True,
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(22),
             color=COLORS['primary'],
             size_hint_y=None,
@@ -1108,7 +552,7 @@ class SecurityIndicator(BoxLayout):
 • 遇到可疑链接及时关闭
             ''',
             markup=True,
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(16),
             color=COLORS['text_primary'],
             size_hint_y=None,
@@ -1165,7 +609,7 @@ class CameraPreview(RelativeLayout):
         # 二维码信息标签（浮动在图像上方）- 固定大小
         self.qr_label = Label(
             text='',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(11),
             size_hint=(None, None),
             size=(dp(300), dp(30)),
@@ -1180,7 +624,7 @@ class CameraPreview(RelativeLayout):
         # 扫描状态标签 - 固定大小
         self.status_label = Label(
             text='点击"开始扫描"启动摄像头',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(12),
             size_hint=(1, None),
             height=dp(30),
@@ -1194,6 +638,7 @@ class CameraPreview(RelativeLayout):
     def update_frame(self, frame, qr_results=None):
         """更新帧并显示二维码信息"""
         if frame is not None:
+            import cv2
             # 转换颜色空间
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             h, w = frame_rgb.shape[:2]
@@ -1240,10 +685,19 @@ class CameraPreview(RelativeLayout):
 # 第七部分：主界面
 # ============================================================
 
+# 实时扫描每帧的时间预算（毫秒），保证摄像头画面流畅（30fps约33ms一帧）
+LIVE_SCAN_DEADLINE_MS = 30
+# 实时扫描的清晰度门限，低于该值的模糊帧不进入识别级联
+LIVE_MIN_SHARPNESS = 15
+# 图片扫描的时间预算（毫秒），避免大图长时间卡住界面
+IMAGE_SCAN_DEADLINE_MS = 5000
+
+
 class MainScreen(BoxLayout):
     """主界面 - 优化布局"""
     
-    def __init__(self, **kwargs):
+    def __init__(self, data_dir=None, **kwargs):
+        from 扫描核心 import QRCodeScanner, QRCodeTracker, VerdictCache, PreprocessGraph
         super().__init__(**kwargs)
         self.orientation = 'vertical'
         self.padding = dp(12)
@@ -1255,7 +709,30 @@ class MainScreen(BoxLayout):
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self.update_bg, size=self.update_bg)
         
-        self.scanner = QRCodeScanner()
+        # 预处理策略统计保存在应用数据目录，下次启动时继续使用
+        stats_path = os.path.join(data_dir, 'strategy_stats.json') if data_dir else None
+        # 相册图片的识别结果按内容缓存，同一张图片再次选择时直接显示结果
+        result_cache = os.path.join(data_dir, 'scan_cache.db') if data_dir else None
+        # 应用数据目录中有 preprocess_graph.json 时使用自定义的预处理图（配置无效时使用内置配置）
+        preprocess_graph = None
+        graph_path = os.path.join(data_dir, 'preprocess_graph.json') if data_dir else None
+        if graph_path and os.path.exists(graph_path):
+            try:
+                preprocess_graph = PreprocessGraph.from_config(graph_path)
+                print(f"[*] 使用自定义预处理图: {graph_path}")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[!] 预处理图配置无效，使用内置配置: {e}")
+        self.scanner = QRCodeScanner(stats_path=stats_path, skip_similar_frames=True,
+                                     min_sharpness=LIVE_MIN_SHARPNESS, result_cache=result_cache,
+                                     preprocess_graph=preprocess_graph)
+        # find_spec 只能检查pyzbar是否已安装：启动时就加载识别库，缺少zbar动态库时立即报告，
+        # 而不是在第一帧摄像头画面识别时崩溃
+        self.scanner.load_backends()
+        # 实时扫描时追踪已识别的二维码，只在追踪区域做识别确认
+        self.tracker = QRCodeTracker(self.scanner, full_scan_deadline_ms=LIVE_SCAN_DEADLINE_MS)
+        # 安全检测结论缓存（两个二维码交替出现时不必反复检测）
+        cache_path = os.path.join(data_dir, 'verdict_cache.db') if data_dir else None
+        self.verdict_cache = VerdictCache(disk_path=cache_path)
         self.is_scanning = False
         self.scan_event = None
         
@@ -1282,7 +759,7 @@ class MainScreen(BoxLayout):
         title = Label(
             text='[b]二维码安全扫描器[/b]',
             markup=True,
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(18),
             color=COLORS['primary'],
             halign='center'
@@ -1296,7 +773,7 @@ class MainScreen(BoxLayout):
         
         security_text = Label(
             text='安全防护已开启 | 仅提取内容，不会自动跳转',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(12),
             color=COLORS['text_secondary'],
             halign='center',
@@ -1326,7 +803,7 @@ class MainScreen(BoxLayout):
         
         result_title = Label(
             text='识别结果',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(12),
             color=COLORS['text_secondary'],
             size_hint=(1, None),
@@ -1338,7 +815,7 @@ class MainScreen(BoxLayout):
         
         self.result_label = Label(
             text='请将二维码对准摄像头',
-            font_name=FONT_NAME,
+            font_name=get_font_name(),
             font_size=dp(13),
             size_hint=(1, 1),
             halign='center',
@@ -1432,6 +909,7 @@ class MainScreen(BoxLayout):
             self.scan_event.cancel()
             self.scan_event = None
         self.scanner.stop_camera()
+        self.tracker.reset()
         self.scan_btn.text = '▶ 开始扫描'
         self.scan_btn.background_color = COLORS['secondary']
         self.preview.set_status('扫描已停止')
@@ -1442,7 +920,7 @@ class MainScreen(BoxLayout):
         frame = self.scanner.get_frame()
         if frame is not None:
             # 扫描二维码
-            results = self.scanner.scan_frame(frame)
+            results = self.tracker.update(frame)
             
             # 更新预览（带追踪显示）
             self.preview.update_frame(frame, results)
@@ -1469,14 +947,14 @@ class MainScreen(BoxLayout):
         # 首先检测是否为链接
         if data.startswith(('http://', 'https://', 'ftp://', 'file://')):
             # 链接安全检测
-            level, percentage, detail, color = URLSecurityChecker.check_url(data)
+            level, percentage, detail, color = self.verdict_cache.check_url(data)
             self.security_indicator.update_security(level, percentage, detail, color)
             
             # 显示完整内容（不截断）
             self.result_label.text = f"[b]链接内容：[/b]\n{data}\n\n[b]安全状态：[/b]{detail}"
         else:
             # 文本内容安全检测
-            is_safe, violation_type, detail, color = ContentSafetyChecker.check_content(data)
+            is_safe, violation_type, detail, color = self.verdict_cache.check_content(data)
             
             if is_safe:
                 self.security_indicator.update_security('text_safe', 0, detail, color)
@@ -1497,7 +975,7 @@ class MainScreen(BoxLayout):
         
         filechooser = FileChooserListView(
             path=os.path.expanduser('~'),
-            filters=['*.png', '*.jpg', '*.jpeg', '*.bmp', '*.gif']
+            filters=['*.png', '*.jpg', '*.jpeg', '*.bmp', '*.gif', '*.tif', '*.tiff', '*.webp']
         )
         content.add_widget(filechooser)
         
@@ -1524,7 +1002,7 @@ class MainScreen(BoxLayout):
         
     def scan_image(self, path):
         """扫描图片"""
-        results = self.scanner.scan_image_file(path)
+        results = self.scanner.scan_image_file(path, deadline_ms=IMAGE_SCAN_DEADLINE_MS)
         
         if results:
             result = results[0]
@@ -1533,7 +1011,13 @@ class MainScreen(BoxLayout):
             
             # 使用统一的内容分析方法
             self.analyze_content(data)
-            self.preview.set_status('图片扫描成功')
+            if result.get('page'):
+                self.preview.set_status(f"图片扫描成功（第{result['page'] + 1}页）")
+            else:
+                self.preview.set_status('图片扫描成功')
+        elif results.truncated:
+            self.result_label.text = '扫描超时，未检测到二维码'
+            self.preview.set_status('扫描超时，请尝试更清晰的图片', COLORS['accent'])
         else:
             self.result_label.text = '未检测到二维码'
             self.preview.set_status('未检测到二维码', COLORS['accent'])
@@ -1541,6 +1025,7 @@ class MainScreen(BoxLayout):
     def copy_result(self, instance):
         """复制结果 - 复制完整内容"""
         # 优先使用当前分析的数据（完整内容）
+        from kivy.core.clipboard import Clipboard
         if hasattr(self, 'current_data') and self.current_data:
             Clipboard.copy(self.current_data)
             self.preview.set_status('内容已复制到剪贴板')
@@ -1571,15 +1056,24 @@ class QRScannerApp(App):
     """二维码扫描器应用"""
     
     def build(self):
+        from kivy.core.window import Window
+        # 字体查找结果缓存在应用数据目录，第一个控件创建时才查找/注册字体
+        configure_fonts(self.user_data_dir)
         self.title = '二维码安全扫描器'
         Window.size = (500, 800)
         Window.clearcolor = COLORS['background']
         
-        return MainScreen()
+        try:
+            self.main_screen = MainScreen(data_dir=self.user_data_dir)
+        except ImportError as e:
+            exit_missing_libs(e)
+        return self.main_screen
         
     def on_stop(self):
         """应用关闭时清理"""
-        pass
+        # 释放扫描器资源并保存预处理策略统计
+        self.main_screen.scanner.close()
+        self.main_screen.verdict_cache.close()
 
 
 if __name__ == '__main__':
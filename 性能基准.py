@@ -0,0 +1,1087 @@
+# -*- coding: utf-8 -*-
+"""
+二维码扫描器 - 性能基准测试
+
+用法：
+    python 性能基准.py cascade                  # 使用内置合成的难识别二维码样本
+    python 性能基准.py cascade --corpus 图片目录  # 使用自己的样本图片
+    python 性能基准.py cascade --repeat 5
+    python 性能基准.py profile --json profile.json
+    python 性能基准.py profile --graph 预处理图.json
+    python 性能基准.py graph --export 预处理图.json
+    python 性能基准.py parallel --workers 8
+    python 性能基准.py parallel --graph 预处理图.json
+    python 性能基准.py symbology
+    python 性能基准.py backends --corpus 图片目录
+    python 性能基准.py pyramid
+    python 性能基准.py memory --frames 50
+    python 性能基准.py image --corpus 图片目录
+    python 性能基准.py load --corpus 照片目录
+    python 性能基准.py cache --corpus 图片目录
+    python 性能基准.py tiles --tile-size 1024 --overlap 256
+    python 性能基准.py batch --images 400 --workers 1 2 4 8
+    python 性能基准.py video --video 录像.mp4 --workers 1 8
+    python 性能基准.py startup
+
+cascade: 对比预处理级联"一次性全部生成"（旧实现）与"惰性逐个生成"（新实现）
+         的单帧扫描延迟
+profile: 开启扫描器性能剖析，输出每个阶段/每种预处理策略的 p50/p95/p99，
+         以及预处理图中每个节点的耗时
+graph: 导出默认的预处理图配置（JSON），修改后可用 profile/cascade/parallel --graph 测试
+parallel: 对比顺序级联与线程池并行竞速的单帧扫描延迟
+symbology: 各码制预设下单次 decode() 调用的耗时，以及整帧级联的耗时
+backends: 各识别后端（pyzbar / OpenCV）的吞吐量和识别率
+pyramid: 对比大图的图像金字塔从粗到细识别与整图独立缩放策略的单帧延迟
+memory: 摄像头稳定扫描时每帧的内存分配（tracemalloc）和进程常驻内存（RSS），
+        对比复用缓冲区与每帧新分配
+image: 对比 scan_image_file 旧的固定尝试序列（12次整帧扫描）与搜索计划的单张图片耗时，
+       重点是无法识别的图片（最坏情况）
+load: 图片读取：cv2.imread 彩色原图 vs 直接解码成灰度 vs 降分辨率解码的耗时和内存峰值，
+      以及 scan_image_file 整体（JPEG大图先降分辨率识别）的耗时
+cache: 识别结果缓存（按图片内容）：首次扫描、重复扫描和改名/移动后扫描的耗时
+tiles: 超大图（A3扫描件/4800万像素照片）上的小码：整图识别 vs 分块扫描的识别数、耗时和内存峰值
+batch: 批量扫描（批量扫描.py）在不同进程数下的吞吐量和线性加速效率
+startup: 在新进程中测量导入扫描核心/界面模块的耗时，以及从进程启动到第一次识别完成的时间，
+         并列出每个场景实际加载了哪些重型库（只用安全检测时不应加载OpenCV）
+video: 视频文件扫描：逐帧识别 vs 自适应采样（不同线程数）的耗时、相对实时的倍数和首末时间精度
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode
+
+from 扫描核心 import QRCodeScanner, SYMBOLOGY_PRESETS, DECODER_BACKENDS
+
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+
+
+# ============================================================
+# 样本集
+# ============================================================
+
+def _make_qr(text, module_px=6, border=4):
+    """生成一张干净的二维码灰度图"""
+    encoder = cv2.QRCodeEncoder.create()
+    qr = encoder.encode(text)
+    qr = cv2.resize(qr, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+    pad = module_px * border
+    return cv2.copyMakeBorder(qr, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+
+
+def _on_canvas(code, size=(480, 640), offset=(60, 80)):
+    """把二维码贴到一张灰色背景上（模拟摄像头画面）"""
+    canvas = np.full(size, 200, np.uint8)
+    y, x = offset
+    h, w = code.shape
+    canvas[y:y + h, x:x + w] = code
+    return canvas
+
+
+def synthetic_corpus(seed=0):
+    """
+    合成一组难识别的二维码样本
+    返回: [(名称, BGR图像), ...]
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+    code = _make_qr('https://example.com/label/0001')
+
+    # 低对比度
+    low = _on_canvas(code)
+    low = (low.astype(np.float32) * 0.25 + 110).astype(np.uint8)
+    samples.append(('low_contrast', low))
+
+    # 不均匀光照
+    uneven = _on_canvas(code).astype(np.float32)
+    gradient = np.linspace(0.3, 1.2, uneven.shape[1], dtype=np.float32)
+    uneven = np.clip(uneven * gradient[None, :], 0, 255).astype(np.uint8)
+    samples.append(('uneven_light', uneven))
+
+    # 高斯噪声
+    noisy = _on_canvas(code).astype(np.int16)
+    noisy += rng.normal(0, 45, noisy.shape).astype(np.int16)
+    samples.append(('noisy', np.clip(noisy, 0, 255).astype(np.uint8)))
+
+    # 轻微模糊
+    samples.append(('blurred', cv2.GaussianBlur(_on_canvas(code), (7, 7), 2.5)))
+
+    # 反色
+    samples.append(('inverted', cv2.bitwise_not(_on_canvas(code))))
+
+    # 小尺寸
+    samples.append(('tiny', _make_qr('tiny', module_px=2)))
+
+    # 1080p大图中的小尺寸低对比度二维码
+    large = _on_canvas(_make_qr('https://example.com/label/1080p', module_px=4),
+                       size=(1080, 1920), offset=(700, 1300))
+    large = (large.astype(np.float32) * 0.3 + 100).astype(np.uint8)
+    samples.append(('large_1080p', large))
+
+    # 无二维码（最坏情况：整个级联都会跑完）
+    samples.append(('no_code', rng.integers(0, 255, (480, 640), dtype=np.uint8)))
+
+    return [(name, cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)) for name, img in samples]
+
+
+def load_corpus(corpus_dir):
+    """读取目录中的样本图片"""
+    samples = []
+    for root, _, files in os.walk(corpus_dir):
+        for filename in sorted(files):
+            if filename.lower().endswith(IMAGE_EXTS):
+                path = os.path.join(root, filename)
+                img = cv2.imread(path)
+                if img is not None:
+                    samples.append((os.path.relpath(path, corpus_dir), img))
+    return samples
+
+
+# ============================================================
+# 计时工具
+# ============================================================
+
+def time_call(func, repeat):
+    """多次调用并返回 (每次耗时毫秒列表, 最后一次返回值)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def print_table(headers, rows):
+    """打印对齐的表格"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
+
+
+# ============================================================
+# cascade: 一次性预处理 vs 惰性预处理
+# ============================================================
+
+def scan_frame_eager(scanner, frame):
+    """旧实现：先生成全部预处理图像，再逐个识别"""
+    seen_data = set()
+    results = []
+    scanner._collect_results(decode(frame), seen_data, results)
+    if results:
+        return results
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else frame
+    scanner._collect_results(decode(gray), seen_data, results)
+    if results:
+        return results
+    for processed in scanner.preprocess_for_artistic_qr(frame):
+        scanner._collect_results(decode(processed), seen_data, results)
+        if results:
+            break
+    return results
+
+
+def bench_cascade(args):
+    samples = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+
+    scanner = QRCodeScanner(preprocess_graph=args.graph)
+    rows = []
+    eager_all, lazy_all = [], []
+
+    for name, frame in samples:
+        eager, eager_result = time_call(lambda: scan_frame_eager(scanner, frame), args.repeat)
+        lazy, lazy_result = time_call(lambda: scanner.scan_frame(frame), args.repeat)
+        eager_ms = statistics.median(eager)
+        lazy_ms = statistics.median(lazy)
+        eager_all.append(eager_ms)
+        lazy_all.append(lazy_ms)
+        rows.append((
+            name,
+            '是' if lazy_result else '否',
+            f'{eager_ms:.1f}',
+            f'{lazy_ms:.1f}',
+            f'{eager_ms / lazy_ms:.2f}x' if lazy_ms else '-',
+        ))
+
+    print_table(['样本', '识别', '一次性(ms)', '惰性(ms)', '加速'], rows)
+    print()
+    print(f'平均单帧延迟: 一次性 {statistics.mean(eager_all):.1f} ms, '
+          f'惰性 {statistics.mean(lazy_all):.1f} ms')
+    return 0
+
+
+# ============================================================
+# profile: 各阶段耗时分布
+# ============================================================
+
+def bench_profile(args):
+    samples = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+
+    scanner = QRCodeScanner(preprocess_graph=args.graph)
+    profiler = scanner.enable_profiling()
+    for _ in range(args.repeat):
+        for _, frame in samples:
+            scanner.scan_frame(frame)
+
+    rows = []
+    for stage, stats in profiler.report().items():
+        rows.append((
+            stage,
+            stats['calls'],
+            stats['hits'],
+            f"{stats['p50_ms']:.2f}",
+            f"{stats['p95_ms']:.2f}",
+            f"{stats['p99_ms']:.2f}",
+        ))
+    print_table(['阶段', '次数', '命中', 'p50(ms)', 'p95(ms)', 'p99(ms)'], rows)
+
+    # 预处理图节点耗时（共用的中间结果每帧只计算一次）
+    rows = []
+    for node, stats in scanner.preprocess_graph.report().items():
+        rows.append((
+            node,
+            stats['op'],
+            stats['calls'],
+            stats['skipped'],
+            f"{stats['total_ms']:.1f}",
+            f"{stats['mean_ms']:.2f}",
+        ))
+    if rows:
+        print()
+        print_table(['节点', '操作', '次数', '不适用', '累计(ms)', '平均(ms)'], rows)
+
+    if args.json:
+        profiler.dump_json(args.json)
+        print(f'\n已写入 {args.json}')
+    return 0
+
+
+# ============================================================
+# parallel: 顺序级联 vs 并行竞速
+# ============================================================
+
+def bench_parallel(args):
+    samples = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+
+    # 关闭自适应排序，两种模式按相同的固定顺序尝试，结果才可比
+    sequential = QRCodeScanner(adaptive_order=False, preprocess_graph=args.graph)
+    parallel = QRCodeScanner(adaptive_order=False, parallel_workers=args.workers, preprocess_graph=args.graph)
+    rows = []
+    seq_all, par_all = [], []
+    try:
+        for name, frame in samples:
+            seq, seq_result = time_call(lambda: sequential.scan_frame(frame), args.repeat)
+            par, par_result = time_call(lambda: parallel.scan_frame(frame), args.repeat)
+            seq_ms = statistics.median(seq)
+            par_ms = statistics.median(par)
+            seq_all.append(seq_ms)
+            par_all.append(par_ms)
+            rows.append((
+                name,
+                '是' if seq_result else '否',
+                '是' if par_result else '否',
+                f'{seq_ms:.1f}',
+                f'{par_ms:.1f}',
+                f'{seq_ms / par_ms:.2f}x' if par_ms else '-',
+            ))
+    finally:
+        parallel.close()
+
+    print_table(['样本', '顺序识别', '并行识别', '顺序(ms)', f'并行x{args.workers}(ms)', '加速'], rows)
+    print()
+    print(f'平均单帧延迟: 顺序 {statistics.mean(seq_all):.1f} ms, '
+          f'并行 {statistics.mean(par_all):.1f} ms')
+    return 0
+
+
+# ============================================================
+# symbology: 码制预设对识别调用耗时的影响
+# ============================================================
+
+def bench_symbology(args):
+    samples = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+    grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for _, frame in samples]
+
+    rows = []
+    baseline_call = baseline_frame = None
+    for preset in SYMBOLOGY_PRESETS:
+        scanner = QRCodeScanner(adaptive_order=False, symbology=preset)
+        # 单次decode()调用：对每张灰度图直接识别
+        call_timings = []
+        for gray in grays:
+            timings, _ = time_call(lambda: scanner._decode(gray), args.repeat)
+            call_timings.append(statistics.median(timings))
+        # 整帧级联（未命中时会调用约24次decode()）
+        frame_timings = []
+        found = 0
+        for _, frame in samples:
+            timings, result = time_call(lambda: scanner.scan_frame(frame), args.repeat)
+            frame_timings.append(statistics.median(timings))
+            found += 1 if result else 0
+
+        call_ms = statistics.mean(call_timings)
+        frame_ms = statistics.mean(frame_timings)
+        if baseline_call is None:
+            baseline_call, baseline_frame = call_ms, frame_ms
+        rows.append((
+            preset,
+            f'{found}/{len(samples)}',
+            f'{call_ms * 1000:.0f}',
+            f'{baseline_call / call_ms:.2f}x' if call_ms else '-',
+            f'{frame_ms:.1f}',
+            f'{baseline_frame / frame_ms:.2f}x' if frame_ms else '-',
+        ))
+
+    print_table(['预设', '识别', '单次decode(us)', '相对all', '整帧(ms)', '相对all'], rows)
+    return 0
+
+
+# ============================================================
+# backends: 识别后端对比
+# ============================================================
+
+def bench_backends(args):
+    samples = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+    names = args.backend or list(DECODER_BACKENDS)
+
+    rows = []
+    for name in names:
+        scanner = QRCodeScanner(adaptive_order=False, backend=name)
+        # 单次识别：只调用后端识别原图一次
+        start = time.perf_counter()
+        raw_found = 0
+        for _ in range(args.repeat):
+            raw_found = sum(1 for _, frame in samples if scanner.backend.decode(frame))
+        raw_seconds = (time.perf_counter() - start) / args.repeat
+        # 完整扫描：原图、灰度图和预处理级联都使用该后端
+        start = time.perf_counter()
+        full_found = 0
+        for _ in range(args.repeat):
+            full_found = sum(1 for _, frame in samples if scanner.scan_frame(frame))
+        full_seconds = (time.perf_counter() - start) / args.repeat
+
+        rows.append((
+            name,
+            f'{raw_found}/{len(samples)}',
+            f'{len(samples) / raw_seconds:.1f}' if raw_seconds else '-',
+            f'{full_found}/{len(samples)}',
+            f'{len(samples) / full_seconds:.1f}' if full_seconds else '-',
+        ))
+
+    print_table(['后端', '单次识别率', '单次(张/秒)', '完整识别率', '完整(张/秒)'], rows)
+    return 0
+
+
+def bench_graph(args):
+    graph = QRCodeScanner(preprocess_graph=args.graph).preprocess_graph
+    config = json.dumps(graph.to_config(), ensure_ascii=False, indent=2)
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as f:
+            f.write(config)
+        print(f'已写入 {args.export}（{len(graph.nodes)} 个节点，{len(graph.variants)} 个识别变体）')
+    else:
+        print(config)
+    return 0
+
+
+# ============================================================
+# pyramid: 图像金字塔 vs 整图独立缩放
+# ============================================================
+
+def large_corpus(seed=0):
+    """
+    合成一组高分辨率样本（手机拍照、文档扫描）
+    返回: [(名称, BGR图像), ...]
+    """
+    rng = np.random.default_rng(seed)
+    samples = []
+
+    # 1200万像素照片中的大码
+    big = _on_canvas(_make_qr('https://example.com/photo/big', module_px=40),
+                     size=(3000, 4000), offset=(600, 1200))
+    samples.append(('12mp_big_code', big))
+
+    # 1200万像素照片中的小码（低对比度）
+    small = _on_canvas(_make_qr('https://example.com/photo/small', module_px=8),
+                       size=(3000, 4000), offset=(2000, 2800))
+    small = (small.astype(np.float32) * 0.35 + 100).astype(np.uint8)
+    samples.append(('12mp_small_code', small))
+
+    # 1080p画面中的中等尺寸码
+    samples.append(('1080p_code', _on_canvas(_make_qr('https://example.com/frame', module_px=10),
+                                             size=(1080, 1920), offset=(300, 700))))
+
+    # 无二维码的大图（最坏情况）
+    noise = rng.integers(0, 255, (750, 1000), dtype=np.uint8)
+    samples.append(('12mp_no_code', cv2.resize(noise, (4000, 3000), interpolation=cv2.INTER_LINEAR)))
+
+    return [(name, cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)) for name, img in samples]
+
+
+def bench_pyramid(args):
+    samples = load_corpus(args.corpus) if args.corpus else large_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+
+    flat = QRCodeScanner(adaptive_order=False, pyramid=False)
+    pyramid = QRCodeScanner(adaptive_order=False, pyramid=True)
+    rows = []
+    for name, frame in samples:
+        flat_timings, flat_result = time_call(lambda: flat.scan_frame(frame), args.repeat)
+        pyr_timings, pyr_result = time_call(lambda: pyramid.scan_frame(frame), args.repeat)
+        flat_ms = statistics.median(flat_timings)
+        pyr_ms = statistics.median(pyr_timings)
+        rows.append((
+            name,
+            f'{frame.shape[1]}x{frame.shape[0]}',
+            '是' if flat_result else '否',
+            '是' if pyr_result else '否',
+            f'{flat_ms:.1f}',
+            f'{pyr_ms:.1f}',
+            f'{flat_ms / pyr_ms:.2f}x' if pyr_ms else '-',
+        ))
+
+    print_table(['样本', '尺寸', '整图识别', '金字塔识别', '整图(ms)', '金字塔(ms)', '加速'], rows)
+    return 0
+
+
+# ============================================================
+# memory: 缓冲区复用对每帧内存分配的影响
+# ============================================================
+
+def current_rss():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Linux为KB，macOS为字节（这里只作近似的峰值参考）
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+def camera_frames(count, seed=0):
+    """合成一段摄像头画面：固定场景加逐帧的传感器噪声（无二维码，每帧都会跑完整个级联）"""
+    rng = np.random.default_rng(seed)
+    scene = cv2.GaussianBlur(rng.integers(0, 255, (480, 640), dtype=np.uint8), (9, 9), 3)
+    for _ in range(count):
+        noise = rng.integers(-6, 7, scene.shape, dtype=np.int16)
+        frame = np.clip(scene.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        yield cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def measure_memory(scanner, frames, warmup):
+    """稳定扫描：预热后逐帧记录 tracemalloc 峰值（本帧新分配的内存）和耗时"""
+    for frame in frames[:warmup]:
+        scanner.scan_frame(frame)
+
+    rss_before = current_rss()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    peaks, timings = [], []
+    for frame in frames[warmup:]:
+        tracemalloc.reset_peak()
+        start_current, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        scanner.scan_frame(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - start_current)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = current_rss()
+    return {
+        'peak_kb': statistics.mean(peaks) / 1024,
+        'max_peak_kb': max(peaks) / 1024,
+        'growth_kb': (current - base) / 1024,
+        'rss_mb': rss_after / 1024 / 1024 if rss_after else None,
+        'rss_growth_mb': (rss_after - rss_before) / 1024 / 1024 if rss_after and rss_before else None,
+        'ms': statistics.median(timings),
+    }
+
+
+def bench_memory(args):
+    frames = list(camera_frames(args.frames + args.warmup))
+    rows = []
+    for label, reuse in (('每帧新分配', False), ('复用缓冲区', True)):
+        # 关闭相似帧复用和清晰度门限，每一帧都完整扫描
+        scanner = QRCodeScanner(adaptive_order=False, reuse_buffers=reuse)
+        stats = measure_memory(scanner, frames, args.warmup)
+        buffers = scanner.preprocess_resources.stats()
+        rows.append((
+            label,
+            f"{stats['peak_kb']:.0f}",
+            f"{stats['max_peak_kb']:.0f}",
+            f"{stats['growth_kb']:.1f}",
+            f"{stats['rss_mb']:.1f}" if stats['rss_mb'] is not None else '-',
+            f"{stats['rss_growth_mb']:+.1f}" if stats['rss_growth_mb'] is not None else '-',
+            f"{buffers['buffers']} / {buffers['bytes'] / 1024:.0f}KB",
+            f"{stats['ms']:.1f}",
+        ))
+
+    print_table(['模式', '每帧分配峰值(KB)', '最大峰值(KB)', '累计增长(KB)', 'RSS(MB)', 'RSS增长(MB)',
+                 '缓冲区', '单帧(ms)'], rows)
+    print()
+    print('每帧分配峰值：tracemalloc 统计的单帧内新分配内存的峰值（含numpy/OpenCV输出数组）')
+    return 0
+
+
+# ============================================================
+# image: scan_image_file 搜索计划
+# ============================================================
+
+def scan_image_legacy(scanner, img):
+    """旧实现：原图、warpAffine旋转3次、6个裁剪（含全图）、2次翻转，每次都是完整的整帧扫描"""
+    results = scanner.scan_frame(img)
+    if results:
+        return results, 'original'
+    height, width = img.shape[:2]
+    for angle in (90, 180, 270):
+        matrix = cv2.getRotationMatrix2D((width // 2, height // 2), angle, 1.0)
+        results = scanner.scan_frame(cv2.warpAffine(img, matrix, (width, height)))
+        if results:
+            return results, f'rotate{angle}'
+    crops = [
+        ('crop_full', (0, 0, width, height)),
+        ('crop_top_left', (0, 0, width // 2, height // 2)),
+        ('crop_top_right', (width // 2, 0, width, height // 2)),
+        ('crop_bottom_left', (0, height // 2, width // 2, height)),
+        ('crop_bottom_right', (width // 2, height // 2, width, height)),
+        ('crop_center', (width // 4, height // 4, width * 3 // 4, height * 3 // 4)),
+    ]
+    for name, (x1, y1, x2, y2) in crops:
+        results = scanner.scan_frame(img[y1:y2, x1:x2])
+        if results:
+            return results, name
+    for name, code in (('flip_horizontal', 1), ('flip_vertical', 0)):
+        results = scanner.scan_frame(cv2.flip(img, code))
+        if results:
+            return results, name
+    return results, None
+
+
+def image_corpus(seed=0):
+    """合成图片样本：可识别的、只有镜像码的、无法识别的（最坏情况）"""
+    rng = np.random.default_rng(seed)
+    code = _make_qr('https://example.com/image/0001')
+    samples = [('readable', _on_canvas(code, size=(600, 900), offset=(100, 400)))]
+    mirrored = _on_canvas(cv2.flip(code, 1), size=(600, 900), offset=(100, 400))
+    samples.append(('mirrored', mirrored))
+    noise = cv2.GaussianBlur(rng.integers(0, 255, (600, 900), dtype=np.uint8), (5, 5), 1.5)
+    samples.append(('unreadable', noise))
+    return [(name, cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)) for name, img in samples]
+
+
+def bench_image(args):
+    samples = load_corpus(args.corpus) if args.corpus else image_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+
+    legacy = QRCodeScanner(adaptive_order=False)
+    planner = QRCodeScanner(adaptive_order=False)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, (name, img) in enumerate(samples):
+            path = os.path.join(tmp, f'{index}.png')
+            cv2.imwrite(path, img)
+            legacy_timings, (_, legacy_attempt) = time_call(
+                lambda: scan_image_legacy(legacy, cv2.imread(path)), args.repeat)
+            plan_timings, plan_result = time_call(lambda: planner.scan_image_file(path), args.repeat)
+            legacy_ms = statistics.median(legacy_timings)
+            plan_ms = statistics.median(plan_timings)
+            rows.append((
+                name,
+                legacy_attempt or '-',
+                plan_result.attempt or '-',
+                f'{legacy_ms:.1f}',
+                f'{plan_ms:.1f}',
+                f'{legacy_ms / plan_ms:.2f}x' if plan_ms else '-',
+            ))
+
+    print_table(['样本', '旧实现命中', '搜索计划命中', '旧实现(ms)', '搜索计划(ms)', '加速'], rows)
+    return 0
+
+
+# ============================================================
+# load: 图片读取（降分辨率/灰度解码）
+# ============================================================
+
+def _traced(func):
+    """运行 func，返回 (结果, 耗时ms, 内存峰值KB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024
+
+
+def bench_load(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = [os.path.join(args.corpus, name) for name in sorted(os.listdir(args.corpus))
+                     if name.lower().endswith(IMAGE_EXTS)]
+        else:
+            # 手机拍照的大图大多是JPEG
+            paths = []
+            for name, img in large_corpus():
+                path = os.path.join(tmp, f'{name}.jpg')
+                cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+                paths.append(path)
+        if not paths:
+            print('样本集为空')
+            return 1
+
+        scanner = QRCodeScanner(adaptive_order=False)
+        load_rows = []
+        scan_rows = []
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            factor = scanner.reduced_factor(path)
+            modes = [
+                ('imread 彩色原图（旧）', lambda: cv2.imread(path)),
+                ('灰度原图', lambda: scanner.load_image(path, grayscale=True)),
+            ]
+            if factor > 1:
+                modes.append((f'灰度 1/{factor}', lambda: scanner.load_image(path, grayscale=True, reduce=factor)))
+            for label, func in modes:
+                timings = []
+                for _ in range(args.repeat):
+                    img, elapsed, peak = _traced(func)
+                    timings.append(elapsed)
+                load_rows.append((name, label, f'{img.shape[1]}x{img.shape[0]}',
+                                  f'{statistics.median(timings):.1f}', f'{peak:.0f}'))
+
+            # 整个 scan_image_file：旧的读取方式（彩色原图 + 搜索计划） vs 新的读取层
+            (_, legacy_ms, legacy_peak) = _traced(lambda: scanner.scan_image(cv2.imread(path)))
+            (results, new_ms, new_peak) = _traced(lambda: scanner.scan_image_file(path))
+            scan_rows.append((name, results.attempt or '-', f'{legacy_ms:.0f}', f'{new_ms:.0f}',
+                              f'{legacy_ms / new_ms:.2f}x' if new_ms else '-',
+                              f'{legacy_peak:.0f}', f'{new_peak:.0f}'))
+
+    print_table(['样本', '读取方式', '尺寸', '耗时(ms)', '内存峰值(KB)'], load_rows)
+    print()
+    print_table(['样本', '命中', '旧读取+扫描(ms)', 'scan_image_file(ms)', '加速',
+                 '旧内存峰值(KB)', '新内存峰值(KB)'], scan_rows)
+    return 0
+
+
+# ============================================================
+# cache: 识别结果缓存
+# ============================================================
+
+def bench_cache(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = [os.path.join(args.corpus, name) for name in sorted(os.listdir(args.corpus))
+                     if name.lower().endswith(IMAGE_EXTS)]
+        else:
+            paths = []
+            for name, img in image_corpus() + synthetic_corpus():
+                path = os.path.join(tmp, f'{len(paths):03d}_{name}.png')
+                cv2.imwrite(path, img)
+                paths.append(path)
+        if not paths:
+            print('样本集为空')
+            return 1
+
+        cache_path = os.path.join(tmp, 'scan_cache.db')
+        scanner = QRCodeScanner(adaptive_order=False, result_cache=cache_path)
+        # 重排目录：同样的内容换个路径（缓存按内容命中）
+        moved_dir = os.path.join(tmp, 'moved')
+        os.makedirs(moved_dir)
+        moved = []
+        for path in paths:
+            target = os.path.join(moved_dir, 'renamed_' + os.path.basename(path))
+            with open(path, 'rb') as src, open(target, 'wb') as dst:
+                dst.write(src.read())
+            moved.append(target)
+
+        rows = []
+        for label, batch in (('首次扫描', paths), ('重复扫描', paths), ('改名/移动后', moved)):
+            start = time.perf_counter()
+            cached = found = 0
+            for path in batch:
+                results = scanner.scan_image_file(path, deadline_ms=args.deadline_ms)
+                cached += results.cached
+                found += bool(results)
+            elapsed = time.perf_counter() - start
+            rows.append((label, len(batch), found, cached, f'{elapsed * 1000:.0f}',
+                         f'{elapsed * 1000 / len(batch):.2f}'))
+        stats = scanner.result_cache.stats()
+        scanner.close()
+
+    print_table(['轮次', '图片数', '识别到', '缓存命中', '总耗时(ms)', '每张(ms)'], rows)
+    print()
+    print(f"缓存条目: {stats['entries']}，约 {stats['bytes'] / 1024:.1f} KB")
+    return 0
+
+
+# ============================================================
+# tiles: 超大图分块扫描
+# ============================================================
+
+def sheet_corpus():
+    """合成一张A3扫描件大小（600dpi约 7000x5000）的页面，散布若干小码（其中一个跨分块边界）"""
+    sheet = np.full((5000, 7000), 215, np.uint8)
+    positions = [(300, 400), (1020, 1000), (2000, 3000), (2600, 5200), (4400, 6300), (3900, 900)]
+    for index, (y, x) in enumerate(positions):
+        code = _make_qr(f'https://example.com/sheet/{index}', module_px=3, border=4)
+        h, w = code.shape
+        sheet[y:y + h, x:x + w] = code
+    return [('a3_sheet', sheet)], len(positions)
+
+
+def bench_tiles(args):
+    if args.corpus:
+        samples = [(name, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)) for name, img in load_corpus(args.corpus)]
+        expected = None
+    else:
+        samples, expected = sheet_corpus()
+    if not samples:
+        print('样本集为空')
+        return 1
+
+    scanner = QRCodeScanner(adaptive_order=False)
+    rows = []
+    for name, gray in samples:
+        modes = [
+            ('整图识别', lambda: scanner.scan_frame_multi(gray)),
+            (f'分块 {args.tile_size}/{args.overlap}',
+             lambda: scanner.scan_tiles(gray, args.tile_size, args.overlap, args.workers)),
+        ]
+        for label, func in modes:
+            tracemalloc.start()
+            start = time.perf_counter()
+            results = func()
+            elapsed = (time.perf_counter() - start) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append((
+                name,
+                label,
+                f'{len(results)}' + (f'/{expected}' if expected else ''),
+                f'{elapsed:.0f}',
+                f'{peak / 1024:.0f}',
+            ))
+
+    print_table(['样本', '模式', '识别数', '耗时(ms)', '内存峰值(KB)'], rows)
+    print()
+    print(f'图片尺寸: {samples[0][1].shape[1]}x{samples[0][1].shape[0]}（灰度图本身约 '
+          f'{samples[0][1].nbytes / 1024 / 1024:.1f} MB，不计入峰值）')
+    return 0
+
+
+# ============================================================
+# batch: 批量扫描吞吐量
+# ============================================================
+
+class _NullOutput:
+    """丢弃批量扫描的JSONL输出（只测吞吐量）"""
+
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+
+def bench_batch(args):
+    from 批量扫描 import iter_image_paths, run_batch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            inputs = [args.corpus]
+        else:
+            # 合成样本循环写入临时目录（可识别的和无二维码的都有）
+            samples = synthetic_corpus()
+            for index in range(args.images):
+                name, img = samples[index % len(samples)]
+                cv2.imwrite(os.path.join(tmp, f'{index:06d}_{name}.png'), img)
+            inputs = [tmp]
+
+        rows = []
+        baseline = None
+        for workers in args.workers:
+            stats = run_batch(iter_image_paths(inputs), _NullOutput(), workers=workers,
+                              deadline_ms=args.deadline_ms)
+            rate = stats['images'] / stats['seconds'] if stats['seconds'] else 0.0
+            if baseline is None:
+                baseline = rate / workers
+            rows.append((
+                workers,
+                stats['images'],
+                f"{stats['seconds']:.1f}",
+                f'{rate:.1f}',
+                f'{rate / baseline:.2f}x' if baseline else '-',
+                f'{rate / baseline / workers * 100:.0f}%' if baseline else '-',
+            ))
+
+    print_table(['进程数', '图片数', '耗时(秒)', '张/秒', '加速', '线性效率'], rows)
+    print()
+    print(f'CPU核心数: {os.cpu_count()}（进程数超过核心数时不会再加速）')
+    return 0
+
+
+# ============================================================
+# video: 视频文件扫描
+# ============================================================
+
+def conveyor_video(path, seconds=60, fps=25):
+    """合成一段传送带录像：灰色背景上的包裹二维码在几个时间段内出现，返回 {内容: (首次ms, 最后ms)}"""
+    size = (480, 640)
+    segments = [(f'PKG-{index:03d}', start, start + length)
+                for index, (start, length) in enumerate([(2.0, 1.5), (9.4, 0.8), (17.0, 4.0),
+                                                         (31.2, 2.2), (44.0, 6.0), (55.5, 1.0)])
+                if start + length <= seconds]
+    codes = {data: cv2.cvtColor(_make_qr(data, module_px=6), cv2.COLOR_GRAY2BGR) for data, _, _ in segments}
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (size[1], size[0]))
+    expected = {}
+    for index in range(int(seconds * fps)):
+        t = index / fps
+        frame = np.full(size + (3,), 120, np.uint8)
+        for data, start, end in segments:
+            if start <= t < end:
+                code = codes[data]
+                # 包裹沿传送带从左向右移动
+                x = int((t - start) / (end - start) * (size[1] - code.shape[1]))
+                frame[60:60 + code.shape[0], x:x + code.shape[1]] = code
+                first, _ = expected.get(data, (t * 1000, None))
+                expected[data] = (first, t * 1000)
+        writer.write(frame)
+    writer.release()
+    return expected
+
+
+def bench_video(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.video:
+            path, expected = args.video, None
+        else:
+            path = os.path.join(tmp, 'conveyor.avi')
+            expected = conveyor_video(path, args.seconds)
+
+        capture = cv2.VideoCapture(path)
+        fps = capture.get(cv2.CAP_PROP_FPS) or QRCodeScanner.VIDEO_DEFAULT_FPS
+        duration = capture.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+        capture.release()
+
+        # 步长1ms即逐帧识别（旧的做法：每一帧都识别，单线程）
+        modes = [('逐帧识别', 1, 1, 1)]
+        modes += [(f'自适应采样 {workers}线程', QRCodeScanner.VIDEO_MIN_STRIDE_MS,
+                   args.max_stride_ms, workers) for workers in args.workers]
+        rows = []
+        for label, min_stride, max_stride, workers in modes:
+            scanner = QRCodeScanner(adaptive_order=False)
+            profiler = scanner.enable_profiling()
+            start = time.perf_counter()
+            results = scanner.scan_video_file(path, min_stride_ms=min_stride, max_stride_ms=max_stride,
+                                              workers=workers)
+            elapsed = time.perf_counter() - start
+            found = f'{len(results)}' + (f'/{len(expected)}' if expected else '')
+            error = '-'
+            if expected:
+                # 首末时间与真实值的最大偏差
+                errors = [max(abs(entry['first_ms'] - expected[entry['data']][0]),
+                              abs(entry['last_ms'] - expected[entry['data']][1]))
+                          for entry in results if entry['data'] in expected]
+                error = f'{max(errors):.0f}' if errors else '-'
+            rows.append((label, profiler.stage_report('video.frame')['calls'], found, error,
+                         f'{elapsed:.1f}', f'{duration / elapsed:.1f}x'))
+
+    print_table(['模式', '识别帧数', '识别内容数', '首末时间最大偏差(ms)', '耗时(秒)', '相对实时'], rows)
+    print()
+    print(f'视频时长: {duration:.1f} 秒（{fps:.0f} fps），CPU核心数: {os.cpu_count()}')
+    return 0
+
+
+# ============================================================
+# startup: 导入耗时与启动到首次识别的时间
+# ============================================================
+
+# 各场景在新进程中执行的代码；子进程在完成时打印 time.time() 和已加载的重型库
+STARTUP_SCENARIOS = [
+    ('空解释器', ''),
+    ('安全检测', "from 扫描核心 import URLSecurityChecker\n"
+                "URLSecurityChecker.check_url('https://example.com/')"),
+    ('导入扫描引擎', "from 扫描核心 import QRCodeScanner"),
+    ('首次识别（摄像头帧）', "import cv2\nfrom 扫描核心 import QRCodeScanner\n"
+                      "QRCodeScanner().scan_frame(cv2.imread(IMAGE_PATH))"),
+    ('首次识别（图片文件）', "from 扫描核心 import QRCodeScanner\n"
+                      "QRCodeScanner().scan_image_file(IMAGE_PATH)"),
+    ('导入界面模块', "import 二维码扫描器"),
+]
+STARTUP_HEAVY_MODULES = ('cv2', 'numpy', 'pyzbar', 'PIL', 'kivy')
+
+
+def _startup_child_code(body, image_path):
+    return (f"IMAGE_PATH = {image_path!r}\n{body}\n"
+            "import sys, time, json\n"
+            f"print(json.dumps([time.time(), [name for name in {STARTUP_HEAVY_MODULES!r} "
+            "if name in sys.modules]]))\n")
+
+
+def bench_startup(args):
+    import subprocess
+    from importlib.util import find_spec
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, 'code.png')
+        cv2.imwrite(image_path, _on_canvas(_make_qr('https://example.com/startup')))
+        for label, body in STARTUP_SCENARIOS:
+            if 'import 二维码扫描器' in body and find_spec('kivy') is None:
+                continue
+            code = _startup_child_code(body, image_path)
+            timings = []
+            loaded = []
+            for _ in range(args.repeat):
+                start = time.time()
+                completed = subprocess.run([sys.executable, '-c', code], cwd=root,
+                                           capture_output=True, text=True)
+                if completed.returncode != 0:
+                    print(f'{label} 运行失败:\n{completed.stderr.strip()}')
+                    break
+                finished, loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+                timings.append((finished - start) * 1000)
+            if timings:
+                rows.append((label, f'{statistics.median(timings):.0f}', f'{min(timings):.0f}',
+                             ', '.join(loaded) or '-'))
+
+    print_table(['场景', '启动到完成 中位数(ms)', '最快(ms)', '已加载的重型库'], rows)
+    print()
+    print('每个场景在新进程中运行，时间从启动进程算起（包括解释器启动）')
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='二维码扫描器性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    cascade = subparsers.add_parser('cascade', help='一次性预处理 vs 惰性预处理')
+    cascade.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    cascade.add_argument('--repeat', type=int, default=3, help='每个样本重复次数')
+    cascade.add_argument('--graph', help='预处理图配置文件（默认使用内置配置）')
+    cascade.set_defaults(func=bench_cascade)
+
+    profile = subparsers.add_parser('profile', help='各阶段耗时分布（p50/p95/p99）')
+    profile.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    profile.add_argument('--repeat', type=int, default=3, help='样本集重复次数')
+    profile.add_argument('--json', help='把统计结果写入JSON文件')
+    profile.add_argument('--graph', help='预处理图配置文件（默认使用内置配置）')
+    profile.set_defaults(func=bench_profile)
+
+    graph = subparsers.add_parser('graph', help='导出/校验预处理图配置')
+    graph.add_argument('--graph', help='要校验的预处理图配置文件（默认导出内置配置）')
+    graph.add_argument('--export', help='写入JSON文件（默认打印）')
+    graph.set_defaults(func=bench_graph)
+
+    parallel = subparsers.add_parser('parallel', help='顺序级联 vs 线程池并行竞速')
+    parallel.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    parallel.add_argument('--repeat', type=int, default=3, help='每个样本重复次数')
+    parallel.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='并行线程数')
+    parallel.add_argument('--graph', help='预处理图配置文件（默认使用内置配置）')
+    parallel.set_defaults(func=bench_parallel)
+
+    symbology = subparsers.add_parser('symbology', help='码制预设对识别耗时的影响')
+    symbology.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    symbology.add_argument('--repeat', type=int, default=3, help='每个样本重复次数')
+    symbology.set_defaults(func=bench_symbology)
+
+    backends = subparsers.add_parser('backends', help='识别后端吞吐量与识别率')
+    backends.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    backends.add_argument('--repeat', type=int, default=3, help='样本集重复次数')
+    backends.add_argument('--backend', action='append', choices=list(DECODER_BACKENDS),
+                          help='只测试指定后端（可重复指定，默认全部）')
+    backends.set_defaults(func=bench_backends)
+
+    pyramid = subparsers.add_parser('pyramid', help='大图金字塔从粗到细 vs 整图独立缩放')
+    pyramid.add_argument('--corpus', help='样本图片目录（默认使用合成的高分辨率样本）')
+    pyramid.add_argument('--repeat', type=int, default=3, help='每个样本重复次数')
+    pyramid.set_defaults(func=bench_pyramid)
+
+    memory = subparsers.add_parser('memory', help='稳定扫描时每帧的内存分配（复用缓冲区 vs 新分配）')
+    memory.add_argument('--frames', type=int, default=30, help='测量的帧数')
+    memory.add_argument('--warmup', type=int, default=3, help='预热帧数（不计入统计）')
+    memory.set_defaults(func=bench_memory)
+
+    image = subparsers.add_parser('image', help='scan_image_file 旧尝试序列 vs 搜索计划')
+    image.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    image.add_argument('--repeat', type=int, default=1, help='每个样本重复次数')
+    image.set_defaults(func=bench_image)
+
+    load = subparsers.add_parser('load', help='图片读取：彩色原图 vs 灰度/降分辨率解码')
+    load.add_argument('--corpus', help='样本图片目录（默认使用合成的高分辨率JPEG）')
+    load.add_argument('--repeat', type=int, default=3, help='每种读取方式重复次数')
+    load.set_defaults(func=bench_load)
+
+    cache = subparsers.add_parser('cache', help='识别结果缓存：首次扫描 vs 重复扫描 vs 改名后扫描')
+    cache.add_argument('--corpus', help='样本图片目录（默认使用合成样本）')
+    cache.add_argument('--deadline-ms', type=float, default=None, help='每张图片的时间预算（毫秒）')
+    cache.set_defaults(func=bench_cache)
+
+    tiles = subparsers.add_parser('tiles', help='超大图：整图识别 vs 分块扫描')
+    tiles.add_argument('--corpus', help='样本图片目录（默认合成一张A3扫描件）')
+    tiles.add_argument('--tile-size', type=int, default=QRCodeScanner.TILE_SIZE, help='分块边长（像素）')
+    tiles.add_argument('--overlap', type=int, default=QRCodeScanner.TILE_OVERLAP, help='分块重叠（像素）')
+    tiles.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='线程数')
+    tiles.set_defaults(func=bench_tiles)
+
+    batch = subparsers.add_parser('batch', help='批量扫描在不同进程数下的吞吐量')
+    batch.add_argument('--corpus', help='样本图片目录（默认循环写入合成样本）')
+    batch.add_argument('--images', type=int, default=200, help='合成样本的图片数')
+    batch.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='要测试的进程数')
+    batch.add_argument('--deadline-ms', type=float, default=2000, help='每张图片的时间预算（毫秒）')
+    batch.set_defaults(func=bench_batch)
+
+    video = subparsers.add_parser('video', help='视频文件：逐帧识别 vs 自适应采样')
+    video.add_argument('--video', help='视频文件（默认合成一段传送带录像）')
+    video.add_argument('--seconds', type=float, default=60, help='合成录像的时长（秒）')
+    video.add_argument('--max-stride-ms', type=float, default=QRCodeScanner.VIDEO_MAX_STRIDE_MS,
+                       help='自适应采样的最大间隔（毫秒）')
+    video.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 4], help='要测试的线程数')
+    video.set_defaults(func=bench_video)
+
+    startup = subparsers.add_parser('startup', help='导入耗时与启动到首次识别的时间')
+    startup.add_argument('--repeat', type=int, default=5, help='每个场景运行的次数')
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
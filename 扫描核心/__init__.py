@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+二维码扫描器 - 扫描核心（无界面）
+扫描引擎和内容安全检测，不依赖Kivy，可用于批量扫描、基准测试等无界面场景：
+
+    from 扫描核心 import QRCodeScanner, URLSecurityChecker
+
+各名称在第一次使用时才导入所在的子模块：只用内容安全检测（URLSecurityChecker 等）或
+识别结果缓存时不会导入OpenCV、numpy、pyzbar，导入本包本身也没有任何副作用
+"""
+import importlib
+
+# 名称 -> 所在子模块
+_EXPORTS = {
+    # 内容安全检测（只依赖标准库）
+    'ContentSafetyChecker': '.安全检测',
+    'URLSecurityChecker': '.安全检测',
+    'VerdictCache': '.安全检测',
+    # 识别结果缓存（只依赖标准库）
+    'ScanResultCache': '.结果缓存',
+    'file_digest': '.结果缓存',
+}
+_EXPORTS.update(dict.fromkeys([
+    'FrameCache', 'StrategyStats', 'ScanProfiler', 'CancelToken', 'ScanDeadline', 'ScanResult',
+    'SHARPNESS_WORK_SIZE', 'measure_sharpness', 'RecentFrames', 'NO_DEADLINE', 'SYMBOLOGY_PRESETS',
+    'SymbolRect', 'DecodedSymbol',
+    'DecoderBackend', 'PyzbarBackend', 'OpenCVBackend', 'OpenCVArucoBackend', 'DECODER_BACKENDS',
+    'create_backend', 'resolve_symbology',
+    'PreprocessResources', 'PreprocessContext', 'PreprocessGraph', 'PREPROCESS_OPS',
+    'register_preprocess_op',
+    'QRCodeScanner', 'QRCodeTracker',
+], '.扫描引擎'))
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到包的命名空间，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
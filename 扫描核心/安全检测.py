@@ -0,0 +1,488 @@
+# -*- coding: utf-8 -*-
+"""
+二维码扫描器 - 内容安全检测
+文本内容检测（ContentSafetyChecker）、链接安全检测（URLSecurityChecker）
+以及检测结论缓存（VerdictCache），只依赖标准库
+"""
+import os
+import re
+import math
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+try:
+    import sqlite3
+except ImportError:
+    # python-for-android默认不编译_sqlite3（buildozer.spec的requirements需要包含sqlite3），
+    # 没有时 VerdictCache 只使用内存层
+    sqlite3 = None
+
+
+class ContentSafetyChecker:
+    """文本内容安全检测器 - 检测违规内容"""
+    
+    # 色情相关关键词
+    PORNOGRAPHIC_KEYWORDS = [
+        '色情', 'av', 'porn', 'sex', 'xxx', 'adult', 'nude', 'naked',
+        'pussy', 'dick', 'cock', 'boobs', 'tits', 'ass', 'fuck', 'bitch',
+        'slut', 'whore', 'prostitute', 'escort', 'camgirl', 'onlyfans',
+        'hentai', 'erotic', 'masturbat', 'orgasm', 'ejaculat', 'blowjob',
+        'handjob', 'cum', 'squirt', 'anal', 'vagina', 'penis', 'clitoris',
+        'fetish', 'bdsm', 'bondage', 'swinger', 'milf', 'teen porn',
+        '强奸', '乱伦', '卖淫', '嫖娼', '裸聊', '约炮', '性服务',
+        '成人视频', '黄色网站', '福利姬', '援交', '包养', '裸照',
+    ]
+    
+    # 暴力相关关键词
+    VIOLENCE_KEYWORDS = [
+        '暴力', 'kill', 'murder', 'death', 'die', 'suicide', ' homicide',
+        'assassinat', 'terrorist', 'bomb', 'explosive', 'gun', 'weapon',
+        'knife', 'stab', 'shoot', 'massacre', 'genocide', 'torture',
+        'abuse', 'beat', 'fight', 'war', 'battle', 'bloodshed',
+        '杀人', '自杀', '死亡', '尸体', '血腥', '虐待', '殴打',
+        '恐怖袭击', '爆炸', '炸弹', '枪支', '武器', '刀具', '刺杀',
+        '屠杀', '酷刑', '家暴', '校园暴力', '打架斗殴', '械斗',
+    ]
+    
+    # 血腥相关关键词
+    GORE_KEYWORDS = [
+        '血腥', 'blood', 'gore', 'gory', 'dismember', 'decapitat',
+        'mutilat', 'corpse', 'dead body', 'rotting', 'cannibal',
+        'necro', 'snuff', 'beheading', 'execution', 'torture porn',
+        '断肢', '分尸', '斩首', '碎尸', '尸体', '腐烂', '食人',
+        '虐杀', '处决', '活体解剖', '器官贩卖', '人体实验',
+    ]
+    
+    # 赌博相关关键词
+    GAMBLING_KEYWORDS = [
+        '赌博', '博彩', '赌场', 'bet', 'gamble', 'casino', 'lottery',
+        'jackpot', 'slot machine', 'poker', 'blackjack', 'roulette',
+        'sports betting', 'online casino', '彩票', '六合彩', '赌球',
+        '百家乐', '老虎机', '德州扑克', '麻将赌博', '网络赌博',
+        '赌马', '赌狗', '飞艇', '快三', '时时彩', '北京赛车',
+    ]
+    
+    # 毒品相关关键词
+    DRUG_KEYWORDS = [
+        '毒品', '吸毒', '贩毒', 'drug', 'cocaine', 'heroin', 'meth',
+        'marijuana', 'cannabis', 'weed', 'lsd', 'ecstasy', 'mdma',
+        'opium', 'fentanyl', 'overdose', 'narcotic', '冰毒', '海洛因',
+        '可卡因', '大麻', '摇头丸', '麻古', 'k粉', '白粉', '罂粟',
+        '致幻剂', '兴奋剂', '镇静剂', '吸毒工具', '制毒',
+    ]
+    
+    # 诈骗相关关键词
+    FRAUD_KEYWORDS = [
+        '诈骗', '欺诈', 'scam', 'fraud', 'phishing', 'deception',
+        'hoax', 'con', 'swindle', 'extortion', 'blackmail', 'ransom',
+        'pyramid scheme', 'ponzi', 'multi-level marketing', 'mlm',
+        '电信诈骗', '网络诈骗', '钓鱼网站', '虚假中奖', '冒充公检法',
+        '杀猪盘', '刷单诈骗', '贷款诈骗', '投资诈骗', '传销',
+        '非法集资', '洗钱', '套现', '盗刷', '信用卡诈骗',
+    ]
+    
+    @classmethod
+    def check_content(cls, text):
+        """
+        检测文本内容安全
+        返回: (是否安全, 违规类型, 详细提示, 风险等级颜色)
+        """
+        if not text or len(text.strip()) == 0:
+            return (True, None, '内容为空', (0.5, 0.5, 0.5, 1))
+        
+        text_lower = text.lower()
+        violations = []
+        
+        # 检查各类违规内容
+        checks = [
+            (cls.PORNOGRAPHIC_KEYWORDS, '色情内容', '🔞'),
+            (cls.VIOLENCE_KEYWORDS, '暴力内容', '💀'),
+            (cls.GORE_KEYWORDS, '血腥内容', '🩸'),
+            (cls.GAMBLING_KEYWORDS, '赌博内容', '🎲'),
+            (cls.DRUG_KEYWORDS, '毒品内容', '💊'),
+            (cls.FRAUD_KEYWORDS, '诈骗内容', '⚠️'),
+        ]
+        
+        for keywords, category, icon in checks:
+            found = cls._check_keywords(text_lower, keywords)
+            if found:
+                violations.append((category, found, icon))
+        
+        if violations:
+            # 构建详细提示
+            details = []
+            for category, found_words, icon in violations:
+                word_str = ', '.join(found_words[:3])
+                details.append(f"{icon} 检测到{category}: {word_str}")
+            
+            detail_text = '\n'.join(details)
+            return (False, '违规内容', detail_text, (0.9, 0.1, 0.1, 1))  # 红色
+        
+        # 如果是普通文本，认为是安全的
+        return (True, '安全文本', '✅ 普通文本内容，无违规信息', (0.2, 0.8, 0.2, 1))  # 绿色
+    
+    @staticmethod
+    def _check_keywords(text, keywords):
+        """检查文本中是否包含关键词"""
+        found = []
+        for keyword in keywords:
+            if keyword.lower() in text:
+                found.append(keyword)
+        return found
+
+
+class URLSecurityChecker:
+    """URL安全检测器 - 三档安全等级"""
+    
+    # 危险关键词（权重：严重=3, 警告=1）
+    DANGEROUS_KEYWORDS = {
+        # 严重危险关键词 (权重3)
+        'login': 3, 'signin': 3, 'account': 3, 'password': 3, 'verify': 3,
+        'secure': 3, 'update': 3, 'confirm': 3, 'banking': 3, 'payment': 3,
+        'wallet': 3, 'crypto': 3, 'bitcoin': 3, 'verify-account': 3,
+        'security-check': 3, 'authenticate': 3, 'credential': 3,
+        
+        # 警告关键词 (权重1)
+        'free': 1, 'gift': 1, 'prize': 1, 'winner': 1, 'bonus': 1,
+        'discount': 1, 'offer': 1, 'limited': 1, 'urgent': 1, 'alert': 1,
+        'suspend': 1, 'restricted': 1, 'locked': 1, 'unusual': 1,
+        'click': 1, 'download': 1, 'install': 1, 'upgrade': 1,
+    }
+    
+    # 可疑顶级域名
+    SUSPICIOUS_TLDS = ['.tk', '.ml', '.ga', '.cf', '.top', '.xyz', '.club', '.work', '.date']
+    
+    # 可疑URL模式
+    SUSPICIOUS_PATTERNS = [
+        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}',  # IP地址
+        r'[a-zA-Z0-9]{30,}',  # 超长随机字符串
+        r'[0o][0o]',  # 数字0和字母o混淆
+        r'[il1][il1][il1]',  # i, l, 1混淆
+    ]
+    
+    # 短链接服务
+    SHORT_URL_SERVICES = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 
+                          'short.link', 'is.gd', 'buff.ly', 'rebrand.ly']
+    
+    @classmethod
+    def check_url(cls, url):
+        """
+        检测URL安全等级
+        返回: (安全等级, 风险分数, 详细提示, 颜色)
+        安全等级: 'safe', 'warning', 'dangerous'
+        """
+        if not url.startswith(('http://', 'https://')):
+            return ('safe', 0, '非链接内容', (0.5, 0.5, 0.5, 1))
+        
+        risk_score = 0
+        risk_factors = []
+        
+        # 1. 检查协议 (http vs https)
+        if url.startswith('http://'):
+            risk_score += 1
+            risk_factors.append('使用不安全的HTTP协议')
+        
+        # 2. 解析URL
+        try:
+            parsed = urlparse(url)
+            domain = parsed.netloc.lower()
+            path = parsed.path.lower()
+            query = parsed.query.lower()
+            
+            # 3. 检查域名长度 (过短或过长都可疑)
+            if len(domain) < 5:
+                risk_score += 2
+                risk_factors.append('域名过短')
+            elif len(domain) > 50:
+                risk_score += 2
+                risk_factors.append('域名过长')
+            
+            # 4. 检查可疑顶级域名
+            for tld in cls.SUSPICIOUS_TLDS:
+                if domain.endswith(tld):
+                    risk_score += 2
+                    risk_factors.append(f'使用可疑域名后缀 {tld}')
+                    break
+            
+            # 5. 检查短链接
+            for short_service in cls.SHORT_URL_SERVICES:
+                if short_service in domain:
+                    risk_score += 2
+                    risk_factors.append('使用短链接服务（可能隐藏真实目标）')
+                    break
+            
+            # 6. 检查数字和特殊字符比例
+            domain_chars = re.sub(r'[^a-zA-Z0-9]', '', domain)
+            if domain_chars:
+                digit_ratio = sum(c.isdigit() for c in domain_chars) / len(domain_chars)
+                if digit_ratio > 0.3:
+                    risk_score += 2
+                    risk_factors.append('域名包含过多数字')
+            
+            # 7. 检查URL熵值（随机性）
+            url_entropy = cls.calculate_entropy(url)
+            if url_entropy > 4.5:
+                risk_score += 1
+                risk_factors.append('URL结构异常复杂')
+            
+            # 8. 检查危险关键词
+            full_url = (domain + path + query).lower()
+            for keyword, weight in cls.DANGEROUS_KEYWORDS.items():
+                if keyword in full_url:
+                    risk_score += weight
+                    if weight >= 3:
+                        risk_factors.append(f'包含严重危险关键词: {keyword}')
+            
+            # 9. 检查可疑模式
+            for pattern in cls.SUSPICIOUS_PATTERNS:
+                if re.search(pattern, url, re.IGNORECASE):
+                    risk_score += 2
+                    risk_factors.append('URL包含可疑模式')
+                    break
+            
+            # 10. 检查子域名数量
+            subdomain_count = domain.count('.') - 1
+            if subdomain_count > 3:
+                risk_score += 2
+                risk_factors.append('子域名层级过多')
+            
+            # 11. 检查@符号（钓鱼常用）
+            if '@' in url:
+                risk_score += 3
+                risk_factors.append('URL包含@符号（钓鱼攻击特征）')
+            
+            # 12. 检查端口号
+            if ':' in domain and not (':80' in domain or ':443' in domain):
+                risk_score += 1
+                risk_factors.append('使用非标准端口')
+                
+        except Exception as e:
+            risk_score += 1
+            risk_factors.append('URL解析异常')
+        
+        # 确定安全等级
+        max_possible_score = 20  # 理论最大风险分
+        risk_percentage = (risk_score / max_possible_score) * 100
+        
+        if risk_percentage < 20:
+            level = 'safe'
+            icon = '✅'
+            color = (0.2, 0.8, 0.2, 1)  # 绿色
+        elif risk_percentage < 60:
+            level = 'warning'
+            icon = '⚠️'
+            color = (1.0, 0.6, 0.0, 1)  # 橙色
+        else:
+            level = 'dangerous'
+            icon = '🚨'
+            color = (0.9, 0.1, 0.1, 1)  # 红色
+        
+        # 生成详细提示
+        if risk_factors:
+            detail = f"{icon} 发现 {len(risk_factors)} 个风险点:\n" + "\n".join([f"  • {f}" for f in risk_factors[:5]])
+        else:
+            detail = f"{icon} 未发现明显风险"
+        
+        return (level, risk_percentage, detail, color)
+    
+    @staticmethod
+    def calculate_entropy(string):
+        """计算字符串的熵值（随机性）"""
+        if not string:
+            return 0
+        
+        prob = [float(string.count(c)) / len(string) for c in dict.fromkeys(list(string))]
+        entropy = -sum([p * math.log(p) / math.log(2.0) for p in prob])
+        return entropy
+
+
+class VerdictCache:
+    """
+    安全检测结论缓存 - 按内容缓存 URLSecurityChecker / ContentSafetyChecker 的检测结果
+    - 内存层：容量有限的LRU，可选过期时间（秒）
+    - 磁盘层（可选）：SQLite文件，重启后依然有效
+    - 关键词表/检测规则变化时（规则指纹不同）自动失效
+    """
+    
+    # 检测逻辑本身（而非关键词表）变化时递增，使旧缓存失效
+    RULES_VERSION = 1
+    # 运行中重新计算规则指纹的间隔（秒），用于发现关键词表被修改
+    FINGERPRINT_CHECK_INTERVAL = 1.0
+    # 磁盘层最多保存的条目数
+    DISK_MAX_ENTRIES = 100000
+    
+    def __init__(self, maxsize=1024, ttl=None, disk_path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()  # (类型, 内容) -> (结论, 写入时间)
+        self._lock = threading.Lock()
+        self._fingerprint = self.rules_fingerprint()
+        self._fingerprint_checked = time.monotonic()
+        self._disk = None
+        self._disk_inserts = 0
+        if disk_path:
+            self._open_disk(disk_path)
+    
+    @staticmethod
+    def rules_fingerprint():
+        """根据关键词表和检测规则计算指纹"""
+        rules = {
+            'version': VerdictCache.RULES_VERSION,
+            'content': [getattr(ContentSafetyChecker, name) for name in (
+                'PORNOGRAPHIC_KEYWORDS', 'VIOLENCE_KEYWORDS', 'GORE_KEYWORDS',
+                'GAMBLING_KEYWORDS', 'DRUG_KEYWORDS', 'FRAUD_KEYWORDS')],
+            'url': [URLSecurityChecker.DANGEROUS_KEYWORDS, URLSecurityChecker.SUSPICIOUS_TLDS,
+                    URLSecurityChecker.SUSPICIOUS_PATTERNS, URLSecurityChecker.SHORT_URL_SERVICES],
+        }
+        raw = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _open_disk(self, path):
+        """打开磁盘层；规则指纹与文件中记录的不同时清空"""
+        if sqlite3 is None:
+            print("[!] 当前环境没有sqlite3，检测结果缓存只使用内存层")
+            return
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._disk.execute('CREATE TABLE IF NOT EXISTS verdicts '
+                               '(key TEXT PRIMARY KEY, verdict TEXT, stored_at REAL)')
+            row = self._disk.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is None or row[0] != self._fingerprint:
+                self._reset_disk()
+            self._disk.commit()
+        except sqlite3.Error as e:
+            print(f"[!] 打开检测结果缓存失败: {e}")
+            self._disk = None
+    
+    def _reset_disk(self):
+        self._disk.execute('DELETE FROM verdicts')
+        self._disk.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+                           (self._fingerprint,))
+        self._disk.commit()
+    
+    def _check_rules(self):
+        """定期检查规则是否变化，变化时清空所有缓存"""
+        now = time.monotonic()
+        if now - self._fingerprint_checked < self.FINGERPRINT_CHECK_INTERVAL:
+            return
+        self._fingerprint_checked = now
+        fingerprint = self.rules_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._memory.clear()
+            if self._disk is not None:
+                self._reset_disk()
+    
+    @staticmethod
+    def _disk_key(key):
+        return hashlib.sha256('\0'.join(key).encode('utf-8')).hexdigest()
+    
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+    
+    def get(self, kind, payload, compute):
+        """查找缓存的结论，未命中时调用 compute(payload) 计算并缓存"""
+        key = (kind, payload)
+        with self._lock:
+            self._check_rules()
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            
+            verdict = self._disk_get(key)
+            if verdict is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._memory_put(key, verdict, time.time())
+                return verdict
+            self.misses += 1
+        
+        verdict = compute(payload)
+        with self._lock:
+            stored_at = time.time()
+            self._memory_put(key, verdict, stored_at)
+            self._disk_put(key, verdict, stored_at)
+        return verdict
+    
+    def _memory_put(self, key, verdict, stored_at):
+        self._memory[key] = (verdict, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+    
+    def _disk_get(self, key):
+        if self._disk is None:
+            return None
+        try:
+            row = self._disk.execute('SELECT verdict, stored_at FROM verdicts WHERE key = ?',
+                                     (self._disk_key(key),)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or self._expired(row[1]):
+            return None
+        # JSON中元组被存为列表，还原为与检测器返回值相同的元组
+        return tuple(tuple(item) if isinstance(item, list) else item
+                     for item in json.loads(row[0]))
+    
+    def _disk_put(self, key, verdict, stored_at):
+        if self._disk is None:
+            return
+        try:
+            self._disk.execute('INSERT OR REPLACE INTO verdicts (key, verdict, stored_at) '
+                               'VALUES (?, ?, ?)',
+                               (self._disk_key(key), json.dumps(verdict, ensure_ascii=False),
+                                stored_at))
+            self._disk_inserts += 1
+            # 定期淘汰最旧的条目，控制磁盘层大小
+            if self._disk_inserts % 1000 == 0:
+                self._disk.execute('DELETE FROM verdicts WHERE key IN (SELECT key FROM verdicts '
+                                   'ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                                   (self.DISK_MAX_ENTRIES,))
+            self._disk.commit()
+        except sqlite3.Error as e:
+            print(f"[!] 写入检测结果缓存失败: {e}")
+    
+    def check_url(self, url):
+        """带缓存的 URLSecurityChecker.check_url"""
+        return self.get('url', url, URLSecurityChecker.check_url)
+    
+    def check_content(self, text):
+        """带缓存的 ContentSafetyChecker.check_content"""
+        return self.get('content', text, ContentSafetyChecker.check_content)
+    
+    def stats(self):
+        """命中/未命中计数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self._memory),
+            }
+    
+    def clear(self):
+        """清空内存层和磁盘层"""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._reset_disk()
+    
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
@@ -0,0 +1,2642 @@
+# -*- coding: utf-8 -*-
+"""
+二维码扫描器 - 扫描引擎
+预处理级联、识别后端、图像金字塔/分块扫描、帧间追踪等扫描核心类，不依赖Kivy
+"""
+import os
+import math
+import mmap
+import json
+import time
+import hashlib
+import threading
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2
+import numpy as np
+
+from .结果缓存 import ScanResultCache, file_digest
+
+
+def _pil():
+    """
+    按需导入PIL：只有读取图片文件（读文件头、OpenCV无法解码、多页图片）时才用到，
+    摄像头扫描和批量扫描的工作进程启动时不必加载
+    """
+    from PIL import Image, ImageSequence
+    return Image, ImageSequence
+
+
+def _zbar():
+    """按需导入pyzbar（加载zbar动态库）：第一次用zbar后端识别时才导入，只用OpenCV后端时不加载"""
+    from pyzbar.pyzbar import decode, ZBarSymbol
+    return decode, ZBarSymbol
+
+
+class FrameCache:
+    """
+    帧内中间结果缓存（如OTSU结果被形态学运算复用）
+    并行扫描时多个线程共享同一帧的缓存，每个键只计算一次
+    """
+    
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key, compute):
+        """获取中间结果，不存在时计算一次"""
+        if key in self._values:
+            return self._values[key]
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._values:
+                self._values[key] = compute()
+        return self._values[key]
+
+
+class StrategyStats:
+    """
+    预处理策略统计
+    记录每种策略的尝试次数、命中次数和耗时（预处理+识别），
+    按"期望代价/命中率"从小到大重新排列级联，并可持久化到JSON文件
+    """
+    
+    # 拉普拉斯平滑先验：未尝试过的策略按 1/2 命中率估计
+    PRIOR_HITS = 1
+    PRIOR_ATTEMPTS = 2
+    # 每累计多少次记录自动保存一次
+    AUTOSAVE_EVERY = 50
+    
+    def __init__(self, path=None):
+        self.path = path
+        self.stats = {}  # 策略名 -> {'attempts': 次数, 'hits': 命中, 'cost': 累计耗时(秒)}
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        if path:
+            self.load()
+    
+    def record(self, name, seconds, hit):
+        """记录一次策略尝试"""
+        with self._lock:
+            entry = self.stats.setdefault(name, {'attempts': 0, 'hits': 0, 'cost': 0.0})
+            entry['attempts'] += 1
+            entry['hits'] += 1 if hit else 0
+            entry['cost'] += seconds
+            self._unsaved += 1
+            should_save = self.path and self._unsaved >= self.AUTOSAVE_EVERY
+        if should_save:
+            self.save()
+    
+    def expected_cost(self, name):
+        """期望代价 = 平均耗时 / 命中率；未测量过的策略代价为0，保证每种策略都会被尝试到"""
+        entry = self.stats.get(name)
+        if not entry or not entry['attempts']:
+            return 0.0
+        mean_cost = entry['cost'] / entry['attempts']
+        hit_rate = (entry['hits'] + self.PRIOR_HITS) / (entry['attempts'] + self.PRIOR_ATTEMPTS)
+        return mean_cost / hit_rate
+    
+    def order(self, cascade):
+        """按期望代价重新排列级联（策略名列表），代价相同时保持原有顺序"""
+        with self._lock:
+            ranked = sorted(enumerate(cascade),
+                            key=lambda item: (self.expected_cost(item[1]), item[0]))
+        return [name for _, name in ranked]
+    
+    def summary(self):
+        """返回按期望代价排序的统计列表"""
+        with self._lock:
+            rows = []
+            for name, entry in self.stats.items():
+                attempts = entry['attempts']
+                rows.append({
+                    'name': name,
+                    'attempts': attempts,
+                    'hits': entry['hits'],
+                    'hit_rate': entry['hits'] / attempts if attempts else 0.0,
+                    'mean_ms': entry['cost'] / attempts * 1000 if attempts else 0.0,
+                    'expected_cost_ms': self.expected_cost(name) * 1000,
+                })
+        return sorted(rows, key=lambda row: row['expected_cost_ms'])
+    
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self.stats = {}
+            self._unsaved = 0
+    
+    def load(self):
+        """从文件加载统计（文件不存在或损坏时忽略）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self.stats = {
+                    name: {'attempts': int(entry['attempts']),
+                           'hits': int(entry['hits']),
+                           'cost': float(entry['cost'])}
+                    for name, entry in data.get('strategies', {}).items()
+                }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+    
+    def save(self):
+        """保存统计到文件（先写临时文件再替换，避免写坏）"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {'version': 1, 'strategies': dict(self.stats)}
+            self._unsaved = 0
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[!] 保存策略统计失败: {e}")
+
+
+class ScanProfiler:
+    """
+    扫描性能剖析器（默认关闭，需通过 QRCodeScanner.enable_profiling() 开启）
+    按阶段记录耗时和命中情况，每个阶段保留最近 window 次耗时，用于计算 p50/p95/p99
+    阶段命名：
+        frame.total / frame.direct / frame.gray   scan_frame 整体、原图识别、灰度图识别
+        prep.<策略名> / decode.<策略名>            预处理级联中每种策略的预处理和识别
+        image.load / image.total                   scan_image_file 读图和整体耗时
+        image.<尝试名>                             原图、旋转、裁剪、翻转等每次尝试
+    prep.* 阶段的"命中"表示该策略生成了预处理图像，其余阶段表示识别到了二维码
+    """
+    
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}  # 阶段 -> deque(最近的耗时毫秒)
+        self._counts = {}   # 阶段 -> [调用次数, 命中次数]
+        self._lock = threading.Lock()
+    
+    def record(self, stage, seconds, hit=False):
+        """记录一次阶段耗时"""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._counts[stage] = [0, 0]
+            samples.append(seconds * 1000)
+            counts = self._counts[stage]
+            counts[0] += 1
+            counts[1] += 1 if hit else 0
+    
+    @staticmethod
+    def _percentile(sorted_values, percent):
+        """最近秩法百分位数"""
+        if not sorted_values:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+        return sorted_values[rank - 1]
+    
+    def stage_report(self, stage):
+        """单个阶段的统计：调用次数、命中次数、平均值和 p50/p95/p99（毫秒）"""
+        with self._lock:
+            values = sorted(self._samples.get(stage, ()))
+            calls, hits = self._counts.get(stage, (0, 0))
+        return {
+            'calls': calls,
+            'hits': hits,
+            'mean_ms': sum(values) / len(values) if values else 0.0,
+            'p50_ms': self._percentile(values, 50),
+            'p95_ms': self._percentile(values, 95),
+            'p99_ms': self._percentile(values, 99),
+        }
+    
+    def report(self):
+        """所有阶段的统计，按阶段名排序"""
+        with self._lock:
+            stages = sorted(self._samples)
+        return {stage: self.stage_report(stage) for stage in stages}
+    
+    def to_json(self):
+        return json.dumps(self.report(), ensure_ascii=False, indent=2)
+    
+    def dump_json(self, path):
+        """把统计写入JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+    
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._counts = {}
+
+
+class CancelToken:
+    """扫描取消令牌 - 在其他线程调用 cancel() 后，正在进行的扫描会在下一个阶段之前停止"""
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class ScanDeadline:
+    """扫描截止条件：超过时间预算或令牌被取消即视为到期"""
+    
+    def __init__(self, deadline_ms=None, cancel_token=None):
+        self.expires_at = None
+        if deadline_ms is not None:
+            self.expires_at = time.perf_counter() + deadline_ms / 1000.0
+        self.cancel_token = cancel_token
+    
+    def expired(self):
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            return True
+        return self.expires_at is not None and time.perf_counter() >= self.expires_at
+    
+    def remaining_ms(self):
+        """剩余时间（毫秒），无时间限制时返回None"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, (self.expires_at - time.perf_counter()) * 1000)
+
+
+class ScanResult(list):
+    """
+    扫描结果列表（与普通list用法相同）
+    truncated: 是否因截止时间/取消而提前结束搜索（此时结果是截止前找到的最好结果）
+    gated: 是否因画面模糊被质量门限拦截而没有扫描
+    attempt: scan_image_file 中识别成功的尝试名（如 'reduced'、'original'、'crop_center'），未识别时为None
+    page: 多页图片（GIF/多页TIFF/动画WebP）中第一个识别成功的页号，未识别时为None
+    unreadable: scan_image_file 的图片文件无法读取（不存在、格式不支持或已损坏）
+    cached: scan_image_file 的结果来自识别结果缓存
+    error: scan_image_file 扫描过程中出错（如识别库无法加载）时的错误信息，此时结果不完整，未出错时为None
+    """
+    
+    def __init__(self, results=(), truncated=False, gated=False, attempt=None, page=None,
+                 unreadable=False, cached=False, error=None):
+        super().__init__(results)
+        self.truncated = truncated
+        self.gated = gated
+        self.attempt = attempt
+        self.page = page
+        self.unreadable = unreadable
+        self.cached = cached
+        self.error = error
+
+
+# 清晰度测量时把图像缩小到的长边尺寸
+SHARPNESS_WORK_SIZE = 320
+
+
+def measure_sharpness(frame):
+    """
+    画面清晰度：缩小后灰度图的拉普拉斯方差
+    运动模糊/对焦不准的画面边缘弱，数值明显偏低
+    """
+    height, width = frame.shape[:2]
+    scale = min(1.0, SHARPNESS_WORK_SIZE / max(height, width))
+    small = frame
+    if scale < 1.0:
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if len(small.shape) == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(small, cv2.CV_64F).var())
+
+
+class RecentFrames:
+    """
+    近期帧签名 - 用缩小到 32x24 的灰度缩略图作为帧签名，
+    与最近扫描过的几帧比较，每个格子的像素差和整帧平均像素差都低于阈值时直接复用那一帧的扫描结果
+    （画面静止时不必每秒30次重复运行识别级联）
+    只比较整帧平均不够：640x480画面中出现或移走一个百像素左右的二维码，平均像素差只变化1~3个灰度级，
+    而二维码所在的格子（每格约20x20像素）变化几十个灰度级
+    """
+    
+    SIGNATURE_SIZE = (32, 24)
+    
+    def __init__(self, threshold=1.5, force_rescan_every=15, history=4, cell_threshold=12):
+        """
+        threshold: 判定为相似帧的整帧平均像素差上限（灰度级 0-255）
+        force_rescan_every: 连续复用多少帧后强制重新扫描一次
+        history: 保留最近扫描过的帧数（两个画面交替出现时都能复用）
+        cell_threshold: 判定为相似帧的单个格子像素差上限（灰度级），画面局部的变化由它发现
+        """
+        self.threshold = threshold
+        self.cell_threshold = cell_threshold
+        self.force_rescan_every = force_rescan_every
+        self._history = deque(maxlen=history)  # [(签名, 扫描结果), ...]
+        self._reused_in_row = 0
+    
+    def signature(self, frame):
+        thumb = cv2.resize(frame, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+        if len(thumb.shape) == 3:
+            thumb = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        return thumb.astype(np.int16)
+    
+    def similar(self, previous, signature):
+        """两个签名是否属于几乎相同的画面"""
+        diff = np.abs(previous - signature)
+        return int(diff.max()) <= self.cell_threshold and float(diff.mean()) <= self.threshold
+    
+    def lookup(self, signature):
+        """
+        找到相似的已扫描帧时返回其结果的副本，否则返回None
+        复用的识别结果（命中）需要调用方在当前帧上确认（QRCodeScanner 在原位置重新识别一次）
+        """
+        if self._reused_in_row >= self.force_rescan_every:
+            self._reused_in_row = 0
+            return None
+        for previous, results in reversed(self._history):
+            if self.similar(previous, signature):
+                self._reused_in_row += 1
+                return ScanResult([dict(result) for result in results], results.truncated)
+        return None
+    
+    def remember(self, signature, results):
+        self._history.append((signature, results))
+        self._reused_in_row = 0
+    
+    def clear(self):
+        self._history.clear()
+        self._reused_in_row = 0
+
+
+# 未设置截止条件时共用的"永不到期"对象
+NO_DEADLINE = ScanDeadline()
+
+
+# 码制配置预设：限定zbar只搜索需要的码制，每次识别调用都会更快
+# 码制用 ZBarSymbol 的成员名表示，由zbar后端第一次识别时转换（定义预设不需要导入pyzbar）
+# （zbar不支持DataMatrix，"2d"预设使用zbar支持的二维码制；旧版zbar没有的码制（如SQCODE）被忽略）
+SYMBOLOGY_PRESETS = {
+    'all': None,  # 全部码制（zbar默认）
+    'qr': ['QRCODE'],
+    '2d': ['QRCODE', 'PDF417', 'SQCODE'],
+    'retail_1d': ['EAN13', 'EAN8', 'UPCA', 'UPCE', 'ISBN10', 'ISBN13', 'CODE128',
+                  'CODE39', 'I25', 'DATABAR', 'DATABAR_EXP'],
+}
+
+
+# 识别后端统一的结果格式（字段与pyzbar的Decoded一致）
+SymbolRect = namedtuple('SymbolRect', ['left', 'top', 'width', 'height'])
+DecodedSymbol = namedtuple('DecodedSymbol', ['data', 'type', 'rect', 'polygon'])
+
+
+class DecoderBackend:
+    """
+    识别后端基类
+    decode(image) 返回识别结果列表，每项带 data(bytes)/type/rect/polygon 属性，
+    image 可以是BGR彩色图或灰度图
+    symbols: 码制名列表（ZBarSymbol 的成员名，见 resolve_symbology），None 表示全部码制
+    """
+    
+    name = 'base'
+    
+    def __init__(self, symbols=None):
+        self.symbols = symbols
+    
+    def load(self):
+        """加载识别库（默认在第一次识别时加载）；识别库不可用时抛出 ImportError"""
+    
+    def decode(self, image):
+        raise NotImplementedError
+
+
+class PyzbarBackend(DecoderBackend):
+    """zbar识别后端（支持全部zbar码制，遵循扫描器的码制配置）"""
+    
+    name = 'pyzbar'
+    
+    def __init__(self, symbols=None):
+        super().__init__(symbols)
+        self._decode = None
+        self._zbar_symbols = None
+    
+    def load(self):
+        """导入pyzbar并把码制名转换为 ZBarSymbol（第一次识别时执行；缺少zbar动态库时抛出 ImportError）"""
+        if self._decode is not None:
+            return
+        decode, ZBarSymbol = _zbar()
+        if self.symbols is not None:
+            self._zbar_symbols = [getattr(ZBarSymbol, name) for name in self.symbols
+                                  if hasattr(ZBarSymbol, name)]
+        self._decode = decode
+    
+    def decode(self, image):
+        if self._decode is None:
+            self.load()
+        return self._decode(image, symbols=self._zbar_symbols)
+
+
+class OpenCVBackend(DecoderBackend):
+    """OpenCV内置的 cv2.QRCodeDetector 识别后端（只支持二维码）"""
+    
+    name = 'opencv'
+    
+    def __init__(self, symbols=None):
+        super().__init__(symbols)
+        # 码制配置不包含二维码时，该后端不做任何识别
+        self.enabled = symbols is None or 'QRCODE' in symbols
+        # OpenCV检测器对象不是线程安全的，每个线程各用一个
+        self._local = threading.local()
+    
+    def _create_detector(self):
+        return cv2.QRCodeDetector()
+    
+    def decode(self, image):
+        if not self.enabled:
+            return []
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = self._create_detector()
+        
+        try:
+            found, texts, points, _ = detector.detectAndDecodeMulti(image)
+        except cv2.error:
+            return []
+        if not found or points is None:
+            return []
+        
+        symbols = []
+        for text, quad in zip(texts, points):
+            if not text:
+                continue
+            quad = np.asarray(quad).reshape(-1, 2)
+            x1, y1 = quad.min(axis=0)
+            x2, y2 = quad.max(axis=0)
+            symbols.append(DecodedSymbol(
+                data=text.encode('utf-8'),
+                type='QRCODE',
+                rect=SymbolRect(int(x1), int(y1), int(x2 - x1), int(y2 - y1)),
+                polygon=[(int(x), int(y)) for x, y in quad],
+            ))
+        return symbols
+
+
+class OpenCVArucoBackend(OpenCVBackend):
+    """OpenCV的 cv2.QRCodeDetectorAruco 识别后端（基于ArUco的定位图案检测，OpenCV 4.7+）"""
+    
+    name = 'opencv_aruco'
+    
+    def _create_detector(self):
+        return cv2.QRCodeDetectorAruco()
+
+
+# 可用的识别后端：名称 -> 后端类
+DECODER_BACKENDS = {
+    PyzbarBackend.name: PyzbarBackend,
+    OpenCVBackend.name: OpenCVBackend,
+}
+if hasattr(cv2, 'QRCodeDetectorAruco'):
+    DECODER_BACKENDS[OpenCVArucoBackend.name] = OpenCVArucoBackend
+
+
+def create_backend(backend, symbols=None):
+    """根据后端名称（或直接传入的后端对象）得到识别后端"""
+    if isinstance(backend, DecoderBackend):
+        return backend
+    if backend not in DECODER_BACKENDS:
+        raise ValueError(f"未知的识别后端: {backend}，可选: {', '.join(DECODER_BACKENDS)}")
+    return DECODER_BACKENDS[backend](symbols)
+
+
+def resolve_symbology(symbology):
+    """
+    把码制配置（预设名，或 ZBarSymbol/码制名列表）转换为识别后端的 symbols 参数：
+    码制名（ZBarSymbol 的成员名）列表，全部码制时为None
+    """
+    if symbology is None:
+        return None
+    if isinstance(symbology, str):
+        if symbology not in SYMBOLOGY_PRESETS:
+            raise ValueError(f"未知的码制预设: {symbology}，可选: {', '.join(SYMBOLOGY_PRESETS)}")
+        symbology = SYMBOLOGY_PRESETS[symbology]
+        if symbology is None:
+            return None
+    return [getattr(symbol, 'name', symbol) for symbol in symbology]
+
+
+# ============================================================
+# 预处理操作与声明式预处理图
+# ============================================================
+
+class PreprocessResources:
+    """
+    预处理资源缓存（每个扫描器一个）
+    - CLAHE对象和卷积核（形态学、锐化）只创建一次，不再每帧重新构造
+    - 各节点的输出缓冲区按 (节点名, 形状, 类型) 预先分配，通过OpenCV的 dst= 参数在帧间复用，
+      摄像头稳定扫描时每帧几乎没有新的内存分配
+    CLAHE对象不是线程安全的，它和缓冲区都按线程各存一份（并行级联时各线程互不干扰）
+    缓冲区在下一帧会被覆盖，预处理结果只能在本帧内使用
+    """
+    
+    # 每个线程缓冲区的总字节上限（超出时淘汰最久未用的缓冲区，裁剪图尺寸各不相同）
+    MAX_BUFFER_BYTES = 64 * 1024 * 1024
+    
+    def __init__(self, reuse_buffers=True):
+        self.reuse_buffers = reuse_buffers
+        self._local = threading.local()
+        self._kernels = {}
+        self._contexts = {}
+        self._states = []  # 所有线程的状态（用于统计和清空）
+        self._lock = threading.Lock()
+    
+    def _state(self):
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            # 缓冲区表加锁：clear() 可能在其他线程（如图片扫描结束时）清空本线程的缓冲区
+            state = self._local.state = {'buffers': OrderedDict(), 'bytes': 0, 'clahe': {},
+                                         'lock': threading.Lock()}
+            with self._lock:
+                self._states.append(state)
+        return state
+    
+    def context(self, node):
+        """节点 node 的操作上下文（每个节点只创建一次）"""
+        context = self._contexts.get(node)
+        if context is None:
+            context = self._contexts[node] = PreprocessContext(self, node)
+        return context
+    
+    def buffer(self, key, shape, dtype=np.uint8):
+        """取 key 对应形状的输出缓冲区（不复用缓冲区或超出上限时返回None，由OpenCV新分配）"""
+        if not self.reuse_buffers:
+            return None
+        state = self._state()
+        buffers = state['buffers']
+        buffer_key = (key, shape, dtype)
+        with state['lock']:
+            buffer = buffers.get(buffer_key)
+            if buffer is not None:
+                buffers.move_to_end(buffer_key)
+                return buffer
+            
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if nbytes > self.MAX_BUFFER_BYTES:
+                return None
+            while buffers and state['bytes'] + nbytes > self.MAX_BUFFER_BYTES:
+                _, evicted = buffers.popitem(last=False)
+                state['bytes'] -= evicted.nbytes
+            buffer = buffers[buffer_key] = np.empty(shape, dtype)
+            state['bytes'] += nbytes
+            return buffer
+    
+    def gray(self, key, image):
+        """转换为灰度图（写入 key 对应的缓冲区），已经是灰度图时直接返回"""
+        if len(image.shape) != 3:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self.buffer(key, image.shape[:2]))
+    
+    def clahe(self, clip_limit, tile_size):
+        """当前线程的CLAHE对象（按参数缓存）"""
+        cache = self._state()['clahe']
+        clahe = cache.get((clip_limit, tile_size))
+        if clahe is None:
+            clahe = cache[(clip_limit, tile_size)] = cv2.createCLAHE(
+                clipLimit=clip_limit, tileGridSize=(tile_size, tile_size))
+        return clahe
+    
+    def kernel(self, kind, size=3):
+        """卷积核（只读，各线程共用）：'ones' 为 size×size 全1核，'sharpen' 为3×3锐化核"""
+        key = (kind, size)
+        kernel = self._kernels.get(key)
+        if kernel is None:
+            if kind == 'sharpen':
+                kernel = np.array([[-1, -1, -1],
+                                   [-1,  9, -1],
+                                   [-1, -1, -1]], dtype=np.float32)
+            else:
+                kernel = np.ones((size, size), np.uint8)
+            kernel.setflags(write=False)
+            kernel = self._kernels.setdefault(key, kernel)
+        return kernel
+    
+    def stats(self):
+        """缓冲区统计：线程数、缓冲区个数和总字节数"""
+        with self._lock:
+            return {
+                'threads': len(self._states),
+                'buffers': sum(len(state['buffers']) for state in self._states),
+                'bytes': sum(state['bytes'] for state in self._states),
+            }
+    
+    def clear(self):
+        """释放所有线程的缓冲区（正在使用的缓冲区由使用者继续持有，之后重新分配）"""
+        with self._lock:
+            for state in self._states:
+                with state['lock']:
+                    state['buffers'].clear()
+                    state['bytes'] = 0
+
+
+class PreprocessContext:
+    """预处理操作的上下文：取该节点的输出缓冲区和扫描器共用的CLAHE/卷积核"""
+    
+    __slots__ = ('resources', 'node')
+    
+    def __init__(self, resources, node):
+        self.resources = resources
+        self.node = node
+    
+    def buffer(self, shape, dtype=np.uint8):
+        return self.resources.buffer(self.node, tuple(shape), dtype)
+    
+    def clahe(self, clip_limit, tile_size):
+        return self.resources.clahe(clip_limit, tile_size)
+    
+    def kernel(self, kind, size=3):
+        return self.resources.kernel(kind, size)
+
+
+# 预处理操作：操作名 -> 函数(上下文, 输入图像..., **参数)，返回处理后的图像（不适用时返回None）
+# 上下文（PreprocessContext）提供可复用的输出缓冲区 ctx.buffer(形状) 和共用的CLAHE/卷积核
+PREPROCESS_OPS = {}
+
+
+def register_preprocess_op(name):
+    """注册一种预处理操作（装饰器），注册后即可在预处理图配置中按名称使用"""
+    def register(func):
+        PREPROCESS_OPS[name] = func
+        return func
+    return register
+
+
+@register_preprocess_op('clahe')
+def _op_clahe(ctx, image, clip_limit=2.0, tile_size=8):
+    # 对比度增强（CLAHE）
+    return ctx.clahe(clip_limit, tile_size).apply(image, dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('adaptive_threshold')
+def _op_adaptive_threshold(ctx, image, block_size, c):
+    # 小窗口对细节保留好，大窗口对整体效果好
+    return cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                 cv2.THRESH_BINARY, block_size, c, dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('otsu')
+def _op_otsu(ctx, image):
+    return cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                         dst=ctx.buffer(image.shape))[1]
+
+
+@register_preprocess_op('gaussian_blur')
+def _op_gaussian_blur(ctx, image, ksize=5, sigma=0):
+    return cv2.GaussianBlur(image, (ksize, ksize), sigma, dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('median_blur')
+def _op_median_blur(ctx, image, ksize=5):
+    # 中值滤波去除椒盐噪声
+    return cv2.medianBlur(image, ksize, dst=ctx.buffer(image.shape))
+
+
+_MORPH_OPS = {
+    'close': cv2.MORPH_CLOSE,
+    'open': cv2.MORPH_OPEN,
+    'dilate': cv2.MORPH_DILATE,
+    'erode': cv2.MORPH_ERODE,
+}
+
+
+@register_preprocess_op('morphology')
+def _op_morphology(ctx, image, op, size):
+    # 闭运算填充小孔，开运算去除小噪点
+    return cv2.morphologyEx(image, _MORPH_OPS[op], ctx.kernel('ones', size),
+                            dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('sharpen')
+def _op_sharpen(ctx, image):
+    return cv2.filter2D(image, -1, ctx.kernel('sharpen'), dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('bilateral')
+def _op_bilateral(ctx, image, d=9, sigma_color=75, sigma_space=75):
+    # 双边滤波（保边去噪）
+    return cv2.bilateralFilter(image, d, sigma_color, sigma_space, dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('equalize')
+def _op_equalize(ctx, image):
+    return cv2.equalizeHist(image, dst=ctx.buffer(image.shape))
+
+
+@register_preprocess_op('invert')
+def _op_invert(ctx, image):
+    # 有些二维码是反色的
+    return cv2.bitwise_not(image, dst=ctx.buffer(image.shape))
+
+
+def _resize(ctx, image, scale, interpolation):
+    height, width = image.shape[:2]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(image, size, dst=ctx.buffer((size[1], size[0])), interpolation=interpolation)
+
+
+@register_preprocess_op('rescale')
+def _op_rescale(ctx, image, small=200, large=1000):
+    height, width = image.shape[:2]
+    if height < small or width < small:
+        # 放大小图像
+        return _resize(ctx, image, 2, cv2.INTER_CUBIC)
+    elif height > large or width > large:
+        # 缩小大图像
+        return _resize(ctx, image, 0.5, cv2.INTER_AREA)
+    return None
+
+
+@register_preprocess_op('resize')
+def _op_resize(ctx, image, scale):
+    return _resize(ctx, image, scale, cv2.INTER_LINEAR)
+
+
+@register_preprocess_op('perspective')
+def _op_perspective(ctx, image, min_area=1000):
+    """透视变换校正（对倾斜/变形的二维码）"""
+    # 检测轮廓并尝试校正
+    edges = cv2.Canny(image, 50, 150, edges=ctx.buffer(image.shape))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    for contour in contours:
+        # 近似多边形
+        epsilon = 0.02 * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+        
+        # 如果是四边形（可能是二维码）
+        if len(approx) == 4 and cv2.contourArea(approx) > min_area:
+            pts = approx.reshape(4, 2)
+            rect = np.zeros((4, 2), dtype="float32")
+            
+            # 排序点：左上、右上、右下、左下
+            s = pts.sum(axis=1)
+            rect[0] = pts[np.argmin(s)]
+            rect[2] = pts[np.argmax(s)]
+            
+            diff = np.diff(pts, axis=1)
+            rect[1] = pts[np.argmin(diff)]
+            rect[3] = pts[np.argmax(diff)]
+            
+            # 计算目标尺寸
+            width = max(int(np.linalg.norm(rect[1] - rect[0])),
+                        int(np.linalg.norm(rect[2] - rect[3])))
+            height = max(int(np.linalg.norm(rect[3] - rect[0])),
+                         int(np.linalg.norm(rect[2] - rect[1])))
+            
+            dst = np.array([
+                [0, 0],
+                [width - 1, 0],
+                [width - 1, height - 1],
+                [0, height - 1]], dtype="float32")
+            
+            # 透视变换
+            M = cv2.getPerspectiveTransform(rect, dst)
+            return cv2.warpPerspective(image, M, (width, height))
+    return None
+
+
+@register_preprocess_op('polar')
+def _op_polar(ctx, image):
+    """圆形二维码检测（极坐标转换）"""
+    height, width = image.shape[:2]
+    center = (width // 2, height // 2)
+    max_radius = min(center[0], center[1])
+    return cv2.warpPolar(image, (360, max_radius), center, max_radius, cv2.WARP_POLAR_LINEAR,
+                         dst=ctx.buffer((max_radius, 360)))
+
+
+_ROTATIONS = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+
+@register_preprocess_op('rotate')
+def _op_rotate(ctx, image, angle=90):
+    height, width = image.shape[:2]
+    shape = (height, width) if angle == 180 else (width, height)
+    return cv2.rotate(image, _ROTATIONS[angle], dst=ctx.buffer(shape))
+
+
+class PreprocessGraph:
+    """
+    声明式预处理图
+    nodes: {节点名: (操作名, [输入节点名], {参数})}，也可以写成
+           {节点名: {'op': 操作名, 'inputs': [...], 'params': {...}}}（JSON配置文件用这种写法），
+           输入节点 'gray' 是整帧的灰度图
+    variants: 级联中要识别的节点名（默认尝试顺序），其余节点只作为共用的中间结果
+    adaptive_order: 是否允许扫描器按历史命中率和耗时重新排列 variants（配置中的 "adaptive_order"，
+                    默认False：自定义的预处理图按 variants 的顺序尝试；内置的默认图为True）
+    每帧的中间结果只计算一次（如高斯模糊、OTSU结果被多个节点共用），并统计每个节点自身的耗时
+    修改配置即可增删、调整预处理变体，不需要改代码
+    """
+    
+    SOURCE = 'gray'
+    # 改变图像尺寸的预处理操作（金字塔各层已覆盖多尺度，在金字塔层上跳过用到这些操作的变体）
+    SCALING_OPS = ('rescale', 'resize')
+    # 检查节点参数时试运行用的空白灰度图边长
+    DRY_RUN_SIZE = 64
+    
+    def __init__(self, nodes, variants, adaptive_order=False):
+        self.nodes = {name: self._parse_node(name, spec) for name, spec in nodes.items()}
+        self.variants = list(variants)
+        self.adaptive_order = bool(adaptive_order)
+        self.node_stats = {}  # 节点名 -> {'calls': 次数, 'skipped': 不适用次数, 'seconds': 累计耗时}
+        self._failed_nodes = set()  # 运行时出过错（已提示过）的节点
+        self._lock = threading.Lock()
+        self._validate()
+        self._dry_run()
+    
+    @classmethod
+    def from_config(cls, config):
+        """由配置创建：PreprocessGraph 对象、{'nodes':..., 'variants':...} 字典或JSON文件路径"""
+        if isinstance(config, cls):
+            return config
+        if isinstance(config, str):
+            with open(config, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        return cls(config['nodes'], config['variants'], config.get('adaptive_order', False))
+    
+    @staticmethod
+    def _parse_node(name, spec):
+        if isinstance(spec, dict):
+            op, inputs, params = spec['op'], spec.get('inputs', [PreprocessGraph.SOURCE]), spec.get('params', {})
+        else:
+            op, inputs, params = spec
+        return op, list(inputs), dict(params or {})
+    
+    def _validate(self):
+        """检查操作名、输入节点和变体是否存在，以及图中是否有环"""
+        if self.SOURCE in self.nodes:
+            raise ValueError(f"节点名 {self.SOURCE} 保留给输入灰度图")
+        for name, (op, inputs, _) in self.nodes.items():
+            if op not in PREPROCESS_OPS:
+                raise ValueError(f"节点 {name} 使用了未知的预处理操作: {op}，可选: {', '.join(PREPROCESS_OPS)}")
+            for source in inputs:
+                if source != self.SOURCE and source not in self.nodes:
+                    raise ValueError(f"节点 {name} 的输入节点不存在: {source}")
+        for name in self.variants:
+            if name != self.SOURCE and name not in self.nodes:
+                raise ValueError(f"预处理变体不存在: {name}")
+        
+        # 深度优先检查环
+        state = {}
+        def visit(name, path):
+            if state.get(name) == 'done' or name == self.SOURCE:
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"预处理图中存在环: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for source in self.nodes[name][1]:
+                visit(source, path + [name])
+            state[name] = 'done'
+        for name in self.nodes:
+            visit(name, [])
+    
+    def _dry_run(self):
+        """
+        在小块空白灰度图上逐个运行节点，检查参数（参数名拼错、核大小为偶数、未知的形态学操作等）
+        配置错误在创建时报告，而不是在每一帧上静默地没有输出
+        """
+        blank = np.full((self.DRY_RUN_SIZE, self.DRY_RUN_SIZE), 128, dtype=np.uint8)
+        for name, (op, inputs, params) in self.nodes.items():
+            try:
+                PREPROCESS_OPS[op](_FRESH_RESOURCES.context(name), *[blank] * len(inputs), **params)
+            except Exception as e:
+                raise ValueError(f"节点 {name} 的参数无效（{op} {params}）: {type(e).__name__}: {e}") from e
+    
+    def variants_using(self, ops):
+        """直接或经由输入节点用到 ops 中任一操作的变体名集合"""
+        ops = set(ops)
+        found = {}
+        def uses(name):
+            if name == self.SOURCE:
+                return False
+            if name not in found:
+                op, inputs, _ = self.nodes[name]
+                found[name] = op in ops or any(uses(source) for source in inputs)
+            return found[name]
+        return frozenset(name for name in self.variants if uses(name))
+    
+    def evaluate(self, name, gray, memo, resources=None):
+        """
+        求一个节点在当前帧上的值（不适用或出错时为None）
+        memo 是该帧的 FrameCache，输入节点递归求值，每个节点每帧只计算一次
+        resources: PreprocessResources（复用输出缓冲区），None则每次新分配
+        """
+        if name == self.SOURCE:
+            return gray
+        return memo.get(name, lambda: self._compute(name, gray, memo, resources or _FRESH_RESOURCES))
+    
+    def _compute(self, name, gray, memo, resources):
+        op, inputs, params = self.nodes[name]
+        values = [self.evaluate(source, gray, memo, resources) for source in inputs]
+        if any(value is None for value in values):
+            self._record(name, 0.0, False)
+            return None
+        
+        start = time.perf_counter()
+        try:
+            value = PREPROCESS_OPS[op](resources.context(name), *values, **params)
+        except cv2.error as e:
+            # 参数已在创建时检查过，这里只可能是个别图像不适用（如尺寸过小），每个节点只提示一次
+            value = None
+            with self._lock:
+                first = name not in self._failed_nodes
+                self._failed_nodes.add(name)
+            if first:
+                print(f"[!] 预处理节点 {name}（{op}）出错，该节点不适用的图像将被跳过: {e}")
+        self._record(name, time.perf_counter() - start, value is not None)
+        return value
+    
+    def _record(self, name, seconds, produced):
+        with self._lock:
+            entry = self.node_stats.setdefault(name, {'calls': 0, 'skipped': 0, 'seconds': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            if not produced:
+                entry['skipped'] += 1
+    
+    def report(self):
+        """每个节点的耗时统计，按累计耗时从大到小排列"""
+        with self._lock:
+            rows = {}
+            for name, entry in sorted(self.node_stats.items(), key=lambda item: -item[1]['seconds']):
+                calls = entry['calls']
+                rows[name] = {
+                    'op': self.nodes[name][0],
+                    'calls': calls,
+                    'skipped': entry['skipped'],
+                    'total_ms': entry['seconds'] * 1000,
+                    'mean_ms': entry['seconds'] * 1000 / calls if calls else 0.0,
+                }
+            return rows
+    
+    def reset(self):
+        with self._lock:
+            self.node_stats.clear()
+    
+    def to_config(self):
+        """导出为可写入JSON文件的配置"""
+        return {
+            'nodes': {name: {'op': op, 'inputs': inputs, 'params': params}
+                      for name, (op, inputs, params) in self.nodes.items()},
+            'variants': list(self.variants),
+            'adaptive_order': self.adaptive_order,
+        }
+
+
+# 不复用缓冲区的预处理资源（预处理结果需要在帧外保留时使用，CLAHE和卷积核照样共用）
+_FRESH_RESOURCES = PreprocessResources(reuse_buffers=False)
+
+
+class QRCodeScanner:
+    """二维码扫描器核心类"""
+    
+    # 二维码定位：图像长边不小于该值时，先定位候选区域再运行预处理级联
+    LOCALIZE_MIN_SIZE = 800
+    # 定位时把灰度图缩小到的长边尺寸
+    LOCALIZE_WORK_SIZE = 640
+    # 候选区域向外扩展的比例（相对区域边长）
+    LOCALIZE_PADDING = 0.25
+    # 图像金字塔：图像长边不小于该值时，每帧构建一次金字塔，从粗到细逐层识别
+    PYRAMID_MIN_SIZE = 1600
+    # 金字塔最粗一层的长边下限（再缩小二维码模块会小于1像素，识别不到）
+    PYRAMID_COARSEST_SIZE = 800
+    def __init__(self, adaptive_order=True, stats_path=None, parallel_workers=0, localize=True,
+                 symbology='all', backend='pyzbar', variant_backends=None,
+                 skip_similar_frames=False, similarity_threshold=1.5, force_rescan_every=15,
+                 min_sharpness=None, pyramid=True, preprocess_graph=None, reuse_buffers=True,
+                 result_cache=None, tile_workers=None):
+        """
+        adaptive_order: 是否按历史命中率和耗时自适应调整预处理级联顺序和 scan_image_file 的尝试顺序；
+                        预处理级联只在预处理图也允许时（PreprocessGraph.adaptive_order）才重新排列：
+                        自定义的预处理图默认按配置中 variants 的顺序尝试，不被统计覆盖
+        stats_path: 策略统计的持久化文件路径（None则只在内存中统计）
+        parallel_workers: 并行扫描的线程数，大于0时预处理级联的各策略在线程池中
+                          同时运行，任一策略识别成功即返回（0为顺序扫描）
+        localize: 大图是否先定位二维码候选区域，只在区域裁剪图上运行预处理级联
+        symbology: 码制配置，SYMBOLOGY_PRESETS 中的预设名（'all'/'qr'/'2d'/'retail_1d'）
+                   或 ZBarSymbol（或其成员名）列表，作用于扫描过程中的每一次识别调用
+        backend: 识别后端，DECODER_BACKENDS 中的名称（'pyzbar'/'opencv'/'opencv_aruco'）
+                 或 DecoderBackend 对象
+        variant_backends: 按阶段单独指定识别后端 {阶段名: 后端}，阶段名为
+                          'direct'（原图）、'gray'（灰度图）或预处理策略名
+        skip_similar_frames: scan_frame 遇到与最近扫描过的帧几乎相同的画面时，
+                             直接复用上次的结果，用于摄像头实时扫描（未命中直接复用，
+                             命中先在二维码原位置重新识别确认，确认失败时整帧扫描）
+        similarity_threshold: 判定为相似帧的整帧平均像素差（灰度级），
+                              另有单个格子的像素差上限（RecentFrames.cell_threshold）
+        force_rescan_every: 连续复用多少帧后强制重新扫描一次
+        min_sharpness: 清晰度门限（measure_sharpness 的值），scan_frame 遇到低于门限的
+                       模糊帧直接跳过，不进入识别级联（None为不限制）
+        pyramid: 大图是否使用图像金字塔从粗到细识别（代替对整图的独立缩放策略）
+        preprocess_graph: 预处理图配置（PreprocessGraph、配置字典或JSON文件路径），
+                          None则使用默认的 PREPROCESS_GRAPH
+        reuse_buffers: 是否在帧间复用灰度图和预处理结果的输出缓冲区（减少每帧的内存分配）
+        result_cache: scan_image_file 的识别结果缓存（ScanResultCache 或SQLite文件路径），
+                      按图片内容缓存，内容未变的图片直接返回上次的结果（None则不缓存）
+        tile_workers: 分块扫描（scan_tiles，以及 scan_image_file 对超大图片的分块识别）的线程数，
+                      None则使用 parallel_workers，未设置时为CPU核心数；
+                      多进程批量扫描时每个进程应设为1，避免 进程数×CPU核心数 个线程争抢CPU
+        """
+        self.capture = None
+        self.is_running = False
+        self.last_result = None
+        self.adaptive_order = adaptive_order
+        self.strategy_stats = StrategyStats(stats_path)
+        self.profiler = None  # 性能剖析默认关闭
+        self.parallel_workers = parallel_workers
+        self.tile_workers = tile_workers
+        self.localize = localize
+        self.symbology = symbology
+        self.symbols = resolve_symbology(symbology)
+        self.backend = create_backend(backend, self.symbols)
+        self.variant_backends = {
+            variant: create_backend(variant_backend, self.symbols)
+            for variant, variant_backend in (variant_backends or {}).items()
+        }
+        self.recent_frames = None
+        if skip_similar_frames:
+            self.recent_frames = RecentFrames(similarity_threshold, force_rescan_every)
+        self.min_sharpness = min_sharpness
+        self.pyramid = pyramid
+        self.preprocess_graph = PreprocessGraph.from_config(preprocess_graph or self.PREPROCESS_GRAPH)
+        self.preprocess_resources = PreprocessResources(reuse_buffers)
+        if isinstance(result_cache, str):
+            result_cache = ScanResultCache(result_cache)
+        self.result_cache = result_cache
+        # scan_frame 的帧计数：实际扫描的帧数、复用结果的帧数、因模糊被拦截的帧数
+        self.frame_stats = {'scanned': 0, 'reused': 0, 'gated': 0}
+        # 定位用的OpenCV检测器不是线程安全的，每个线程各用一个
+        self._local = threading.local()
+        self._executor = None
+        self._saved_cv_threads = None
+        
+    def _get_executor(self):
+        """按需创建并行扫描线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.parallel_workers,
+                                                thread_name_prefix='qr-scan')
+            # 线程池与OpenCV内部线程共用CPU核心：限制OpenCV每个调用的线程数，
+            # 使 线程池大小 × OpenCV线程数 不超过核心数，避免过度订阅
+            cpu_count = os.cpu_count() or 1
+            self._saved_cv_threads = cv2.getNumThreads()
+            cv2.setNumThreads(max(1, cpu_count // self.parallel_workers))
+        return self._executor
+    
+    def load_backends(self):
+        """
+        立即加载所有识别后端（默认在第一次识别时才加载）
+        识别库不可用（如安装了pyzbar但缺少zbar动态库）时抛出 ImportError，供启动时检查依赖
+        """
+        for backend in [self.backend, *self.variant_backends.values()]:
+            backend.load()
+    
+    def close(self):
+        """释放扫描器资源：关闭摄像头、线程池和识别结果缓存，恢复OpenCV线程数，保存策略统计"""
+        self.stop_camera()
+        if self.result_cache is not None:
+            self.result_cache.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            cv2.setNumThreads(self._saved_cv_threads)
+        
+    def enable_profiling(self, window=1000):
+        """开启性能剖析，返回 ScanProfiler（可调用 report()/dump_json() 查看结果）"""
+        if self.profiler is None:
+            self.profiler = ScanProfiler(window)
+        return self.profiler
+    
+    def disable_profiling(self):
+        """关闭性能剖析"""
+        self.profiler = None
+    
+    def start_camera(self, camera_id=0):
+        """启动摄像头"""
+        self.capture = cv2.VideoCapture(camera_id)
+        if not self.capture.isOpened():
+            raise Exception("无法打开摄像头")
+        
+        # 设置较低的分辨率以提高性能
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        
+        self.is_running = True
+        return True
+        
+    def stop_camera(self):
+        """停止摄像头"""
+        self.is_running = False
+        if self.capture:
+            self.capture.release()
+            self.capture = None
+        self.strategy_stats.save()
+            
+    def get_frame(self):
+        """获取一帧图像"""
+        if self.capture and self.is_running:
+            ret, frame = self.capture.read()
+            if ret:
+                return frame
+        return None
+        
+    # 默认预处理图：节点名 -> (操作名, 输入节点, 参数)，'gray' 是整帧灰度图
+    # 共用的中间结果（blurred、otsu、polar）每帧只计算一次
+    PREPROCESS_GRAPH = {
+        'nodes': {
+            'clahe': ('clahe', ['gray'], {'clip_limit': 2.0, 'tile_size': 8}),        # 对比度增强（CLAHE）
+            'adaptive_small': ('adaptive_threshold', ['gray'], {'block_size': 7, 'c': 2}),   # 自适应阈值 - 小窗口
+            'adaptive_large': ('adaptive_threshold', ['gray'], {'block_size': 21, 'c': 5}),  # 自适应阈值 - 大窗口
+            'otsu': ('otsu', ['gray'], {}),                                          # OTSU自动阈值
+            'blurred': ('gaussian_blur', ['gray'], {'ksize': 5}),                    # 高斯模糊（中间结果）
+            'blurred_otsu': ('otsu', ['blurred'], {}),                               # 高斯模糊后OTSU
+            'median': ('median_blur', ['gray'], {'ksize': 5}),                       # 中值滤波
+            'morph_close': ('morphology', ['otsu'], {'op': 'close', 'size': 3}),     # 形态学闭运算（基于OTSU）
+            'morph_open': ('morphology', ['otsu'], {'op': 'open', 'size': 2}),       # 形态学开运算（基于OTSU）
+            'sharpened': ('sharpen', ['gray'], {}),                                  # 锐化
+            'bilateral': ('bilateral', ['gray'], {}),                                # 双边滤波
+            'equalized': ('equalize', ['gray'], {}),                                 # 直方图均衡化
+            'inverted': ('invert', ['gray'], {}),                                    # 反色图像
+            'rescaled': ('rescale', ['gray'], {}),                                   # 过小放大/过大缩小
+            'perspective': ('perspective', ['gray'], {}),                            # 透视变换校正
+            'polar': ('polar', ['gray'], {}),                                        # 圆形二维码（极坐标）
+            'polar_rotated': ('rotate', ['polar'], {'angle': 90}),
+            'scale_0.8': ('resize', ['gray'], {'scale': 0.8}),                       # 多尺度检测
+            'scale_1.2': ('resize', ['gray'], {'scale': 1.2}),
+            'scale_1.5': ('resize', ['gray'], {'scale': 1.5}),
+        },
+        # 预处理级联（默认尝试顺序），级联是惰性的：只有前面的变体全部识别失败，才会计算下一个
+        'variants': [
+            'gray', 'clahe', 'adaptive_small', 'adaptive_large', 'otsu', 'blurred_otsu',
+            'median', 'morph_close', 'morph_open', 'sharpened', 'bilateral', 'equalized',
+            'inverted', 'rescaled', 'perspective', 'polar', 'polar_rotated',
+            'scale_0.8', 'scale_1.2', 'scale_1.5',
+        ],
+        # 内置顺序只是初始顺序，启用自适应时按统计重新排列
+        'adaptive_order': True,
+    }
+    
+    def preprocess_for_artistic_qr(self, image):
+        """增强预处理 - 支持异形二维码和难识别二维码（一次性生成全部预处理图像）"""
+        return [processed for _, processed, _ in self.iter_preprocessed(image, reuse_buffers=False)
+                if processed is not None]
+    
+    def iter_preprocessed(self, image, exclude=(), reuse_buffers=True):
+        """
+        惰性预处理生成器
+        按级联顺序逐个产出 (策略名, 预处理图像, 预处理耗时秒)，调用方识别成功后停止迭代，
+        后面代价较高的预处理（双边滤波、轮廓检测、极坐标变换等）就不会被计算
+        策略不适用或出错时预处理图像为None（耗时照样产出，便于统计）
+        exclude: 本次跳过的策略名
+        reuse_buffers: 预处理图像写入扫描器复用的缓冲区（只在下一帧之前有效），
+                       需要保留预处理图像时传 False
+        """
+        resources = self.preprocess_resources if reuse_buffers else None
+        # 转换为灰度图（已经是灰度图时直接使用，不再复制）
+        if len(image.shape) == 3:
+            gray = (resources or _FRESH_RESOURCES).gray('cascade.gray', image)
+        else:
+            gray = image
+        
+        cache = FrameCache()
+        for name in self.cascade_order(exclude):
+            processed, seconds = self._run_strategy(name, gray, cache, resources)
+            yield name, processed, seconds
+    
+    def _run_strategy(self, name, gray, cache, resources):
+        """求一个预处理变体（共用的中间结果从帧缓存中取），返回 (预处理图像或None, 耗时秒)"""
+        start = time.perf_counter()
+        processed = self.preprocess_graph.evaluate(name, gray, cache, resources)
+        return processed, time.perf_counter() - start
+    
+    def cascade_order(self, exclude=()):
+        """
+        当前的预处理级联顺序（变体名列表），exclude 中的变体被去掉
+        扫描器和预处理图都启用自适应时按期望代价排序，否则为预处理图中 variants 的顺序
+        """
+        cascade = [name for name in self.preprocess_graph.variants if name not in exclude]
+        if self.adaptive_order and self.preprocess_graph.adaptive_order:
+            return self.strategy_stats.order(cascade)
+        return cascade
+    
+    def _backend_for(self, variant):
+        """该阶段的识别后端（未单独指定时为扫描器的默认后端）"""
+        return self.variant_backends.get(variant, self.backend)
+    
+    def _decode(self, image, variant=None):
+        """用该阶段的识别后端识别（未单独指定时使用扫描器的默认后端）"""
+        return self._backend_for(variant).decode(image)
+        
+    def _collect_results(self, decoded_objects, seen_data, all_results):
+        """将decode()的结果去重后追加到结果列表（seen_data为None时不按内容去重）"""
+        for obj in decoded_objects:
+            try:
+                data = self._decode_data(obj.data)
+                if data and (seen_data is None or data not in seen_data):
+                    if seen_data is not None:
+                        seen_data.add(data)
+                    rect = obj.rect
+                    all_results.append({
+                        'data': data,
+                        'type': obj.type,
+                        'rect': (rect.left, rect.top, rect.width, rect.height),
+                        'polygon': [(int(point[0]), int(point[1])) for point in obj.polygon]
+                    })
+            except Exception:
+                continue
+        return all_results
+        
+    def scan_frame(self, frame, deadline_ms=None, cancel_token=None):
+        """
+        增强扫描 - 支持各种难识别二维码和异形二维码
+        deadline_ms: 时间预算（毫秒），到期后在两个阶段之间停止并返回已找到的结果
+        cancel_token: CancelToken，被取消时同样提前结束
+        返回 ScanResult，提前结束时 truncated 为 True
+        """
+        deadline = self._make_deadline(deadline_ms, cancel_token)
+        if frame is None:
+            return ScanResult()
+        
+        # 与最近扫描过的帧几乎相同时直接复用结果
+        signature = None
+        if self.recent_frames is not None:
+            signature = self.recent_frames.signature(frame)
+            reused = self.recent_frames.lookup(signature)
+            if reused:
+                # 复用的命中结果先在原位置确认二维码还在，避免显示已经移走的二维码
+                reused = self._verify_reused(frame, reused)
+            if reused is not None:
+                self.frame_stats['reused'] += 1
+                if self.profiler:
+                    self.profiler.record('frame.reused', 0.0, bool(reused))
+                return reused
+        
+        # 模糊帧几乎无法识别，不进入识别级联，把算力留给后面的清晰帧
+        if self.min_sharpness is not None:
+            start = time.perf_counter() if self.profiler else 0
+            sharp = measure_sharpness(frame) >= self.min_sharpness
+            if self.profiler:
+                self.profiler.record('frame.sharpness', time.perf_counter() - start, sharp)
+            if not sharp:
+                self.frame_stats['gated'] += 1
+                return ScanResult(gated=True)
+        
+        self.frame_stats['scanned'] += 1
+        results = self._scan_frame_timed(frame, deadline)
+        # 提前结束的搜索可能漏掉了画面中的二维码，不能作为相似帧复用的依据
+        if signature is not None and not results.truncated:
+            self.recent_frames.remember(signature, results)
+        return results
+    
+    # 确认复用的识别结果时，识别区域相对二维码外接矩形向外扩展的比例
+    REUSE_VERIFY_PADDING = 0.3
+    
+    def _verify_reused(self, frame, reused):
+        """在当前帧中每个复用结果的位置重新识别一次，全部确认时返回更新了位置的结果，否则返回None"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else frame
+        height, width = gray.shape[:2]
+        verified = []
+        for result in reused:
+            x, y, w, h = result['rect']
+            pad = int(max(w, h) * self.REUSE_VERIFY_PADDING)
+            x1, y1 = max(0, x - pad), max(0, y - pad)
+            x2, y2 = min(width, x + w + pad), min(height, y + h + pad)
+            if x2 - x1 < 8 or y2 - y1 < 8:
+                return None
+            found = self._collect_results(self._decode(gray[y1:y2, x1:x2], 'direct'), None, [])
+            found = [r for r in self._offset_results(found, x1, y1) if r['data'] == result['data']]
+            if not found:
+                return None
+            verified.append(found[0])
+        return ScanResult(verified, reused.truncated)
+    
+    @staticmethod
+    def _make_deadline(deadline_ms, cancel_token):
+        if deadline_ms is None and cancel_token is None:
+            return NO_DEADLINE
+        return ScanDeadline(deadline_ms, cancel_token)
+    
+    def _scan_frame_timed(self, frame, deadline):
+        if self.profiler is None:
+            return self._scan_frame(frame, deadline)
+        
+        start = time.perf_counter()
+        results = self._scan_frame(frame, deadline)
+        self.profiler.record('frame.total', time.perf_counter() - start, bool(results))
+        return results
+    
+    def _scan_frame(self, frame, deadline):
+        if frame is None:
+            return ScanResult()
+        if deadline.expired():
+            return ScanResult(truncated=True)
+        
+        if self.pyramid and max(frame.shape[:2]) >= self.PYRAMID_MIN_SIZE:
+            return self._scan_pyramid(frame, deadline)
+        
+        profiler = self.profiler
+        all_results = ScanResult()
+        seen_data = set()
+        
+        # 1. 首先尝试直接扫描原图（支持所有二维码类型）
+        start = time.perf_counter() if profiler else 0
+        self._collect_results(self._decode(frame, 'direct'), seen_data, all_results)
+        if profiler:
+            profiler.record('frame.direct', time.perf_counter() - start, bool(all_results))
+        
+        # 如果已经识别到，直接返回（优化性能）
+        if all_results:
+            return all_results
+        
+        # 2. 尝试扫描原图的灰度版本
+        if deadline.expired():
+            all_results.truncated = True
+            return all_results
+        gray = None
+        try:
+            start = time.perf_counter() if profiler else 0
+            gray = self.preprocess_resources.gray('frame.gray', frame)
+            
+            # 输入本身就是灰度图且两个阶段的后端相同时，与第1步的识别完全重复，跳过
+            if gray is not frame or self._backend_for('gray') is not self._backend_for('direct'):
+                self._collect_results(self._decode(gray, 'gray'), seen_data, all_results)
+                if profiler:
+                    profiler.record('frame.gray', time.perf_counter() - start, bool(all_results))
+                if all_results:
+                    return all_results
+        except ImportError:
+            # 识别库无法加载（如缺少zbar动态库）不是这一帧的问题，交给调用方报告
+            raise
+        except Exception:
+            pass
+        
+        # 3. 大图先定位二维码候选区域，只在区域裁剪图上运行预处理级联
+        if (self.localize and gray is not None
+                and max(gray.shape[:2]) >= self.LOCALIZE_MIN_SIZE):
+            self._cascade_candidates(gray, deadline, seen_data, all_results)
+            if all_results or all_results.truncated:
+                return all_results
+        
+        # 4. 全图预处理级联（没有候选区域或候选区域都识别失败时），直接使用上面的灰度图
+        self._run_cascade(frame if gray is None else gray, deadline, seen_data, all_results)
+        return all_results
+    
+    def _scan_pyramid(self, frame, deadline):
+        """
+        大图的从粗到细扫描：每帧只构建一次图像金字塔
+        1. 从最粗一层到原图逐层直接识别（大码在粗层上就能识别，代价只有原图的几分之一）
+        2. 定位候选区域，在原图裁剪图上运行预处理级联
+        3. 从粗到细在各层上运行预处理级联（阈值、CLAHE等都在小图上先算），
+           跳过已由金字塔覆盖的缩放策略
+        结果坐标换算回原图
+        """
+        profiler = self.profiler
+        all_results = ScanResult()
+        seen_data = set()
+        
+        start = time.perf_counter() if profiler else 0
+        gray = self.preprocess_resources.gray('frame.gray', frame)
+        levels = self.build_pyramid(gray)
+        if profiler:
+            profiler.record('frame.pyramid', time.perf_counter() - start, True)
+        
+        # 1. 逐层直接识别（从粗到细）
+        for factor, level in reversed(levels):
+            if deadline.expired():
+                all_results.truncated = True
+                return all_results
+            start = time.perf_counter() if profiler else 0
+            level_results = ScanResult()
+            try:
+                self._collect_results(self._decode(level, 'gray'), seen_data, level_results)
+            except ImportError:
+                raise
+            except Exception:
+                pass
+            all_results.extend(self._scale_results(level_results, factor))
+            if profiler:
+                profiler.record(f'frame.level{factor}', time.perf_counter() - start,
+                                bool(level_results))
+            if all_results:
+                return all_results
+        
+        # 2. 候选区域定位
+        if self.localize:
+            self._cascade_candidates(gray, deadline, seen_data, all_results)
+            if all_results or all_results.truncated:
+                return all_results
+        
+        # 3. 逐层预处理级联（从粗到细）：金字塔各层已经覆盖了多尺度，跳过预处理图中的缩放变体
+        skip = self.preprocess_graph.variants_using(PreprocessGraph.SCALING_OPS)
+        for factor, level in reversed(levels):
+            if deadline.expired():
+                all_results.truncated = True
+                break
+            level_results = ScanResult()
+            self._run_cascade(level, deadline, seen_data, level_results, exclude=skip)
+            all_results.extend(self._scale_results(level_results, factor))
+            if level_results.truncated:
+                all_results.truncated = True
+            if all_results or all_results.truncated:
+                break
+        return all_results
+    
+    def build_pyramid(self, gray):
+        """
+        构建图像金字塔（cv2.pyrDown 逐层减半）
+        返回 [(缩小倍数, 图像), ...]，从原图（倍数1）到最粗一层，
+        最粗一层的长边不小于 PYRAMID_COARSEST_SIZE
+        """
+        levels = [(1, gray)]
+        factor, level = 1, gray
+        while max(level.shape[:2]) // 2 >= self.PYRAMID_COARSEST_SIZE:
+            height, width = level.shape[:2]
+            factor *= 2
+            level = cv2.pyrDown(level, dst=self.preprocess_resources.buffer(
+                f'pyramid.{factor}', ((height + 1) // 2, (width + 1) // 2)))
+            levels.append((factor, level))
+        return levels
+    
+    @staticmethod
+    def _scale_results(results, factor):
+        """把金字塔层上的识别结果坐标放大回原图坐标系"""
+        if factor == 1:
+            return results
+        for result in results:
+            x, y, w, h = result['rect']
+            result['rect'] = (x * factor, y * factor, w * factor, h * factor)
+            result['polygon'] = [(px * factor, py * factor) for px, py in result.get('polygon', ())]
+        return results
+    
+    def _run_cascade(self, image, deadline, seen_data, all_results, exclude=()):
+        """预处理级联（顺序模式为惰性逐个尝试，并行模式为线程池竞速）"""
+        if self.parallel_workers > 0:
+            self._cascade_parallel(image, deadline, seen_data, all_results, exclude)
+        else:
+            self._cascade_sequential(image, deadline, seen_data, all_results, exclude)
+    
+    def _cascade_candidates(self, gray, deadline, seen_data, all_results):
+        """对每个候选区域的裁剪图运行预处理级联，并把坐标映射回整帧"""
+        start = time.perf_counter() if self.profiler else 0
+        candidates = self.locate_candidates(gray)
+        if self.profiler:
+            self.profiler.record('frame.localize', time.perf_counter() - start, bool(candidates))
+        
+        for x, y, w, h in candidates:
+            if deadline.expired():
+                all_results.truncated = True
+                return
+            crop_results = ScanResult()
+            self._run_cascade(gray[y:y + h, x:x + w], deadline, seen_data, crop_results)
+            all_results.extend(self._offset_results(crop_results, x, y))
+            if crop_results.truncated:
+                all_results.truncated = True
+            if all_results:
+                return
+    
+    def locate_candidates(self, gray, work_size=None):
+        """
+        快速定位二维码候选区域
+        在缩小的灰度图（长边 work_size，默认 LOCALIZE_WORK_SIZE）上用 cv2.QRCodeDetector
+        检测定位图案，返回原图坐标系下扩展过边距的区域列表 [(x, y, w, h), ...]
+        """
+        height, width = gray.shape[:2]
+        scale = min(1.0, (work_size or self.LOCALIZE_WORK_SIZE) / max(height, width))
+        small = gray
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = self._local.detector = cv2.QRCodeDetector()
+        try:
+            found, points = detector.detectMulti(small)
+            if not found:
+                found, points = detector.detect(small)
+                points = [points] if found else []
+        except cv2.error:
+            return []
+        if not found or points is None:
+            return []
+        
+        candidates = []
+        for quad in points:
+            quad = np.asarray(quad, dtype=np.float32).reshape(-1, 2) / scale
+            x1, y1 = quad.min(axis=0)
+            x2, y2 = quad.max(axis=0)
+            pad = max(x2 - x1, y2 - y1) * self.LOCALIZE_PADDING + 8
+            box_x1 = max(0, int(x1 - pad))
+            box_y1 = max(0, int(y1 - pad))
+            box_x2 = min(width, int(x2 + pad))
+            box_y2 = min(height, int(y2 + pad))
+            if box_x2 - box_x1 < 16 or box_y2 - box_y1 < 16:
+                continue
+            box = (box_x1, box_y1, box_x2 - box_x1, box_y2 - box_y1)
+            if box not in candidates:
+                candidates.append(box)
+        return candidates
+    
+    @staticmethod
+    def _offset_results(results, dx, dy):
+        """把裁剪图中的识别结果坐标平移回原图坐标系"""
+        for result in results:
+            x, y, w, h = result['rect']
+            result['rect'] = (x + dx, y + dy, w, h)
+            result['polygon'] = [(px + dx, py + dy) for px, py in result.get('polygon', ())]
+        return results
+    
+    # 多码模式下定位使用的长边尺寸（比单码模式大，保证整页上的小码也能被检测到）
+    MULTI_LOCALIZE_WORK_SIZE = 1600
+    
+    def scan_frame_multi(self, frame, deadline_ms=None, cancel_token=None, workers=None):
+        """
+        多码模式 - 一次扫描识别画面中的所有二维码（如整张拣货单）
+        1. 原图/灰度图直接识别（zbar本身可以一次识别多个码）
+        2. 定位所有候选区域，跳过已识别的区域，其余区域的裁剪图在线程池中并行运行预处理级联
+        3. 结果映射回整帧坐标，同一位置重复识别到的相同内容只保留一个
+        workers: 并行线程数（默认使用 parallel_workers，未设置时为CPU核心数）
+        返回 ScanResult，超出时间预算时 truncated 为 True
+        """
+        deadline = self._make_deadline(deadline_ms, cancel_token)
+        all_results = ScanResult()
+        if frame is None:
+            return all_results
+        
+        start = time.perf_counter() if self.profiler else 0
+        
+        # 1. 整帧直接识别
+        found = []
+        self._collect_results(self._decode(frame, 'direct'), None, found)
+        gray = self.preprocess_resources.gray('frame.gray', frame)
+        if not deadline.expired():
+            self._collect_results(self._decode(gray, 'gray'), None, found)
+        for result in found:
+            self._merge_result(all_results, result)
+        
+        # 2. 候选区域并行识别
+        if deadline.expired():
+            all_results.truncated = True
+        else:
+            candidates = [box for box in self.locate_candidates(gray, self.MULTI_LOCALIZE_WORK_SIZE)
+                          if not self._box_covered(box, all_results)]
+            if candidates:
+                self._scan_candidates_parallel(gray, candidates, deadline, all_results,
+                                               workers or self.parallel_workers or os.cpu_count() or 1)
+        
+        # 按阅读顺序（从上到下、从左到右）排列
+        all_results.sort(key=lambda result: (result['rect'][1], result['rect'][0]))
+        if self.profiler:
+            self.profiler.record('frame.multi', time.perf_counter() - start, bool(all_results))
+        return all_results
+    
+    def _scan_candidates_parallel(self, gray, candidates, deadline, all_results, workers):
+        """在线程池中对各候选区域运行顺序预处理级联（每个区域一个任务）"""
+        def scan_crop(box):
+            x, y, w, h = box
+            crop_results = ScanResult()
+            self._cascade_sequential(gray[y:y + h, x:x + w], deadline, set(), crop_results)
+            return self._offset_results(crop_results, x, y)
+        
+        with ThreadPoolExecutor(max_workers=min(workers, len(candidates)),
+                                thread_name_prefix='qr-multi') as executor:
+            pending = {executor.submit(scan_crop, box) for box in candidates}
+            while pending:
+                remaining = deadline.remaining_ms()
+                timeout = 0.05 if remaining is None else min(remaining / 1000, 0.05)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    crop_results = future.result()
+                    for result in crop_results:
+                        self._merge_result(all_results, result)
+                    if crop_results.truncated:
+                        all_results.truncated = True
+                if deadline.expired() and pending:
+                    all_results.truncated = True
+                    for future in pending:
+                        future.cancel()
+                    break
+    
+    @staticmethod
+    def _rects_overlap(rect_a, rect_b):
+        """两个矩形 (x, y, w, h) 是否有一个的中心落在另一个内"""
+        for (ax, ay, aw, ah), (bx, by, bw, bh) in ((rect_a, rect_b), (rect_b, rect_a)):
+            cx, cy = ax + aw / 2, ay + ah / 2
+            if bx <= cx <= bx + bw and by <= cy <= by + bh:
+                return True
+        return False
+    
+    def _merge_result(self, all_results, result):
+        """合并结果：同一位置上的相同内容视为重复，不同位置的相同内容（多张相同标签）都保留"""
+        for existing in all_results:
+            if (existing['data'] == result['data']
+                    and self._rects_overlap(existing['rect'], result['rect'])):
+                return False
+        all_results.append(result)
+        return True
+    
+    def _box_covered(self, box, results):
+        """候选区域中是否已有识别结果"""
+        return any(self._rects_overlap(box, result['rect']) for result in results)
+    
+    def _record_strategy(self, name, processed_img, prep_seconds, decode_seconds, hit):
+        """记录一种策略的耗时（预处理+识别）和命中情况，用于调整下次的级联顺序"""
+        self.strategy_stats.record(name, prep_seconds + decode_seconds, hit)
+        if self.profiler:
+            self.profiler.record('prep.' + name, prep_seconds, processed_img is not None)
+            if processed_img is not None:
+                self.profiler.record('decode.' + name, decode_seconds, hit)
+    
+    def _cascade_sequential(self, frame, deadline, seen_data, all_results, exclude=()):
+        """惰性级联：逐个生成预处理图像并立即识别，识别成功即停止，后续预处理不再计算"""
+        for name, processed_img, prep_seconds in self.iter_preprocessed(frame, exclude):
+            start = time.perf_counter()
+            if processed_img is not None:
+                try:
+                    self._collect_results(self._decode(processed_img, name), seen_data, all_results)
+                except ImportError:
+                    raise
+                except Exception:
+                    pass
+            
+            hit = bool(all_results)
+            self._record_strategy(name, processed_img, prep_seconds,
+                                  time.perf_counter() - start, hit)
+            
+            # 如果识别到结果，可以提前结束
+            if hit:
+                break
+            
+            # 在计算下一种预处理之前检查截止条件
+            if deadline.expired():
+                all_results.truncated = True
+                break
+    
+    def _cascade_parallel(self, frame, deadline, seen_data, all_results, exclude=()):
+        """
+        并行级联：所有策略（预处理+识别）提交到线程池竞速，
+        任一策略识别成功即返回，尚未开始的策略被取消，正在运行的策略结果被丢弃
+        （pyzbar识别和大部分OpenCV运算会释放GIL，多线程可以真正并行）
+        """
+        gray = self.preprocess_resources.gray('cascade.gray', frame)
+        
+        cache = FrameCache()
+        stop = threading.Event()
+        executor = self._get_executor()
+        pending = {executor.submit(self._race_strategy, name, gray, cache, stop)
+                   for name in self.cascade_order(exclude)}
+        try:
+            while pending:
+                # 定期醒来检查截止条件（取消令牌没有超时时间，也需要轮询）
+                remaining = deadline.remaining_ms()
+                timeout = 0.05 if remaining is None else min(remaining / 1000, 0.05)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name, processed_img, decoded, prep_seconds, decode_seconds = future.result()
+                    if decoded is None:
+                        continue
+                    found_before = len(all_results)
+                    self._collect_results(decoded, seen_data, all_results)
+                    self._record_strategy(name, processed_img, prep_seconds, decode_seconds,
+                                          len(all_results) > found_before)
+                
+                if all_results:
+                    break
+                if deadline.expired():
+                    all_results.truncated = True
+                    break
+        finally:
+            stop.set()
+            for future in pending:
+                future.cancel()
+    
+    def _race_strategy(self, name, gray, cache, stop):
+        """线程池任务：执行一种策略并识别；竞速已结束时直接返回（识别结果为None）"""
+        if stop.is_set():
+            return name, None, None, 0.0, 0.0
+        processed_img, prep_seconds = self._run_strategy(name, gray, cache, self.preprocess_resources)
+        if processed_img is None:
+            return name, None, [], prep_seconds, 0.0
+        if stop.is_set():
+            return name, processed_img, None, prep_seconds, 0.0
+        
+        start = time.perf_counter()
+        try:
+            decoded = self._decode(processed_img, name)
+        except ImportError:
+            raise
+        except Exception:
+            decoded = []
+        return name, processed_img, decoded, prep_seconds, time.perf_counter() - start
+    
+    def _decode_data(self, raw_data):
+        """解码二维码数据 - 支持多种编码"""
+        if not raw_data:
+            return None
+        
+        # 尝试多种编码
+        encodings = ['utf-8', 'gbk', 'gb2312', 'big5', 'shift_jis', 'euc-jp', 'latin-1', 'ascii']
+        
+        for encoding in encodings:
+            try:
+                return raw_data.decode(encoding)
+            except (UnicodeDecodeError, LookupError):
+                continue
+        
+        # 如果都失败，使用utf-8带错误忽略
+        try:
+            return raw_data.decode('utf-8', errors='ignore')
+        except:
+            return str(raw_data) if raw_data else None
+        
+    def scan_image_file(self, image_path, deadline_ms=None, cancel_token=None, all_pages=False):
+        """
+        增强图片文件扫描 - 支持各种格式、异形和难识别二维码
+        按 image_attempt_order() 的搜索计划依次尝试原图、裁剪、旋转、翻转，识别成功即停止
+        单页JPEG大图先降分辨率解码并直接识别，识别不到再解码原图（灰度）走完整的搜索计划
+        多页图片（GIF、多页TIFF、动画WebP）逐页读取、逐页搜索：默认在第一个识别成功的页停止，
+        all_pages=True 时扫描所有页；每个结果带 'page' 页号（单页图片为0）
+        deadline_ms / cancel_token 作用于整个搜索过程（所有页以及旋转、裁剪、翻转尝试），
+        含义同 scan_frame；返回 ScanResult，attempt / page 为第一个识别成功的尝试名和页号
+        设置了 result_cache 时，内容未变的图片直接返回缓存的结果（cached 为 True）
+        """
+        deadline = self._make_deadline(deadline_ms, cancel_token)
+        start = time.perf_counter() if self.profiler else 0
+        try:
+            if self.result_cache is None:
+                results = self._scan_image_file(image_path, deadline, all_pages)
+            else:
+                results = self._scan_image_file_cached(image_path, deadline, all_pages)
+        finally:
+            self._release_image_buffers()
+        if self.profiler is None:
+            return results
+        
+        self.profiler.record('image.total', time.perf_counter() - start, bool(results))
+        return results
+    
+    # 识别逻辑变化（同样的配置识别结果可能不同）时递增，使识别结果缓存中的旧结果失效
+    RESULT_CACHE_VERSION = 1
+    
+    def config_fingerprint(self, all_pages=False):
+        """
+        影响 scan_image_file 识别结果的配置指纹：码制、识别后端、预处理图、搜索计划、分块/金字塔/定位参数等
+        作为识别结果缓存键的一部分，配置变化后旧结果自动不再使用
+        """
+        config = {
+            'version': self.RESULT_CACHE_VERSION,
+            'symbols': None if self.symbols is None else sorted(self.symbols),
+            'backend': self.backend.name,
+            'variant_backends': {variant: backend.name for variant, backend in self.variant_backends.items()},
+            'graph': self.preprocess_graph.to_config(),
+            'attempts': self.IMAGE_ATTEMPTS,
+            'localize': [self.localize, self.LOCALIZE_MIN_SIZE, self.LOCALIZE_WORK_SIZE, self.LOCALIZE_PADDING],
+            'pyramid': [self.pyramid, self.PYRAMID_MIN_SIZE, self.PYRAMID_COARSEST_SIZE],
+            'tiles': [self.TILE_MIN_SIZE, self.TILE_SIZE, self.TILE_OVERLAP],
+            'reduced': self.IMAGE_REDUCED_MIN_SIZE,
+            'all_pages': all_pages,
+        }
+        raw = json.dumps(config, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def prune_result_cache(self):
+        """删除识别结果缓存中与当前配置不符的旧结果（配置改变后释放空间），返回删除的条目数"""
+        if self.result_cache is None:
+            return 0
+        return self.result_cache.invalidate(keep=[self.config_fingerprint(False),
+                                                  self.config_fingerprint(True)])
+    
+    def _scan_image_file_cached(self, image_path, deadline, all_pages):
+        """先按文件内容查识别结果缓存，未命中时扫描并缓存（提前结束或出错的不完整结果不缓存）"""
+        digest = file_digest(image_path)
+        fingerprint = self.config_fingerprint(all_pages)
+        record = self.result_cache.get(digest, fingerprint)
+        if record is not None:
+            results = ScanResult(attempt=record['attempt'], page=record['page'], cached=True)
+            for result in record['results']:
+                result['rect'] = tuple(result['rect'])
+                result['polygon'] = [tuple(point) for point in result['polygon']]
+                results.append(result)
+            if self.profiler:
+                self.profiler.record('image.cached', 0.0, bool(results))
+            return results
+        
+        results = self._scan_image_file(image_path, deadline, all_pages)
+        if not results.truncated and not results.unreadable and not results.error:
+            self.result_cache.put(digest, fingerprint, {
+                'results': [{
+                    'data': result['data'],
+                    'type': result['type'],
+                    'rect': list(result['rect']),
+                    'polygon': [list(point) for point in result.get('polygon', ())],
+                    'page': result.get('page', 0),
+                } for result in results],
+                'attempt': results.attempt,
+                'page': results.page,
+            })
+        return results
+    
+    # scan_image_file 的搜索计划：(尝试名, 变换, 参数)，裁剪区域为相对图像宽高的比例
+    # 原图之外的尝试都基于同一张灰度图（只转换一次），识别结果坐标映射回原图
+    # 识别器和预处理对180°旋转不敏感，与已有尝试相差180°的变换（旋转180/270、垂直翻转）是重复的，
+    # 裁剪全图与原图重复，这些都不再尝试；默认顺序按代价（裁剪只有原图的1/4大小）排列
+    IMAGE_ATTEMPTS = [
+        ('original', 'original', {}),
+        ('crop_center', 'crop', {'box': (0.25, 0.25, 0.75, 0.75)}),
+        ('crop_top_left', 'crop', {'box': (0, 0, 0.5, 0.5)}),
+        ('crop_top_right', 'crop', {'box': (0.5, 0, 1, 0.5)}),
+        ('crop_bottom_left', 'crop', {'box': (0, 0.5, 0.5, 1)}),
+        ('crop_bottom_right', 'crop', {'box': (0.5, 0.5, 1, 1)}),
+        ('rotate90', 'rotate', {'angle': 90}),
+        ('flip_horizontal', 'flip', {}),
+        ('tiles', 'tiles', {}),
+    ]
+    
+    # 分块扫描：图像长边不小于该值时，scan_image_file 用分块扫描代替四个固定的象限裁剪
+    TILE_MIN_SIZE = 4000
+    # 默认分块边长和相邻分块的重叠（像素），重叠应不小于要识别的最大二维码边长
+    TILE_SIZE = 1024
+    TILE_OVERLAP = 256
+    
+    def image_attempt_order(self):
+        """
+        scan_image_file 的尝试顺序：原图总是第一个，其余尝试启用自适应时按
+        历史期望代价（平均耗时/命中率，与预处理级联共用 strategy_stats，键为 'image.尝试名'）排序
+        """
+        first, rest = self.IMAGE_ATTEMPTS[0], self.IMAGE_ATTEMPTS[1:]
+        if not self.adaptive_order:
+            return [first] + rest
+        by_key = {'image.' + attempt[0]: attempt for attempt in rest}
+        return [first] + [by_key[key] for key in self.strategy_stats.order(list(by_key))]
+    
+    def _attempt_image(self, transform, params, img, gray):
+        """
+        生成一次尝试的图像，返回 (图像, 坐标映射函数)
+        映射函数把尝试图像上的点 (x, y) 映射回原图坐标（原图为None）
+        """
+        height, width = gray.shape[:2]
+        if transform == 'original':
+            return img, None
+        if transform == 'crop':
+            fx1, fy1, fx2, fy2 = params['box']
+            x1, y1 = int(width * fx1), int(height * fy1)
+            x2, y2 = int(width * fx2), int(height * fy2)
+            return gray[y1:y2, x1:x2], lambda x, y: (x + x1, y + y1)
+        if transform == 'rotate':
+            # cv2.rotate 是无损的90°倍数旋转，不会像 warpAffine 那样裁掉非正方形图像的角
+            angle = params['angle']
+            shape = (height, width) if angle == 180 else (width, height)
+            rotated = cv2.rotate(gray, _ROTATIONS[angle],
+                                 dst=self.preprocess_resources.buffer('image.rotate', shape))
+            if angle == 90:
+                return rotated, lambda x, y: (y, height - 1 - x)
+            if angle == 270:
+                return rotated, lambda x, y: (width - 1 - y, x)
+            return rotated, lambda x, y: (width - 1 - x, height - 1 - y)
+        if transform == 'flip':
+            flipped = cv2.flip(gray, 1, dst=self.preprocess_resources.buffer('image.flip', gray.shape))
+            return flipped, lambda x, y: (width - 1 - x, y)
+        raise ValueError(f"未知的图片尝试变换: {transform}")
+    
+    @staticmethod
+    def _map_results(results, mapper):
+        """把尝试图像上的识别结果坐标映射回原图（矩形取映射后多边形的外接矩形）"""
+        for result in results:
+            x, y, w, h = result['rect']
+            polygon = result.get('polygon') or [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+            mapped = [mapper(px, py) for px, py in polygon]
+            xs = [px for px, _ in mapped]
+            ys = [py for _, py in mapped]
+            if result.get('polygon'):
+                result['polygon'] = mapped
+            result['rect'] = (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+        return results
+    
+    def _scan_attempt(self, name, image, deadline):
+        """scan_image_file 中的一次尝试，记录耗时和命中（用于调整下次的尝试顺序）"""
+        start = time.perf_counter()
+        results = self._scan_frame_timed(image, deadline)
+        seconds = time.perf_counter() - start
+        if not results.truncated:
+            self.strategy_stats.record('image.' + name, seconds, bool(results))
+        if self.profiler:
+            self.profiler.record('image.' + name, seconds, bool(results))
+        return results
+    
+    def scan_image_tiled(self, image_path, tile_size=None, overlap=None, workers=None,
+                         cascade=False, deadline_ms=None, cancel_token=None):
+        """
+        分块扫描图片文件（A3扫描件、4800万像素照片等超大图上的小码）
+        图片直接读成灰度图（内存只有彩色图的1/3），再按 scan_tiles 分块扫描
+        返回 ScanResult（识别到的所有二维码，坐标为整图坐标）
+        """
+        deadline = self._make_deadline(deadline_ms, cancel_token)
+        gray = self.load_image(image_path, grayscale=True)
+        if gray is None:
+            return ScanResult()
+        try:
+            return self._scan_tiles(gray, tile_size or self.TILE_SIZE,
+                                    self.TILE_OVERLAP if overlap is None else overlap,
+                                    workers, cascade, deadline)
+        finally:
+            self._release_image_buffers()
+    
+    def scan_tiles(self, image, tile_size=None, overlap=None, workers=None, cascade=False,
+                   deadline_ms=None, cancel_token=None):
+        """
+        分块扫描 - 把大图切成相互重叠的分块，在有界线程池中并行识别
+        tile_size: 分块边长（像素，默认 TILE_SIZE）
+        overlap: 相邻分块的重叠（像素，默认 TILE_OVERLAP），应不小于最大的二维码边长，
+                 保证每个码都完整落在某个分块内
+        workers: 线程数（默认使用 tile_workers 或 parallel_workers，都未设置时为CPU核心数）
+        cascade: 分块识别失败时是否运行完整的预处理级联（默认只做灰度图直接识别）
+        分块是原图的视图，预处理和识别的工作内存只与 分块大小×线程数 有关，与整图大小无关；
+        重叠区域重复识别到的同一个码只保留一个，坐标映射回整图
+        返回 ScanResult，超出时间预算时 truncated 为 True
+        """
+        deadline = self._make_deadline(deadline_ms, cancel_token)
+        try:
+            return self._scan_tiles(image, tile_size or self.TILE_SIZE,
+                                    self.TILE_OVERLAP if overlap is None else overlap,
+                                    workers, cascade, deadline)
+        finally:
+            self._release_image_buffers()
+    
+    def _release_image_buffers(self):
+        """
+        图片/分块扫描结束后释放预处理缓冲区：图片、裁剪、分块的尺寸与摄像头画面不同，
+        留在缓冲池中只会占用内存（每个线程最多 MAX_BUFFER_BYTES），摄像头扫描下一帧重新分配
+        """
+        self.preprocess_resources.clear()
+    
+    @staticmethod
+    def tile_grid(height, width, tile_size, overlap):
+        """分块位置列表 [(x, y, w, h), ...]，最后一行/列的分块与图像边缘对齐"""
+        if not 0 <= overlap < tile_size:
+            raise ValueError(f"分块重叠必须在 0 到分块边长之间: overlap={overlap}, tile_size={tile_size}")
+        step = tile_size - overlap
+        
+        def starts(length):
+            if length <= tile_size:
+                return [0]
+            positions = list(range(0, length - tile_size + 1, step))
+            if positions[-1] + tile_size < length:
+                positions.append(length - tile_size)
+            return positions
+        
+        return [(x, y, min(tile_size, width - x), min(tile_size, height - y))
+                for y in starts(height) for x in starts(width)]
+    
+    def _scan_tiles(self, image, tile_size, overlap, workers, cascade, deadline):
+        start = time.perf_counter() if self.profiler else 0
+        all_results = ScanResult()
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        boxes = self.tile_grid(gray.shape[0], gray.shape[1], tile_size, overlap)
+        workers = max(1, min(workers or self.tile_workers or self.parallel_workers or os.cpu_count() or 1,
+                             len(boxes)))
+        
+        def scan_tile(box):
+            x, y, w, h = box
+            tile = gray[y:y + h, x:x + w]
+            if cascade:
+                tile_results = self._scan_frame(tile, deadline)
+            else:
+                tile_results = ScanResult()
+                self._collect_results(self._decode(tile, 'gray'), set(), tile_results)
+            return self._offset_results(tile_results, x, y)
+        
+        # 有界提交：同时在途的分块不超过 线程数×2，结果边到边合并
+        tiles = iter(boxes)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qr-tile') as executor:
+            pending = set()
+            while True:
+                if deadline.expired():
+                    all_results.truncated = True
+                    for future in pending:
+                        future.cancel()
+                    break
+                while len(pending) < workers * 2:
+                    box = next(tiles, None)
+                    if box is None:
+                        break
+                    pending.add(executor.submit(scan_tile, box))
+                if not pending:
+                    break
+                remaining = deadline.remaining_ms()
+                timeout = 0.05 if remaining is None else min(remaining / 1000, 0.05)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tile_results = future.result()
+                    for result in tile_results:
+                        self._merge_result(all_results, result)
+                    if tile_results.truncated:
+                        all_results.truncated = True
+        
+        # 按阅读顺序（从上到下、从左到右）排列
+        all_results.sort(key=lambda result: (result['rect'][1], result['rect'][0]))
+        if self.profiler:
+            self.profiler.record('image.tiles', time.perf_counter() - start, bool(all_results))
+        return all_results
+    
+    # 降分辨率解码：cv2.imdecode 的读取标志（倍数 -> (灰度, 彩色)）
+    REDUCED_DECODE_FLAGS = {
+        1: (cv2.IMREAD_GRAYSCALE, cv2.IMREAD_COLOR),
+        2: (cv2.IMREAD_REDUCED_GRAYSCALE_2, cv2.IMREAD_REDUCED_COLOR_2),
+        4: (cv2.IMREAD_REDUCED_GRAYSCALE_4, cv2.IMREAD_REDUCED_COLOR_4),
+        8: (cv2.IMREAD_REDUCED_GRAYSCALE_8, cv2.IMREAD_REDUCED_COLOR_8),
+    }
+    # scan_image_file 先尝试降分辨率解码时，缩小后的长边不小于该值（再小二维码模块会糊掉）
+    IMAGE_REDUCED_MIN_SIZE = 1000
+    
+    def load_image(self, image_path, grayscale=False, reduce=1):
+        """
+        读取图片（BGR，grayscale为True时直接解码成灰度图），失败返回None
+        reduce: 降分辨率解码的倍数（1/2/4/8）。JPEG在解码时按DCT直接缩小，
+                比解码原图再缩小快得多，内存也只有几分之一；其他格式由OpenCV解码后缩小
+        文件通过mmap映射后由 cv2.imdecode 直接解码（不另外复制文件内容，也支持中文路径），
+        OpenCV无法解码时退回PIL
+        """
+        img = None
+        start = time.perf_counter() if self.profiler else 0
+        
+        # 方法1: mmap + OpenCV解码
+        try:
+            img = self._imdecode_file(image_path, self.REDUCED_DECODE_FLAGS[reduce][0 if grayscale else 1])
+        except (OSError, ValueError) as e:
+            print(f"读取图片文件失败: {e}")
+        
+        # 方法2: 如果OpenCV失败，使用PIL
+        if img is None:
+            try:
+                img = self._pil_load(image_path, grayscale, reduce)
+            except Exception as e:
+                print(f"PIL读取失败: {e}")
+        
+        if self.profiler:
+            self.profiler.record('image.load', time.perf_counter() - start, img is not None)
+        
+        if img is None:
+            print(f"无法读取图片: {image_path}")
+        return img
+    
+    @staticmethod
+    def _imdecode_file(image_path, flags):
+        """把文件映射到内存后用 cv2.imdecode 解码，解码失败返回None"""
+        with open(image_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = np.frombuffer(mapped, dtype=np.uint8)
+                try:
+                    return cv2.imdecode(data, flags)
+                finally:
+                    # 关闭映射前释放对它的引用
+                    del data
+    
+    @staticmethod
+    def _pil_load(image_path, grayscale, reduce):
+        PILImage, _ = _pil()
+        with PILImage.open(image_path) as pil_img:
+            width, height = pil_img.size
+            size = (max(1, width // reduce), max(1, height // reduce))
+            mode = 'L' if grayscale else 'RGB'
+            if reduce > 1:
+                # JPEG按DCT缩放直接解码成小图（其他格式draft不起作用，解码后再缩小）
+                pil_img.draft(mode, size)
+            if pil_img.mode != mode:
+                # 转换为RGB/灰度（处理RGBA、调色板等格式）
+                pil_img = pil_img.convert(mode)
+            if pil_img.size != size and reduce > 1:
+                pil_img = pil_img.resize(size, PILImage.BILINEAR)
+            img = np.asarray(pil_img)
+        if not grayscale:
+            # RGB转BGR（OpenCV格式），原地转换不再复制
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR, dst=img if img.flags.writeable else None)
+        return img
+    
+    def reduced_factor(self, image_path):
+        """
+        scan_image_file 第一遍降分辨率解码的倍数：只对JPEG大图降分辨率（1为不降）
+        只读取文件头，不解码像素
+        """
+        try:
+            PILImage, _ = _pil()
+            with PILImage.open(image_path) as pil_img:
+                if pil_img.format != 'JPEG':
+                    return 1
+                long_side = max(pil_img.size)
+        except Exception:
+            return 1
+        factor = 1
+        while factor < 8 and long_side // (factor * 2) >= self.IMAGE_REDUCED_MIN_SIZE:
+            factor *= 2
+        return factor
+    
+    # 可能包含多页/多帧的图片格式，这些格式先用PIL检查页数
+    MULTI_PAGE_EXTS = ('.gif', '.tif', '.tiff', '.webp')
+    
+    def iter_image_pages(self, image_path):
+        """
+        逐页产出 (页号, 图像)，图像为BGR或灰度numpy数组
+        多页图片通过PIL ImageSequence 按需解码，任意时刻只有当前页在内存中，
+        调用方提前停止迭代时不会再解码后面的页；单页图片和PIL打不开的文件退回 load_image
+        """
+        pil_img = None
+        if image_path.lower().endswith(self.MULTI_PAGE_EXTS):
+            try:
+                PILImage, _ = _pil()
+                pil_img = PILImage.open(image_path)
+            except Exception as e:
+                print(f"PIL读取失败: {e}")
+        
+        if pil_img is None or getattr(pil_img, 'n_frames', 1) <= 1:
+            if pil_img is not None:
+                pil_img.close()
+            img = self.load_image(image_path)
+            if img is not None:
+                yield 0, img
+            return
+        
+        with pil_img:
+            _, ImageSequence = _pil()
+            for index, frame in enumerate(ImageSequence.Iterator(pil_img)):
+                start = time.perf_counter() if self.profiler else 0
+                img = self._pil_page_to_array(frame)
+                if self.profiler:
+                    self.profiler.record('image.load', time.perf_counter() - start, True)
+                yield index, img
+    
+    @staticmethod
+    def _pil_page_to_array(frame):
+        """PIL的一页转为numpy数组：灰度/二值/16位页转灰度图，其余转BGR"""
+        mode = frame.mode
+        if mode == 'L':
+            return np.array(frame)
+        if mode == '1':
+            return np.array(frame.convert('L'))
+        if mode in ('I', 'F') or mode.startswith('I;16'):
+            # 16位/32位灰度（扫描仪常见），按实际范围拉伸到8位，避免直接截断成全白
+            img = np.asarray(frame, dtype=np.float32)
+            return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        return cv2.cvtColor(np.array(frame.convert('RGB')), cv2.COLOR_RGB2BGR)
+    
+    def _scan_image_file(self, image_path, deadline, all_pages=False):
+        if image_path.lower().endswith(self.MULTI_PAGE_EXTS):
+            return self._scan_image_pages(image_path, deadline, all_pages)
+        
+        try:
+            results = self._scan_single_image(image_path, deadline)
+        except Exception as e:
+            print(f"扫描图片失败: {e}")
+            return ScanResult(error=str(e) or type(e).__name__)
+        for result in results:
+            result['page'] = 0
+        if results:
+            results.page = 0
+        return results
+    
+    def _scan_single_image(self, image_path, deadline):
+        """
+        单页图片：识别只需要灰度图，直接解码成灰度（内存是BGR的三分之一）
+        JPEG大图先降分辨率解码并直接识别（代价只有原图的几分之一），识别不到再解码原图走完整的搜索计划
+        """
+        factor = self.reduced_factor(image_path)
+        if factor > 1:
+            small = self.load_image(image_path, grayscale=True, reduce=factor)
+            if small is not None:
+                start = time.perf_counter() if self.profiler else 0
+                results = ScanResult()
+                self._collect_results(self._decode(small, 'gray'), set(), results)
+                del small
+                if self.profiler:
+                    self.profiler.record('image.reduced', time.perf_counter() - start, bool(results))
+                if results:
+                    results.attempt = 'reduced'
+                    return self._scale_results(results, factor)
+                if deadline.expired():
+                    results.truncated = True
+                    return results
+        
+        gray = self.load_image(image_path, grayscale=True)
+        if gray is None:
+            return ScanResult(unreadable=True)
+        return self._search_image(gray, deadline)
+    
+    def _scan_image_pages(self, image_path, deadline, all_pages):
+        results = ScanResult(unreadable=True)
+        pages = self.iter_image_pages(image_path)
+        try:
+            for index, img in pages:
+                results.unreadable = False
+                if deadline.expired():
+                    results.truncated = True
+                    break
+                page_results = self._search_image(img, deadline)
+                del img
+                for result in page_results:
+                    result['page'] = index
+                results.extend(page_results)
+                if page_results and results.page is None:
+                    results.page = index
+                    results.attempt = page_results.attempt
+                if page_results.truncated:
+                    results.truncated = True
+                    break
+                if page_results and not all_pages:
+                    break
+            
+        except Exception as e:
+            print(f"扫描图片失败: {e}")
+            results.error = str(e) or type(e).__name__
+        finally:
+            # 提前停止时关闭生成器，释放图片文件
+            pages.close()
+        return results
+    
+    def scan_image(self, image, deadline_ms=None, cancel_token=None):
+        """
+        扫描已读取的图片（BGR或灰度图），搜索过程与 scan_image_file 相同
+        返回 ScanResult，attempt 为识别成功的尝试名
+        """
+        try:
+            return self._search_image(image, self._make_deadline(deadline_ms, cancel_token))
+        finally:
+            self._release_image_buffers()
+    
+    def _search_image(self, img, deadline):
+        """按搜索计划逐个尝试，识别成功或到达截止条件即停止"""
+        # 灰度图只转换一次，裁剪、旋转、翻转、分块都基于它（裁剪是视图，不复制）
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img
+        # 超大图用分块扫描代替象限裁剪（分块覆盖了象限，且每块都保持原始分辨率）
+        tiled = max(gray.shape[:2]) >= self.TILE_MIN_SIZE
+        for name, transform, params in self.image_attempt_order():
+            if transform == 'tiles':
+                if not tiled:
+                    continue
+                start = time.perf_counter()
+                results = self._scan_tiles(gray, self.TILE_SIZE, self.TILE_OVERLAP, None, False, deadline)
+                if not results.truncated:
+                    self.strategy_stats.record('image.' + name, time.perf_counter() - start, bool(results))
+                if results:
+                    results.attempt = name
+                    return results
+                if results.truncated:
+                    return results
+                continue
+            if transform == 'crop' and tiled:
+                continue
+            try:
+                image, mapper = self._attempt_image(transform, params, img, gray)
+            except Exception:
+                continue
+            if image.size == 0:
+                continue
+            
+            results = self._scan_attempt(name, image, deadline)
+            if results and mapper is not None:
+                self._map_results(results, mapper)
+            if results:
+                results.attempt = name
+                return results
+            if results.truncated:
+                return results
+        return ScanResult()
+    
+    # 视频扫描：未识别到时采样间隔逐次翻倍到上限，识别到后回到下限（毫秒）
+    VIDEO_MIN_STRIDE_MS = 100
+    VIDEO_MAX_STRIDE_MS = 1000
+    # 视频帧率未知时按该帧率换算时间
+    VIDEO_DEFAULT_FPS = 25.0
+    # 细化阶段两个目标帧相距超过该帧数时直接定位（seek），否则顺序跳帧
+    VIDEO_SEEK_FRAMES = 50
+    
+    def scan_video_file(self, video_path, min_stride_ms=None, max_stride_ms=None, workers=None,
+                        cascade=False, deadline_ms=None, cancel_token=None):
+        """
+        视频文件扫描 - 用于录像审查（如传送带录像）
+        1. 顺序读帧，自适应采样：连续未识别时采样间隔从 min_stride_ms 逐次翻倍到 max_stride_ms，
+           识别到二维码后回到 min_stride_ms；跳过的帧只 grab() 不转换、不识别
+        2. 采样帧在线程池中并行识别（有界提交，读帧与识别流水线进行）
+        3. 在每个内容出现/消失的边缘，把相邻两个采样帧之间按 min_stride_ms 补采，细化首末时间
+        cascade: 采样帧是否运行完整识别流程（scan_frame 的预处理级联），默认只做灰度图直接识别
+        deadline_ms / cancel_token 作用于整个视频，含义同 scan_frame
+        返回 ScanResult，每个不同的内容一项：
+            {'data', 'type', 'rect', 'first_ms', 'last_ms', 'first_frame', 'last_frame', 'hits'}
+        按首次出现时间排列，rect 为首次识别到时的位置
+        """
+        deadline = self._make_deadline(deadline_ms, cancel_token)
+        start = time.perf_counter() if self.profiler else 0
+        results = self._scan_video(video_path, min_stride_ms or self.VIDEO_MIN_STRIDE_MS,
+                                   max_stride_ms or self.VIDEO_MAX_STRIDE_MS, workers, cascade, deadline)
+        if self.profiler:
+            self.profiler.record('video.total', time.perf_counter() - start, bool(results))
+        return results
+    
+    def _scan_video(self, video_path, min_stride_ms, max_stride_ms, workers, cascade, deadline):
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            print(f"无法打开视频: {video_path}")
+            return ScanResult()
+        
+        observations = {}  # 帧号 -> 该帧的识别结果
+        try:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+            if not fps or fps != fps or fps > 1000:
+                fps = self.VIDEO_DEFAULT_FPS
+            min_step = max(1, round(min_stride_ms * fps / 1000))
+            max_step = max(min_step, round(max_stride_ms * fps / 1000))
+            workers = max(1, workers or self.parallel_workers or os.cpu_count() or 1)
+            
+            sampling = {'step': min_step}
+            
+            def adapt(results):
+                # 根据最新完成的采样帧调整采样间隔
+                sampling['step'] = min_step if results else min(sampling['step'] * 2, max_step)
+            
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='qr-video') as executor:
+                truncated = self._scan_video_frames(
+                    self._iter_video_samples(capture, sampling), executor, workers,
+                    cascade, deadline, observations, adapt)
+                if not truncated:
+                    targets = self._video_refine_targets(observations, min_step)
+                    if targets:
+                        truncated = self._scan_video_frames(
+                            self._iter_video_frames_at(capture, targets), executor, workers,
+                            cascade, deadline, observations)
+        finally:
+            capture.release()
+        
+        return self._summarize_video(observations, fps, truncated)
+    
+    @staticmethod
+    def _iter_video_samples(capture, sampling):
+        """顺序读帧，按 sampling['step'] 的当前值产出采样帧 (帧号, 帧)"""
+        index = -1
+        next_index = 0
+        while capture.grab():
+            index += 1
+            if index < next_index:
+                continue
+            ok, frame = capture.retrieve()
+            if ok:
+                yield index, frame
+            next_index = index + sampling['step']
+    
+    def _iter_video_frames_at(self, capture, targets):
+        """按帧号升序产出指定的帧，距离远时定位，距离近时顺序跳帧"""
+        position = None  # 下一次 grab() 读到的帧号
+        for target in targets:
+            if position is None or target < position or target - position > self.VIDEO_SEEK_FRAMES:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            while position < target and capture.grab():
+                position += 1
+            if position != target or not capture.grab():
+                continue
+            position += 1
+            ok, frame = capture.retrieve()
+            if ok:
+                yield target, frame
+    
+    def _scan_video_frames(self, frames, executor, workers, cascade, deadline, observations, on_result=None):
+        """
+        在线程池中识别 frames 产出的帧，结果写入 observations
+        有界提交：同时在途的帧不超过 线程数×2；返回是否因截止条件提前结束
+        """
+        pending = {}
+        exhausted = False
+        while True:
+            if deadline.expired():
+                for future in pending:
+                    future.cancel()
+                return True
+            while not exhausted and len(pending) < workers * 2:
+                item = next(frames, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, frame = item
+                pending[executor.submit(self._scan_video_frame, frame, cascade, deadline)] = index
+            if not pending:
+                return False
+            remaining = deadline.remaining_ms()
+            timeout = 0.05 if remaining is None else min(remaining / 1000, 0.05)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                results = future.result()
+                observations[index] = results
+                if on_result is not None:
+                    on_result(results)
+    
+    def _scan_video_frame(self, frame, cascade, deadline):
+        start = time.perf_counter() if self.profiler else 0
+        if cascade:
+            results = self._scan_frame(frame, deadline)
+        else:
+            results = ScanResult()
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else frame
+            self._collect_results(self._decode(gray, 'gray'), set(), results)
+        if self.profiler:
+            self.profiler.record('video.frame', time.perf_counter() - start, bool(results))
+        return results
+    
+    @staticmethod
+    def _video_refine_targets(observations, min_step):
+        """
+        找出内容出现/消失的边缘：某内容在一个采样帧中出现而在相邻采样帧中没有，
+        且两帧相距超过 min_step 时，在两帧之间按 min_step 补采
+        """
+        indexes = sorted(observations)
+        contents = [{result['data'] for result in observations[index]} for index in indexes]
+        targets = set()
+        for i in range(len(indexes)):
+            if not contents[i]:
+                continue
+            if i > 0 and contents[i] - contents[i - 1] and indexes[i] - indexes[i - 1] > min_step:
+                targets.update(range(indexes[i - 1] + min_step, indexes[i], min_step))
+            if (i + 1 < len(indexes) and contents[i] - contents[i + 1]
+                    and indexes[i + 1] - indexes[i] > min_step):
+                targets.update(range(indexes[i] + min_step, indexes[i + 1], min_step))
+        return sorted(targets - set(indexes))
+    
+    @staticmethod
+    def _summarize_video(observations, fps, truncated):
+        """按内容汇总各帧的识别结果，得到每个内容的首次/最后出现时间"""
+        payloads = {}
+        for index in sorted(observations):
+            time_ms = round(index * 1000.0 / fps, 1)
+            for result in observations[index]:
+                entry = payloads.get(result['data'])
+                if entry is None:
+                    payloads[result['data']] = {
+                        'data': result['data'],
+                        'type': result['type'],
+                        'rect': result['rect'],
+                        'first_ms': time_ms,
+                        'last_ms': time_ms,
+                        'first_frame': index,
+                        'last_frame': index,
+                        'hits': 1,
+                    }
+                else:
+                    entry['last_ms'] = time_ms
+                    entry['last_frame'] = index
+                    entry['hits'] += 1
+        return ScanResult(sorted(payloads.values(), key=lambda entry: entry['first_ms']),
+                          truncated=truncated)
+
+
+class QRCodeTracker:
+    """
+    帧间二维码追踪 - 用于摄像头实时扫描
+    识别成功后在二维码区域内选取特征点，用金字塔光流逐帧追踪，得到二维码的新位置；
+    后续帧只对追踪区域做一次廉价的识别确认，追踪丢失或连续确认失败时才回到整帧扫描
+    """
+    
+    # 追踪区域识别确认时向外扩展的比例
+    ROI_PADDING = 0.3
+    # 连续多少帧区域识别失败后放弃追踪（二维码可能被遮挡或移出）
+    MAX_VERIFY_FAILURES = 5
+    # 追踪所需的最少特征点数
+    MIN_TRACK_POINTS = 4
+    
+    def __init__(self, scanner, full_scan_deadline_ms=None):
+        """
+        scanner: QRCodeScanner
+        full_scan_deadline_ms: 整帧扫描的时间预算（毫秒）
+        """
+        self.scanner = scanner
+        self.full_scan_deadline_ms = full_scan_deadline_ms
+        self.stats = {'tracked_frames': 0, 'full_scans': 0, 'lost': 0}
+        self.reset()
+    
+    def reset(self):
+        """丢弃当前追踪，下一帧重新整帧扫描"""
+        self.result = None
+        self.prev_gray = None
+        self.features = None   # 光流追踪的特征点 (N, 1, 2)
+        self.polygon = None    # 二维码四边形 (N, 1, 2)
+        self.verify_failures = 0
+    
+    @property
+    def tracking(self):
+        return self.result is not None
+    
+    def update(self, frame):
+        """处理一帧，返回 ScanResult（追踪中时为追踪到的二维码）"""
+        if frame is None:
+            return ScanResult()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if len(frame.shape) == 3 else frame
+        
+        if self.tracking:
+            profiler = self.scanner.profiler
+            start = time.perf_counter() if profiler else 0
+            results = self._track(gray)
+            if profiler:
+                profiler.record('frame.track', time.perf_counter() - start, results is not None)
+            if results is not None:
+                self.stats['tracked_frames'] += 1
+                return results
+            self.stats['lost'] += 1
+            self.reset()
+        
+        # 没有追踪目标：整帧扫描
+        results = self.scanner.scan_frame(frame, deadline_ms=self.full_scan_deadline_ms)
+        self.stats['full_scans'] += 1
+        if results:
+            self._start(gray, results[0])
+        return results
+    
+    def _start(self, gray, result):
+        """以识别结果为目标开始追踪"""
+        polygon = result.get('polygon') or []
+        if len(polygon) < 3:
+            x, y, w, h = result['rect']
+            polygon = [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]
+        polygon = np.array(polygon, dtype=np.float32).reshape(-1, 1, 2)
+        
+        # 在二维码区域内选取角点作为追踪特征（二维码模块边缘角点丰富），
+        # 只在二维码外接矩形的裁剪图上计算
+        height, width = gray.shape[:2]
+        x, y, w, h = cv2.boundingRect(polygon.reshape(-1, 2).astype(np.int32))
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(width, x + w), min(height, y + h)
+        features = None
+        if x2 - x1 >= 8 and y2 - y1 >= 8:
+            mask = np.zeros((y2 - y1, x2 - x1), np.uint8)
+            local_polygon = polygon.reshape(-1, 2) - np.array([x1, y1], np.float32)
+            cv2.fillConvexPoly(mask, local_polygon.astype(np.int32), 255)
+            features = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=40,
+                                               qualityLevel=0.01, minDistance=5, mask=mask)
+        if features is None or len(features) < self.MIN_TRACK_POINTS:
+            features = polygon.copy()
+        else:
+            features = features + np.array([x1, y1], np.float32)
+        
+        self.result = dict(result)
+        self.prev_gray = gray
+        self.features = features.astype(np.float32)
+        self.polygon = polygon
+        self.verify_failures = 0
+    
+    def _track(self, gray):
+        """光流追踪并在追踪区域确认；追踪丢失返回None"""
+        if gray.shape != self.prev_gray.shape:
+            return None
+        new_features, status, _ = cv2.calcOpticalFlowPyrLK(
+            self.prev_gray, gray, self.features, None, winSize=(21, 21), maxLevel=3)
+        if new_features is None:
+            return None
+        good = status.reshape(-1) == 1
+        if good.sum() < self.MIN_TRACK_POINTS:
+            return None
+        
+        # 用相似变换（平移+旋转+缩放）把四边形移动到新位置
+        matrix, _ = cv2.estimateAffinePartial2D(self.features[good], new_features[good])
+        if matrix is None:
+            return None
+        polygon = cv2.transform(self.polygon, matrix)
+        
+        height, width = gray.shape[:2]
+        x, y, w, h = cv2.boundingRect(polygon.reshape(-1, 2).astype(np.int32))
+        if w < 8 or h < 8 or x + w <= 0 or y + h <= 0 or x >= width or y >= height:
+            return None
+        
+        # 只在追踪区域内识别一次，确认二维码还在
+        pad = int(max(w, h) * self.ROI_PADDING)
+        x1, y1 = max(0, x - pad), max(0, y - pad)
+        x2, y2 = min(width, x + w + pad), min(height, y + h + pad)
+        verified = []
+        self.scanner._collect_results(self.scanner._decode(gray[y1:y2, x1:x2], 'direct'),
+                                      None, verified)
+        verified = [r for r in self.scanner._offset_results(verified, x1, y1)
+                    if r['data'] == self.result['data']]
+        
+        if verified:
+            # 确认成功：用识别结果重新校准追踪位置，减少光流累积误差
+            self._start(gray, verified[0])
+            return ScanResult([dict(self.result)])
+        
+        self.verify_failures += 1
+        if self.verify_failures > self.MAX_VERIFY_FAILURES:
+            return None
+        
+        self.prev_gray = gray
+        self.features = new_features[good].reshape(-1, 1, 2)
+        self.polygon = polygon
+        self.result['rect'] = (x, y, w, h)
+        self.result['polygon'] = [(int(px), int(py)) for px, py in polygon.reshape(-1, 2)]
+        return ScanResult([dict(self.result)])
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+二维码扫描器 - 图片识别结果缓存
+按图片文件内容（而非路径）缓存 scan_image_file 的识别结果（ScanResultCache），只依赖标准库
+"""
+import os
+import json
+import mmap
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import sqlite3
+except ImportError:
+    # Android打包时requirements中没有sqlite3就没有这个模块：ScanResultCache 改用进程内的内存缓存
+    sqlite3 = None
+
+
+def file_digest(path):
+    """
+    图片文件内容的摘要（BLAKE2b，128位），文件通过mmap映射后直接计算，不读入内存
+    文件改名、移动、复制后摘要不变；读取失败时返回None
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return hashlib.blake2b(b'', digest_size=16).hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.blake2b(mapped, digest_size=16).hexdigest()
+    except (OSError, ValueError):
+        return None
+
+
+class ScanResultCache:
+    """
+    图片识别结果缓存 - SQLite文件，重启后依然有效，多个进程可以同时使用同一个文件
+    - 键为 (文件内容摘要, 扫描器配置指纹)：同一张图片改名/移动后依然命中，
+      扫描器配置（码制、后端、预处理图、搜索计划等）变化后旧结果自动不再使用
+    - 保存识别内容、位置、命中的尝试名和页号；未识别到的图片同样缓存（最坏情况最耗时）
+    - 总大小超过 max_bytes 时按最近使用时间淘汰
+    - 运行环境没有sqlite3时退化为进程内的内存缓存（同样按大小淘汰，重启后失效）
+    """
+    
+    # 存储格式变化时递增，使旧文件中的条目全部失效
+    FORMAT_VERSION = 1
+    # 默认大小上限（字节，按条目JSON的长度计算）
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+    # 每写入多少条检查一次总大小
+    EVICT_CHECK_EVERY = 200
+    # 最近使用时间的更新间隔（秒）：短时间内重复命中不再写库
+    TOUCH_INTERVAL = 60.0
+    
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes or self.DEFAULT_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._memory = None  # 没有sqlite3时使用：(摘要, 指纹) -> 条目JSON
+        self._memory_bytes = 0
+        self._open(path)
+    
+    def _open(self, path):
+        """打开缓存文件；存储格式版本不同时清空"""
+        if sqlite3 is None:
+            print("[!] 当前环境没有sqlite3，识别结果缓存只保存在内存中")
+            self._memory = OrderedDict()
+            return
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # 批量扫描时多个工作进程共用一个文件：WAL模式下读写互不阻塞
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS results '
+                             '(digest TEXT, fingerprint TEXT, record TEXT, size INTEGER, '
+                             'stored_at REAL, used_at REAL, PRIMARY KEY (digest, fingerprint))')
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)')
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'format'").fetchone()
+            if row is None or row[0] != str(self.FORMAT_VERSION):
+                self._db.execute('DELETE FROM results')
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('format', ?)",
+                                 (str(self.FORMAT_VERSION),))
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"[!] 打开识别结果缓存失败: {e}")
+            self._db = None
+    
+    def get(self, digest, fingerprint):
+        """查找缓存的识别结果（字典），未命中返回None"""
+        if self._memory is not None and digest is not None:
+            return self._memory_get((digest, fingerprint))
+        if self._db is None or digest is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db.execute('SELECT record, used_at FROM results '
+                                       'WHERE digest = ? AND fingerprint = ?',
+                                       (digest, fingerprint)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                now = time.time()
+                if now - row[1] > self.TOUCH_INTERVAL:
+                    self._db.execute('UPDATE results SET used_at = ? WHERE digest = ? AND fingerprint = ?',
+                                     (now, digest, fingerprint))
+                    self._db.commit()
+            except sqlite3.Error:
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+    
+    def put(self, digest, fingerprint, record):
+        """保存识别结果（可JSON序列化的字典）"""
+        if (self._db is None and self._memory is None) or digest is None:
+            return
+        raw = json.dumps(record, ensure_ascii=False)
+        if self._memory is not None:
+            self._memory_put((digest, fingerprint), raw)
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute('INSERT OR REPLACE INTO results '
+                                 '(digest, fingerprint, record, size, stored_at, used_at) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)',
+                                 (digest, fingerprint, raw, len(raw), now, now))
+                self._inserts += 1
+                if self._inserts % self.EVICT_CHECK_EVERY == 0:
+                    self._evict()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[!] 写入识别结果缓存失败: {e}")
+    
+    def _memory_get(self, key):
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is None:
+                self.misses += 1
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+        return json.loads(raw)
+    
+    def _memory_put(self, key, raw):
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = raw
+            self._memory_bytes += len(raw)
+            while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+                self._memory_bytes -= len(self._memory.popitem(last=False)[1])
+    
+    def _evict(self):
+        """总大小超过上限时，按最近使用时间淘汰到上限的90%"""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - self.max_bytes * 0.9
+        freed = 0
+        doomed = []
+        for digest, fingerprint, size in self._db.execute(
+                'SELECT digest, fingerprint, size FROM results ORDER BY used_at'):
+            doomed.append((digest, fingerprint))
+            freed += size
+            if freed >= target:
+                break
+        self._db.executemany('DELETE FROM results WHERE digest = ? AND fingerprint = ?', doomed)
+    
+    def invalidate(self, fingerprint=None, keep=None):
+        """
+        使条目失效：fingerprint 指定时删除该配置的条目；keep（指纹列表）指定时删除其他所有配置的条目
+        （扫描器配置改变后清理旧配置的结果）；都不指定时清空缓存。返回删除的条目数
+        """
+        if self._memory is not None:
+            keep = None if keep is None else set(keep)
+            with self._lock:
+                doomed = [key for key in self._memory
+                          if (fingerprint is not None and key[1] == fingerprint)
+                          or (fingerprint is None and (keep is None or key[1] not in keep))]
+                for key in doomed:
+                    self._memory_bytes -= len(self._memory.pop(key))
+                return len(doomed)
+        if self._db is None:
+            return 0
+        with self._lock:
+            try:
+                if fingerprint is not None:
+                    cursor = self._db.execute('DELETE FROM results WHERE fingerprint = ?', (fingerprint,))
+                elif keep is not None:
+                    keep = list(keep)
+                    cursor = self._db.execute('DELETE FROM results WHERE fingerprint NOT IN (%s)'
+                                              % ', '.join('?' * len(keep)), keep)
+                else:
+                    cursor = self._db.execute('DELETE FROM results')
+                self._db.commit()
+                return cursor.rowcount
+            except sqlite3.Error as e:
+                print(f"[!] 清理识别结果缓存失败: {e}")
+                return 0
+    
+    def clear(self):
+        """清空缓存"""
+        self.invalidate()
+    
+    def stats(self):
+        """命中/未命中计数和缓存大小"""
+        with self._lock:
+            entries = size = 0
+            if self._memory is not None:
+                entries, size = len(self._memory), self._memory_bytes
+            elif self._db is not None:
+                try:
+                    entries, size = self._db.execute(
+                        'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+                except sqlite3.Error:
+                    pass
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': entries,
+                'bytes': size,
+            }
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+二维码扫描器 - 批量扫描（命令行，无界面）
+
+用法：
+    python 批量扫描.py 图片目录
+    python 批量扫描.py 图片目录 "其他目录/**/*.jpg" a.png --workers 8 --output 结果.jsonl
+    python 批量扫描.py 图片目录 --symbology qr --deadline-ms 3000 --no-safety
+    python 批量扫描.py 扫描件.tif --all-pages
+    python 批量扫描.py 图片目录 --cache 扫描缓存.db
+
+输入可以是文件、目录（递归查找图片）或通配符，每张图片在进程池中执行
+scan_image_file 同样的搜索计划和内容安全检测，结果按完成顺序逐行输出为JSONL：
+    {"path": ..., "codes": [{"data", "type", "rect", "polygon", "page", "verdict"}, ...],
+     "attempt": ..., "truncated": ..., "cached": ..., "error": ..., "timings_ms": {"scan", "safety", "total"}}
+scan 包括读取图片（JPEG大图先降分辨率解码识别，读取和识别交替进行，不单独计时）
+多页图片（GIF、多页TIFF、动画WebP）逐页扫描，默认在第一个识别成功的页停止，
+--all-pages 时扫描所有页；page 为结果所在的页号（从0开始）
+--cache 指定识别结果缓存文件时，内容没有变化的图片（即使改名或移动过）直接使用上次的结果，
+记录中 cached 为 true
+不导入Kivy，可以在服务器上运行
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from multiprocessing import Pool
+
+import cv2
+
+from 扫描核心 import QRCodeScanner, VerdictCache, PreprocessGraph, SYMBOLOGY_PRESETS
+
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+
+
+# ============================================================
+# 输入
+# ============================================================
+
+def iter_image_paths(inputs):
+    """依次展开文件、目录和通配符，逐个产出图片路径（惰性，适合几十万张图片的目录）"""
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for filename in sorted(files):
+                    if filename.lower().endswith(IMAGE_EXTS):
+                        yield os.path.join(root, filename)
+        elif os.path.isfile(item):
+            yield item
+        elif glob.has_magic(item):
+            for path in sorted(glob.iglob(item, recursive=True)):
+                if os.path.isfile(path):
+                    yield path
+        else:
+            print(f"[!] 找不到: {item}", file=sys.stderr)
+
+
+# ============================================================
+# 工作进程
+# ============================================================
+
+_scanner = None
+_verdicts = None
+_deadline_ms = None
+_all_pages = False
+
+
+def _init_worker(options):
+    """每个工作进程创建一次扫描器和检测结论缓存"""
+    global _scanner, _verdicts, _deadline_ms, _all_pages
+    # 扫描器的提示信息输出到stderr，stdout只留给JSONL结果
+    sys.stdout = sys.stderr
+    # 并行度由进程数提供，每个进程内OpenCV和超大图片的分块扫描都只用一个线程，避免过度订阅CPU
+    cv2.setNumThreads(1)
+    _scanner = QRCodeScanner(symbology=options['symbology'], result_cache=options['cache'], tile_workers=1,
+                             preprocess_graph=options['graph'])
+    _verdicts = VerdictCache() if options['safety'] else None
+    _deadline_ms = options['deadline_ms']
+    _all_pages = options['all_pages']
+
+
+def analyze(verdicts, data):
+    """与界面一致的安全检测：链接做链接安全检测，其他内容做文本内容检测"""
+    if data.startswith(('http://', 'https://', 'ftp://', 'file://')):
+        level, percentage, detail, _ = verdicts.check_url(data)
+        return {'kind': 'url', 'level': level, 'risk': percentage, 'detail': detail}
+    is_safe, violation_type, detail, _ = verdicts.check_content(data)
+    return {'kind': 'text', 'safe': is_safe, 'violation': violation_type, 'detail': detail}
+
+
+def scan_path(path):
+    """扫描一张图片，返回一条结果记录（字典）"""
+    record = {'path': path, 'codes': [], 'attempt': None, 'truncated': False, 'cached': False,
+              'error': None}
+    start = time.perf_counter()
+    scan_seconds = safety_seconds = 0.0
+    try:
+        results = _scanner.scan_image_file(path, deadline_ms=_deadline_ms, all_pages=_all_pages)
+        scan_seconds = time.perf_counter() - start
+        if results.unreadable:
+            record['error'] = '无法读取图片'
+        else:
+            record['attempt'] = results.attempt
+            record['truncated'] = results.truncated
+            record['cached'] = results.cached
+            # 扫描中途出错（如识别库无法加载）：保留出错前识别到的结果，同时计入错误
+            record['error'] = results.error
+
+            safety_start = time.perf_counter()
+            for result in results:
+                code = {
+                    'data': result['data'],
+                    'type': result['type'],
+                    'rect': list(result['rect']),
+                    'polygon': [list(point) for point in result.get('polygon', ())],
+                    'page': result.get('page', 0),
+                }
+                if _verdicts is not None:
+                    code['verdict'] = analyze(_verdicts, result['data'])
+                record['codes'].append(code)
+            safety_seconds = time.perf_counter() - safety_start
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+
+    record['timings_ms'] = {
+        'scan': round(scan_seconds * 1000, 2),
+        'safety': round(safety_seconds * 1000, 2),
+        'total': round((time.perf_counter() - start) * 1000, 2),
+    }
+    return record
+
+
+def _json_default(value):
+    # numpy整数等类型
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+# ============================================================
+# 批量扫描
+# ============================================================
+
+def run_batch(paths, out, workers=None, chunksize=8, symbology='all', deadline_ms=None, safety=True,
+              all_pages=False, cache=None, graph=None):
+    """
+    在进程池中扫描 paths 中的所有图片，每完成一张就向 out 写一行JSON
+    graph: 预处理图配置（配置字典或JSON文件路径，None为内置配置）
+    返回统计 {'images', 'with_codes', 'codes', 'errors', 'seconds'}
+    """
+    options = {'symbology': symbology, 'deadline_ms': deadline_ms, 'safety': safety,
+               'all_pages': all_pages, 'cache': cache, 'graph': graph}
+    stats = {'images': 0, 'with_codes': 0, 'codes': 0, 'errors': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+    with Pool(processes=workers or os.cpu_count() or 1, initializer=_init_worker,
+              initargs=(options,)) as pool:
+        # imap_unordered：按完成顺序返回，批量分发减少进程间通信次数
+        for record in pool.imap_unordered(scan_path, paths, chunksize=chunksize):
+            out.write(json.dumps(record, ensure_ascii=False, default=_json_default) + '\n')
+            out.flush()
+            stats['images'] += 1
+            stats['codes'] += len(record['codes'])
+            stats['with_codes'] += 1 if record['codes'] else 0
+            stats['errors'] += 1 if record['error'] else 0
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='二维码批量扫描（输出JSONL）')
+    parser.add_argument('inputs', nargs='+', help='图片文件、目录或通配符（如 "照片/**/*.jpg"）')
+    parser.add_argument('--output', '-o', help='结果写入的JSONL文件（默认输出到stdout）')
+    parser.add_argument('--workers', '-j', type=int, default=os.cpu_count() or 1, help='进程数（默认CPU核心数）')
+    parser.add_argument('--chunksize', type=int, default=8, help='每次分发给工作进程的图片数')
+    parser.add_argument('--symbology', default='all', choices=list(SYMBOLOGY_PRESETS), help='码制预设')
+    parser.add_argument('--deadline-ms', type=float, default=None, help='每张图片的时间预算（毫秒）')
+    parser.add_argument('--no-safety', action='store_true', help='不做内容安全检测')
+    parser.add_argument('--cache', help='识别结果缓存文件（SQLite，按图片内容缓存，重复扫描时直接返回）')
+    parser.add_argument('--all-pages', action='store_true', help='多页图片扫描所有页（默认识别成功即停止）')
+    parser.add_argument('--graph', help='预处理图配置文件（JSON，可用 性能基准.py graph --export 导出内置配置）')
+    args = parser.parse_args(argv)
+
+    # 预处理图在主进程中读取并校验一次，配置错误时不必启动进程池
+    graph = None
+    if args.graph:
+        try:
+            graph = PreprocessGraph.from_config(args.graph).to_config()
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f'预处理图配置无效: {e}')
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        stats = run_batch(iter_image_paths(args.inputs), out, workers=args.workers,
+                          chunksize=args.chunksize, symbology=args.symbology,
+                          deadline_ms=args.deadline_ms, safety=not args.no_safety,
+                          all_pages=args.all_pages, cache=args.cache, graph=graph)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    rate = stats['images'] / stats['seconds'] if stats['seconds'] else 0.0
+    print(f"[*] 共 {stats['images']} 张图片，{stats['with_codes']} 张识别到二维码（{stats['codes']} 个），"
+          f"{stats['errors']} 张出错，用时 {stats['seconds']:.1f} 秒（{rate:.1f} 张/秒）",
+          file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())